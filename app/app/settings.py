@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -91,6 +92,36 @@ DATABASES = {
     }
 }
 
+# Cache shared by every process of the app, web workers and management
+# commands alike. It holds the change versions of the models that the
+# in-memory trees, bundle and token users, the access decisions and the
+# ETags are checked against, so a change made by one process must be seen
+# by all of them: CACHE_LOCATION names the memcached server (host:port) to
+# use in production. Without one, files in CACHE_DIR are shared by the
+# processes of a single host. A cache local to each process (locmem,
+# dummy) is not trusted and turns these caches off.
+
+CACHE_LOCATION = os.environ.get('CACHE_LOCATION')
+
+if CACHE_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': CACHE_LOCATION,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get(
+                'CACHE_DIR',
+                os.path.join(tempfile.gettempdir(), 'app-cache')
+            ),
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
@@ -129,5 +160,95 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.1/howto/static-files/
 
 STATIC_URL = '/static/'
+MEDIA_URL = '/media/'
+
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', '/vol/web/media')
 
 AUTH_USER_MODEL = 'core.User'
+
+
+# MessagePack is negotiated next to JSON for the field devices
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': (
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+        'core.renderers.MessagePackRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+        'core.parsers.MessagePackParser',
+    ),
+}
+
+
+# API pagination, opt-in with ?paginate=<mode>
+
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 100))
+
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 1000))
+
+# Unfiltered tables estimated above this many rows are not counted exactly
+API_ESTIMATED_COUNT_THRESHOLD = int(
+    os.environ.get('API_ESTIMATED_COUNT_THRESHOLD', 10000)
+)
+
+# Lists and objects of plain serializers are read as rows, without model
+# instances
+
+API_FAST_READ = bool(int(os.environ.get('API_FAST_READ', 1)))
+
+# Lists and objects are sent with an ETag derived from the change versions
+# of their models, and answered with a 304 while the client holds it
+
+API_CONDITIONAL_GET = bool(int(os.environ.get('API_CONDITIONAL_GET', 1)))
+
+# Once built, the bundle of the reference tables is rebuilt in a background
+# thread when they change, the previous one being served meanwhile
+
+API_BUNDLE_BACKGROUND = bool(int(os.environ.get('API_BUNDLE_BACKGROUND', 1)))
+
+# Without a shared cache, each process keeps its bundle at most this many
+# seconds, since the changes of the other processes are not seen
+
+API_BUNDLE_LOCAL_TTL = float(os.environ.get('API_BUNDLE_LOCAL_TTL', 10))
+
+# Most items accepted by a bulk create or update
+
+API_BULK_MAX_SIZE = int(os.environ.get('API_BULK_MAX_SIZE', 10000))
+
+# In-memory cache of the users of the API tokens: most entries kept per
+# process and seconds before an entry is checked against the database again
+
+API_TOKEN_CACHE_SIZE = int(os.environ.get('API_TOKEN_CACHE_SIZE', 1024))
+
+API_TOKEN_CACHE_TTL = float(os.environ.get('API_TOKEN_CACHE_TTL', 60))
+
+
+# Size in degrees of the cells of the in-memory nearest place index
+
+PLACE_INDEX_CELL_SIZE = float(os.environ.get('PLACE_INDEX_CELL_SIZE', 0.01))
+
+# Place clusters are precomputed on a grid of PLACE_CLUSTER_GRID cells per
+# side of a map tile for each zoom level up to PLACE_CLUSTER_MAX_ZOOM
+
+PLACE_CLUSTER_GRID = int(os.environ.get('PLACE_CLUSTER_GRID', 8))
+
+PLACE_CLUSTER_MAX_ZOOM = int(os.environ.get('PLACE_CLUSTER_MAX_ZOOM', 14))
+
+# Disk cache of the place density heatmap tiles, served up to this zoom
+
+PLACE_HEATMAP_DIR = os.path.join(MEDIA_ROOT, 'heatmap')
+
+PLACE_HEATMAP_MAX_ZOOM = int(os.environ.get('PLACE_HEATMAP_MAX_ZOOM', 18))
+
+
+# Columnar snapshot of the core tables and processes writing it. The files
+# hold every project and are only served to staff, so they must stay out of
+# MEDIA_ROOT
+
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', '/vol/web/snapshot')
+
+SNAPSHOT_WORKERS = int(os.environ.get('SNAPSHOT_WORKERS', 4))
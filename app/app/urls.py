@@ -16,6 +16,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from core.views import BundleView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
@@ -23,4 +25,6 @@ urlpatterns = [
     path('api/place/', include('place.urls')),
     path('api/project/', include('project.urls')),
     path('api/insect/', include('insect.urls')),
+    path('api/core/', include('core.urls')),
+    path('api/bundle/', BundleView.as_view(), name='bundle'),
 ]
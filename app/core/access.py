@@ -0,0 +1,138 @@
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from core.models import Project, ProjectAccess, ProjectMembership
+from core.versions import get_versions, is_shared, model_changed
+
+
+def can_access(user_id, project_id):
+    """Return whether the user leads or is an active member of the project"""
+    return Project.objects.filter(pk=project_id).filter(
+        Q(projectLeader=user_id)
+        |
+        Q(
+            projectmembership__user=user_id,
+            projectmembership__is_active=True
+        )
+    ).exists()
+
+
+def has_access(user_id, project_id):
+    """Return whether the user leads or is an active member of the project.
+    Decisions are cached until the next change of any access, and only in
+    a cache shared by every process, which all revocations reach."""
+    if not is_shared():
+        return lookup_access(user_id, project_id)
+    version, = get_versions(ProjectAccess)
+    key = 'core:access:%s:%s:%s' % (version, user_id, project_id)
+    allowed = cache.get(key)
+    if allowed is None:
+        allowed = lookup_access(user_id, project_id)
+        cache.set(key, allowed)
+    return allowed
+
+
+def lookup_access(user_id, project_id):
+    return ProjectAccess.objects.filter(
+        user=user_id,
+        project=project_id
+    ).exists()
+
+
+def refresh(user_id, project_id, grant=True):
+    """Add or remove the access of the user to the project.
+    Deletions only ever revoke: with grant=False no row is created for a
+    project that may be being deleted."""
+    if user_id is None or project_id is None:
+        return
+    if not can_access(user_id, project_id):
+        ProjectAccess.objects.filter(
+            user=user_id,
+            project=project_id
+        ).delete()
+    elif grant:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO core_projectaccess (user_id, project_id)'
+                ' VALUES (%s, %s) ON CONFLICT DO NOTHING',
+                [user_id, project_id]
+            )
+        model_changed(ProjectAccess)
+
+
+def project_saving(sender, instance, **kwargs):
+    instance._access_leader = None
+    if instance.pk is not None:
+        instance._access_leader = Project.objects.filter(pk=instance.pk) \
+            .values_list('projectLeader', flat=True).first()
+
+
+def project_saved(sender, instance, **kwargs):
+    """Move the access of the leader when the project changes hands"""
+    old = instance.__dict__.pop('_access_leader', None)
+    if old != instance.projectLeader_id:
+        refresh(old, instance.pk)
+        refresh(instance.projectLeader_id, instance.pk)
+
+
+def membership_saving(sender, instance, **kwargs):
+    instance._access_key = None
+    if instance.pk is not None:
+        instance._access_key = ProjectMembership.objects \
+            .filter(pk=instance.pk) \
+            .values_list('user', 'project').first()
+
+
+def membership_saved(sender, instance, **kwargs):
+    old = instance.__dict__.pop('_access_key', None)
+    if old is not None and old != (instance.user_id, instance.project_id):
+        refresh(*old)
+    refresh(instance.user_id, instance.project_id)
+
+
+def membership_deleted(sender, instance, **kwargs):
+    refresh(instance.user_id, instance.project_id, grant=False)
+
+
+def connect():
+    pre_save.connect(
+        project_saving,
+        sender=Project,
+        dispatch_uid='core_access_project_pre_save'
+    )
+    post_save.connect(
+        project_saved,
+        sender=Project,
+        dispatch_uid='core_access_project_save'
+    )
+    pre_save.connect(
+        membership_saving,
+        sender=ProjectMembership,
+        dispatch_uid='core_access_membership_pre_save'
+    )
+    post_save.connect(
+        membership_saved,
+        sender=ProjectMembership,
+        dispatch_uid='core_access_membership_save'
+    )
+    post_delete.connect(
+        membership_deleted,
+        sender=ProjectMembership,
+        dispatch_uid='core_access_membership_delete'
+    )
+
+
+def rebuild():
+    """Recompute every access from the leaders and active memberships"""
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM core_projectaccess')
+        cursor.execute(
+            'INSERT INTO core_projectaccess (user_id, project_id)'
+            ' SELECT "projectLeader_id", id FROM core_project'
+            ' UNION'
+            ' SELECT user_id, project_id FROM core_projectmembership'
+            ' WHERE is_active'
+        )
+    model_changed(ProjectAccess)
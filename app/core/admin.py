@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext as _
 from core import models
+from core.pagination import EstimatedCountPaginator
 
 
 class UserAdmin(BaseUserAdmin):
@@ -24,5 +25,25 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class EstimatedCountAdmin(admin.ModelAdmin):
+    """Changelist that does not run COUNT(*) on large unfiltered tables"""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.PlantFamilies)
+admin.site.register(models.PlantFamilies, EstimatedCountAdmin)
+admin.site.register(models.PlantGenera, EstimatedCountAdmin)
+admin.site.register(models.PlantSpecies, EstimatedCountAdmin)
+admin.site.register(models.PlaceType, EstimatedCountAdmin)
+admin.site.register(models.Country, EstimatedCountAdmin)
+admin.site.register(models.Region, EstimatedCountAdmin)
+admin.site.register(models.City, EstimatedCountAdmin)
+admin.site.register(models.Town, EstimatedCountAdmin)
+admin.site.register(models.Place, EstimatedCountAdmin)
+admin.site.register(models.InsectSuperFamilies, EstimatedCountAdmin)
+admin.site.register(models.InsectFamilies, EstimatedCountAdmin)
+admin.site.register(models.InsectSubFamilies, EstimatedCountAdmin)
+admin.site.register(models.InsectTribes, EstimatedCountAdmin)
+admin.site.register(models.InsectGenera, EstimatedCountAdmin)
+admin.site.register(models.InsectSpecies, EstimatedCountAdmin)
@@ -0,0 +1,88 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from core.versions import get_versions
+
+
+class TokenCache:
+    """Least recently used tokens with their user, each kept at most ttl
+    seconds and only while the Token and User versions are unchanged"""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            token, expires, entry_version = entry
+            if entry_version != version or expires < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return token
+
+    def set(self, key, token, version):
+        with self._lock:
+            self._entries[key] = (token, time.monotonic() + self.ttl, version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Return the size and hit rate of the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxSize': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hitRate': self.hits / lookups if lookups else None,
+            }
+
+
+token_cache = TokenCache(
+    settings.API_TOKEN_CACHE_SIZE,
+    settings.API_TOKEN_CACHE_TTL
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication remembering the user of each token.
+    Any change to a token or a user, e.g. a logout or a deactivation,
+    gives them a new version and so drops every cached entry."""
+
+    def authenticate_credentials(self, key):
+        version = get_versions(Token, get_user_model())
+        token = token_cache.get(key, version)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, token, version)
+        # Requests must not share the state they put on their user
+        return copy.copy(token.user), token
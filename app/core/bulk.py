@@ -0,0 +1,371 @@
+"""Batched writes behind the bulk API actions.
+
+Items are validated against related objects loaded once for the whole
+batch, written with a few statements and the data derived from them
+(taxonomy paths, place ancestors, counters, project accesses, versions) is
+then brought up to date set-wise. Other apps follow the written rows
+through the bulk_saved signal."""
+from collections import Counter
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connection, transaction
+from django.dispatch import Signal
+
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueTogetherValidator
+
+from core import access
+from core.counters import get_counters
+from core.models import GeographyModel, Place, Project, TaxonomyModel, Town
+from core.versions import model_changed
+
+
+# Rows written per statement
+BATCH_SIZE = 1000
+
+# Past this many new rows the statistics of a table are refreshed, so
+# that the following statements of the transaction are planned for them
+ANALYZE_THRESHOLD = 10000
+
+# Sent once written with the objects and, for updates, the {pk: {attname:
+# value}} they had before, None for creations
+bulk_saved = Signal(providing_args=['objs', 'old'])
+
+
+class Preloaded:
+    """Stand-in for the queryset of a related field, answering its get(pk)
+    from the objects loaded in one query for a whole batch"""
+
+    def __init__(self, queryset, values):
+        self.pk = queryset.model._meta.pk
+        self.does_not_exist = queryset.model.DoesNotExist
+        pks = set()
+        for value in values:
+            try:
+                pks.add(self.to_python(value))
+            except (TypeError, ValueError):
+                pass
+        self.objects = queryset.in_bulk(pks)
+
+    def to_python(self, value):
+        try:
+            return self.pk.to_python(value)
+        except DjangoValidationError:
+            raise ValueError(value)
+
+    def get(self, pk):
+        try:
+            return self.objects[self.to_python(pk)]
+        except KeyError:
+            raise self.does_not_exist
+
+
+def preload(serializer, items):
+    """Load the related objects named by items, one query per field.
+    Natural keys are checked for the whole batch by validate instead of
+    item by item."""
+    serializer.validators = [
+        validator for validator in serializer.validators
+        if not isinstance(validator, UniqueTogetherValidator)
+    ]
+    for name, field in serializer.fields.items():
+        if field.read_only:
+            continue
+        values = [item.get(name) for item in items if isinstance(item, dict)]
+        if isinstance(field, ManyRelatedField):
+            field = field.child_relation
+            values = [
+                pk for value in values if isinstance(value, list)
+                for pk in value
+            ]
+        if isinstance(field, PrimaryKeyRelatedField):
+            field.queryset = Preloaded(field.get_queryset(), values)
+
+
+def validate(serializer, items, instances=None):
+    """Return the validated attrs and the errors of every item"""
+    rows = []
+    errors = []
+    for i, item in enumerate(items):
+        serializer.instance = instances[i] if instances else None
+        try:
+            rows.append(serializer.run_validation(item))
+            errors.append({})
+        except serializers.ValidationError as exc:
+            rows.append(None)
+            errors.append(exc.detail)
+    serializer.instance = None
+    check_natural_keys(serializer.Meta.model, rows, errors, instances)
+    return rows, errors
+
+
+def check_natural_keys(model, rows, errors, instances=None):
+    """Flag the valid rows whose natural key is repeated in the batch or
+    held by another object, with one query"""
+    if not model.natural_key_fields:
+        return
+    fields = [model._meta.get_field(name) for name in model.natural_key_fields]
+    keys = {}
+    for i, attrs in enumerate(rows):
+        if attrs is None:
+            continue
+        instance = instances[i] if instances else None
+        key = []
+        for field in fields:
+            if field.name in attrs:
+                value = attrs[field.name]
+                key.append(value.pk if field.is_relation else value)
+            elif instance is not None:
+                key.append(getattr(instance, field.attname))
+            else:
+                break
+        else:
+            keys.setdefault(tuple(key), []).append(i)
+    if not keys:
+        return
+    taken = {
+        tuple(key): pk for pk, *key in model.objects.filter(**{
+            field.attname + '__in': {key[j] for key in keys}
+            for j, field in enumerate(fields)
+        }).values_list('pk', *[field.attname for field in fields])
+    }
+    message = UniqueTogetherValidator.message.format(
+        field_names=', '.join(model.natural_key_fields)
+    )
+    for key, indexes in keys.items():
+        owner = taken.get(key)
+        for n, i in enumerate(indexes):
+            # Unique indexes are checked row by row: keys cannot be swapped
+            own = instances[i].pk if instances else None
+            if n > 0 or owner not in (None, own):
+                errors[i] = {api_settings.NON_FIELD_ERRORS_KEY: [message]}
+
+
+def create(model, rows):
+    """Insert objects built from validated attrs"""
+    many = [pop_many(model, attrs) for attrs in rows]
+    objs = [model(**attrs) for attrs in rows]
+    with transaction.atomic():
+        prepare(model, objs, creating=True)
+        model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+        if len(objs) > ANALYZE_THRESHOLD:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE %s' % connection.ops.quote_name(
+                    model._meta.db_table
+                ))
+        set_many(model, objs, many)
+        saved(model, objs, None)
+    return objs
+
+
+def update(model, objs, rows):
+    """Apply validated attrs to objects loaded from the database and write
+    the fields they set"""
+    many = [pop_many(model, attrs) for attrs in rows]
+    columns = [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key
+    ]
+    old = {}
+    names = set()
+    for obj, attrs in zip(objs, rows):
+        old[obj.pk] = {
+            field.attname: getattr(obj, field.attname) for field in columns
+        }
+        for name, value in attrs.items():
+            setattr(obj, name, value)
+        names.update(attrs)
+    if model is Place and 'town' in names:
+        names.update(('city', 'region', 'country'))
+    with transaction.atomic():
+        prepare(model, objs)
+        update_rows(model, objs, sorted(names))
+        set_many(model, objs, many, replace=True)
+        saved(model, objs, old)
+    return objs
+
+
+def update_rows(model, objs, names):
+    """Write fields of many rows with one UPDATE ... FROM (VALUES ...) per
+    batch"""
+    if not objs or not names:
+        return
+    fields = [model._meta.pk] + [model._meta.get_field(name) for name in names]
+    quote = connection.ops.quote_name
+    # The type referencing a column: integer rather than serial for keys
+    row = '(%s)' % ', '.join(
+        '%%s::%s' % field.rel_db_type(connection) for field in fields
+    )
+    columns = ', '.join(quote(field.column) for field in fields)
+    assignments = ', '.join(
+        '{column} = v.{column}'.format(column=quote(field.column))
+        for field in fields[1:]
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(objs), BATCH_SIZE):
+            batch = objs[start:start + BATCH_SIZE]
+            params = []
+            for obj in batch:
+                params += [
+                    field.get_db_prep_save(
+                        getattr(obj, field.attname),
+                        connection
+                    )
+                    for field in fields
+                ]
+            cursor.execute(
+                'UPDATE {table} SET {assignments}'
+                ' FROM (VALUES {values}) AS v ({columns})'
+                ' WHERE {table}.{pk} = v.{pk}'.format(
+                    table=quote(model._meta.db_table),
+                    assignments=assignments,
+                    values=', '.join([row] * len(batch)),
+                    columns=columns,
+                    pk=quote(model._meta.pk.column)
+                ),
+                params
+            )
+
+
+def pop_many(model, attrs):
+    """Take the many to many values out of validated attrs"""
+    return {
+        field.name: attrs.pop(field.name)
+        for field in model._meta.many_to_many if field.name in attrs
+    }
+
+
+def set_many(model, objs, many, replace=False):
+    """Write the many to many values of objects with one insert per field"""
+    for field in model._meta.many_to_many:
+        given = [
+            (obj, values[field.name])
+            for obj, values in zip(objs, many) if field.name in values
+        ]
+        if not given:
+            continue
+        through = field.remote_field.through
+        source = field.m2m_field_name()
+        target = field.m2m_reverse_field_name()
+        if replace:
+            through.objects.filter(**{
+                source + '__in': [obj.pk for obj, _ in given]
+            }).delete()
+        through.objects.bulk_create(
+            [
+                through(**{source + '_id': obj.pk, target + '_id': pk})
+                for obj, values in given
+                for pk in dict.fromkeys(value.pk for value in values)
+            ],
+            batch_size=BATCH_SIZE
+        )
+
+
+def prepare(model, objs, creating=False):
+    """Fill in the fields derived before writing"""
+    if issubclass(model, TaxonomyModel) and creating:
+        # Paths hold the ids: take them beforehand to insert complete rows
+        reserve_ids(model, objs)
+        build_paths(model, objs)
+    if model is Place:
+        rows = Town.objects.filter(
+            pk__in={place.town_id for place in objs}
+        ).values_list('id', 'city', 'city__region', 'city__region__country')
+        towns = {town: ancestors for town, *ancestors in rows}
+        for place in objs:
+            place.city_id, place.region_id, place.country_id = \
+                towns[place.town_id]
+
+
+def changed(obj, old, attname):
+    """Return whether an attribute was set by a creation or an update"""
+    return old is None or old[obj.pk][attname] != getattr(obj, attname)
+
+
+def saved(model, objs, old):
+    """Update the data derived from written objects"""
+    if issubclass(model, TaxonomyModel) and old is not None:
+        move_paths(model, objs, old)
+    if issubclass(model, GeographyModel) and model.parent_field \
+            and old is not None:
+        attname = model._meta.get_field(model.parent_field).attname
+        moved = [obj for obj in objs if changed(obj, old, attname)]
+        for obj in moved:
+            obj.update_places()
+        if moved:
+            model_changed(Place)
+    update_counters(model, objs, old)
+    if model is Project and any(
+        changed(obj, old, 'projectLeader_id') for obj in objs
+    ):
+        access.rebuild()
+    bulk_saved.send(sender=model, objs=objs, old=old)
+    model_changed(model)
+
+
+def build_paths(model, objs):
+    """Set the materialized paths of ranks from the paths of their parents,
+    loaded with one query"""
+    if model.parent_field is None:
+        for obj in objs:
+            obj.path = '%d/' % obj.pk
+        return
+    parent = model._meta.get_field(model.parent_field)
+    paths = dict(
+        parent.related_model.objects.filter(
+            pk__in={getattr(obj, parent.attname) for obj in objs}
+        ).values_list('id', 'path')
+    )
+    for obj in objs:
+        obj.path = '%s%d/' % (paths[getattr(obj, parent.attname)], obj.pk)
+
+
+def reserve_ids(model, objs):
+    """Give new objects the next ids of their table"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT nextval(pg_get_serial_sequence(%s, %s))'
+            ' FROM generate_series(1, %s)',
+            [model._meta.db_table, model._meta.pk.column, len(objs)]
+        )
+        for obj, (pk,) in zip(objs, cursor.fetchall()):
+            obj.pk = pk
+
+
+def move_paths(model, objs, old):
+    """Rebuild the materialized paths of reparented ranks and of their
+    descendants"""
+    if model.parent_field is None:
+        return
+    attname = model._meta.get_field(model.parent_field).attname
+    moved = [obj for obj in objs if changed(obj, old, attname)]
+    if not moved:
+        return
+    build_paths(model, moved)
+    update_rows(model, moved, ['path'])
+    for obj in moved:
+        if old[obj.pk]['path']:
+            obj.move_descendants(old[obj.pk]['path'], obj.path)
+    for descendant in model.descendant_models():
+        model_changed(descendant)
+
+
+def update_counters(model, objs, old):
+    """Move the counts of new or reparented rows between their ancestors"""
+    for counter in get_counters():
+        if model not in counter.chain[:-1]:
+            continue
+        level = counter.chain.index(model)
+        attname = counter.parent_attname(model)
+        deltas = Counter()
+        for obj in objs:
+            if not changed(obj, old, attname):
+                continue
+            # Ranks carry the count of the leaves below them
+            weight = 1 if level == 0 else getattr(obj, counter.field)
+            if old is not None:
+                deltas[old[obj.pk][attname]] -= weight
+            deltas[getattr(obj, attname)] += weight
+        counter.adjust_many(level, deltas)
@@ -0,0 +1,160 @@
+"""Bundle of every reference table, served to the clients in one response.
+
+The bundle is rendered once per version of the registered models and held
+in memory as JSON bytes along with their gzip and brotli compressions, so
+requests only pick the bytes to send. Each coding has its own ETag. Once
+built, a change of version is picked up by a background thread while the
+previous bundle is still served."""
+import gzip
+import hashlib
+import threading
+import time
+
+import brotli
+
+from django.conf import settings
+from django.db import connection
+from django.utils.http import parse_etags
+
+from rest_framework.renderers import JSONRenderer
+
+from core import fastread
+from core.versions import get_versions, is_shared, local_versions
+
+
+# Content codings by order of preference
+ENCODINGS = ('br', 'gzip')
+
+
+class Content:
+    """Rendered bundle of one version and its compressions"""
+
+    def __init__(self, version, body, expires=None):
+        self.version = version
+        self.expires = expires
+        self.encoded = {
+            'identity': body,
+            'gzip': gzip.compress(body, 9),
+            'br': brotli.compress(body),
+        }
+
+    def etag(self, encoding):
+        """Return the strong ETag of the bundle sent in a content coding"""
+        if encoding == 'identity':
+            return '"%s"' % self.version
+        return '"%s-%s"' % (self.version, encoding)
+
+    def is_current(self, version):
+        return self.version == version and (
+            self.expires is None or time.monotonic() < self.expires
+        )
+
+
+class Bundle:
+    """Reference tables, each listed as its viewset does"""
+
+    def __init__(self):
+        self.sections = {}
+        self.content = None
+        self.thread = None
+        self._lock = threading.Lock()
+
+    def register(self, key, viewset):
+        """Add the rows of a viewset under key, e.g. 'insect/species'"""
+        self.sections[key] = viewset
+
+    def version(self):
+        models = [
+            viewset.queryset.model for viewset in self.sections.values()
+        ]
+        if is_shared():
+            versions = get_versions(*models)
+        else:
+            versions = local_versions(*models)
+        return hashlib.sha1('/'.join(versions).encode()).hexdigest()[:20]
+
+    def get(self):
+        """Return the content of the current version. Once a bundle was
+        built, a newer version is rebuilt in the background and the
+        previous one returned meanwhile. Without a shared cache, the
+        versions only follow the changes of this process: the bundle is
+        kept at most API_BUNDLE_LOCAL_TTL seconds and rebuilt before
+        answering."""
+        version = self.version()
+        content = self.content
+        if content is not None and content.is_current(version):
+            return content
+        if content is None or not settings.API_BUNDLE_BACKGROUND \
+                or not is_shared():
+            return self.rebuild(version)
+        self.rebuild_later()
+        return content
+
+    def rebuild(self, version):
+        expires = None
+        if not is_shared():
+            expires = time.monotonic() + settings.API_BUNDLE_LOCAL_TTL
+        content = Content(version, self.render(version), expires)
+        self.content = content
+        return content
+
+    def rebuild_later(self):
+        with self._lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.thread = threading.Thread(target=self.refresh, daemon=True)
+            self.thread.start()
+
+    def refresh(self):
+        try:
+            self.rebuild(self.version())
+        finally:
+            connection.close()
+
+    def render(self, version):
+        tables = {}
+        for key, viewset in self.sections.items():
+            serializer_class = viewset.serializer_class
+            queryset = viewset.queryset.order_by('id')
+            plan = fastread.get_plan(serializer_class())
+            if plan is None:
+                tables[key] = serializer_class(queryset, many=True).data
+            else:
+                tables[key] = fastread.represent(queryset, plan)
+        return JSONRenderer().render({'version': version, 'tables': tables})
+
+
+def etag_matches(header, etag):
+    """Return whether an If-None-Match header lists etag, compared as the
+    weak comparison of RFC 7232 asks"""
+    tags = parse_etags(header)
+    if '*' in tags:
+        return True
+    return etag.replace('W/', '', 1) in {
+        tag.replace('W/', '', 1) for tag in tags
+    }
+
+
+def select_encoding(header):
+    """Return the preferred content coding accepted by an Accept-Encoding
+    header, 'identity' when none is"""
+    accepted = {}
+    for part in header.split(','):
+        coding, *params = [value.strip() for value in part.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            accepted[coding.lower()] = quality
+    for coding in ENCODINGS:
+        if accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return 'identity'
+
+
+BUNDLE = Bundle()
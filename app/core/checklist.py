@@ -0,0 +1,210 @@
+"""Loading of taxonomy checklists: delimited files with one row per species
+and one column per rank, from the highest one down to the species.
+
+Every node is identified by the names of its ancestors and its own, e.g.
+('Apoidea', 'Apidae', 'Apis'). The ids of the existing nodes are mapped in
+memory once, so the rows are resolved without queries and the missing
+nodes are inserted rank by rank in batches."""
+import csv
+import re
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from core import bulk
+
+
+def normalize(column):
+    """Return a column name without case, spaces nor underscores"""
+    return re.sub(r'[\s_-]', '', column).lower()
+
+
+def check_value(model, field, value, column):
+    """Raise a ValueError when value does not fit the column of field, e.g.
+    too long a name or too large a number"""
+    try:
+        model._meta.get_field(field).run_validators(value)
+    except ValidationError as exc:
+        raise ValueError('Invalid %s: %s' % (column, ' '.join(exc.messages)))
+
+
+class Rank:
+    """Column of a checklist holding the names of the nodes of model, each
+    below the node of the previous rank through parent_field"""
+
+    def __init__(self, column, model, parent_field=None):
+        self.column = column
+        self.model = model
+        self.parent_field = parent_field
+
+
+class Lookup:
+    """Column of a checklist holding the name of a model row set on the
+    species, created when missing"""
+
+    def __init__(self, column, model, field, required=True):
+        self.column = column
+        self.model = model
+        self.field = field
+        self.required = required
+
+
+class Checklist:
+    """Nodes of a chain of ranks to create from checklist rows.
+    `fields` maps the other columns copied on the species to the function
+    parsing their value, e.g. {'year': int}, and `required` lists those a
+    row must give."""
+
+    def __init__(self, ranks, lookups=(), fields=None, required=()):
+        self.ranks = ranks
+        self.lookups = lookups
+        self.fields = fields or {}
+        self.required = required
+        self.ids = {}
+        self.pending = [{} for _ in ranks]
+        self.names = {lookup.column: {} for lookup in lookups}
+        self.missing = {lookup.column: set() for lookup in lookups}
+        self.errors = []
+        self.rows = 0
+
+    def load(self):
+        """Map the names of every existing node to its id, one query per
+        rank and lookup"""
+        parents = None
+        for rank in self.ranks:
+            columns = ('id', 'name')
+            if rank.parent_field is not None:
+                columns += (rank.parent_field,)
+            nodes = {}
+            for row in rank.model.objects.values_list(*columns).iterator():
+                if parents is None:
+                    names = ()
+                elif row[2] in parents:
+                    names = parents[row[2]]
+                else:
+                    continue
+                names += (row[1],)
+                nodes[row[0]] = names
+                self.ids.setdefault(names, row[0])
+            parents = nodes
+        for lookup in self.lookups:
+            for pk, name in lookup.model.objects.values_list('id', 'name'):
+                self.names[lookup.column].setdefault(name, pk)
+
+    def read(self, lines, delimiter):
+        """Queue the missing nodes of the rows of a checklist"""
+        reader = csv.reader(lines, delimiter=delimiter)
+        header = [normalize(column) for column in next(reader, [])]
+        required = [rank.column for rank in self.ranks] + [
+            lookup.column for lookup in self.lookups if lookup.required
+        ] + list(self.required)
+        columns = required + [
+            lookup.column for lookup in self.lookups if not lookup.required
+        ] + [column for column in self.fields if column not in required]
+        missing = [
+            column for column in required if normalize(column) not in header
+        ]
+        if missing:
+            raise ValueError('Missing columns: %s' % ', '.join(missing))
+        index = {
+            column: header.index(normalize(column))
+            for column in columns if normalize(column) in header
+        }
+        for row in reader:
+            if not any(row):
+                continue
+            self.rows += 1
+            values = {
+                column: row[i].strip() if i < len(row) else ''
+                for column, i in index.items()
+            }
+            try:
+                self.add(values)
+            except ValueError as exc:
+                self.errors.append((reader.line_num, str(exc)))
+
+    def add(self, values):
+        """Queue the nodes of a row that do not exist yet"""
+        species = {}
+        for lookup in self.lookups:
+            name = values.get(lookup.column)
+            if not name:
+                if lookup.required:
+                    raise ValueError('No %s' % lookup.column)
+                continue
+            check_value(lookup.model, 'name', name, lookup.column)
+            species[lookup.field] = name
+        leaf = len(self.ranks) - 1
+        for column, parse in self.fields.items():
+            value = values.get(column)
+            if not value:
+                if column in self.required:
+                    raise ValueError('No %s' % column)
+                continue
+            try:
+                species[column] = parse(value)
+            except ValueError:
+                raise ValueError('Invalid %s: %s' % (column, value))
+            check_value(
+                self.ranks[leaf].model,
+                column,
+                species[column],
+                column
+            )
+        names = []
+        for rank in self.ranks:
+            if not values[rank.column]:
+                raise ValueError('No %s' % rank.column)
+            check_value(rank.model, 'name', values[rank.column], rank.column)
+            names.append(values[rank.column])
+        for level in range(len(self.ranks)):
+            path = tuple(names[:level + 1])
+            if path not in self.ids and path not in self.pending[level]:
+                self.pending[level][path] = species if level == leaf else {}
+        for lookup in self.lookups:
+            name = species.get(lookup.field)
+            if name is not None and name not in self.names[lookup.column]:
+                self.missing[lookup.column].add(name)
+
+    def counts(self):
+        """Return the (model, count) of the rows to create"""
+        return [
+            (lookup.model, len(self.missing[lookup.column]))
+            for lookup in self.lookups
+        ] + [
+            (rank.model, len(pending))
+            for rank, pending in zip(self.ranks, self.pending)
+        ]
+
+    def save(self):
+        """Create the queued nodes, the highest ranks first"""
+        with transaction.atomic():
+            for lookup in self.lookups:
+                names = sorted(self.missing[lookup.column])
+                if not names:
+                    continue
+                objs = bulk.create(
+                    lookup.model,
+                    [{'name': name} for name in names]
+                )
+                for name, obj in zip(names, objs):
+                    self.names[lookup.column][name] = obj.pk
+            for rank, pending in zip(self.ranks, self.pending):
+                if not pending:
+                    continue
+                rows = []
+                for names, species in pending.items():
+                    attrs = dict(species, name=names[-1])
+                    if rank.parent_field is not None:
+                        attrs[rank.parent_field + '_id'] = \
+                            self.ids[names[:-1]]
+                    for lookup in self.lookups:
+                        if lookup.field in attrs:
+                            attrs[lookup.field + '_id'] = \
+                                self.names[lookup.column][
+                                    attrs.pop(lookup.field)
+                                ]
+                    rows.append(attrs)
+                objs = bulk.create(rank.model, rows)
+                for names, obj in zip(pending, objs):
+                    self.ids[names] = obj.pk
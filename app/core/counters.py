@@ -0,0 +1,180 @@
+from collections import Counter
+
+from django.db import connection
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from core.versions import model_changed
+
+
+class DescendantCounter:
+    """Keep `field` of every ancestor of `model` equal to the number of
+    `model` rows below it.
+    `parents` lists the foreign keys walked from `model` up to the root,
+    e.g. ['town', 'city', 'region', 'country'] for places."""
+
+    def __init__(self, model, field, parents):
+        self.model = model
+        self.field = field
+        self.parents = parents
+        self.chain = [model]
+        for name in parents:
+            self.chain.append(
+                self.chain[-1]._meta.get_field(name).related_model
+            )
+
+    def connect(self):
+        # Receivers are bound methods: keep them alive with weak=False
+        for level, model in enumerate(self.chain[:-1]):
+            uid = 'core_counter_%s_%s' % (self.field, model._meta.label_lower)
+            pre_save.connect(
+                self.remember_parent,
+                sender=model,
+                weak=False,
+                dispatch_uid=uid
+            )
+            post_save.connect(
+                self.saved,
+                sender=model,
+                weak=False,
+                dispatch_uid=uid
+            )
+            if level == 0:
+                post_delete.connect(
+                    self.deleted,
+                    sender=model,
+                    weak=False,
+                    dispatch_uid=uid
+                )
+
+    def parent_attname(self, model):
+        level = self.chain.index(model)
+        return model._meta.get_field(self.parents[level]).attname
+
+    def remember_parent(self, sender, instance, **kwargs):
+        """Store the parent the row had before this save"""
+        if instance.pk is None:
+            instance._counter_parent = None
+            return
+        instance._counter_parent = sender.objects.filter(pk=instance.pk) \
+            .values_list(self.parent_attname(sender), flat=True).first()
+
+    def saved(self, sender, instance, created, **kwargs):
+        level = self.chain.index(sender)
+        old = instance.__dict__.pop('_counter_parent', None)
+        new = getattr(instance, self.parent_attname(sender))
+        if old == new:
+            return
+        if level == 0:
+            weight = 1
+        else:
+            weight = sender.objects.filter(pk=instance.pk) \
+                .values_list(self.field, flat=True).get()
+        self.adjust(level, old, -weight)
+        self.adjust(level, new, weight)
+        self.adjust_cached(instance, level, weight)
+
+    def deleted(self, sender, instance, **kwargs):
+        # Only leaves are counted: deleting a rank cascades to its leaves
+        # first, and each of them already decremented the ancestors
+        self.adjust(0, getattr(instance, self.parent_attname(sender)), -1)
+
+    def adjust(self, level, parent_id, delta):
+        """Add delta to the counter of parent_id and of its ancestors"""
+        if not delta or parent_id is None:
+            return
+        names = self.parents[level + 1:]
+        lookups = ['__'.join(names[:i + 1]) for i in range(len(names))]
+        ids = [parent_id]
+        if lookups:
+            row = self.chain[level + 1].objects.filter(pk=parent_id) \
+                .values_list(*lookups).first()
+            if row is None:
+                return
+            ids += row
+        for model, pk in zip(self.chain[level + 1:], ids):
+            model.objects.filter(pk=pk).update(
+                **{self.field: F(self.field) + delta}
+            )
+            model_changed(model)
+
+    def adjust_many(self, level, deltas):
+        """Add the {parent_id: delta} of a batch to the counters of the
+        parents and of their ancestors, with one update per rank"""
+        deltas = Counter({
+            pk: delta for pk, delta in deltas.items()
+            if delta and pk is not None
+        })
+        if not deltas:
+            return
+        names = self.parents[level + 1:]
+        lookups = ['__'.join(names[:i + 1]) for i in range(len(names))]
+        totals = [deltas] + [Counter() for _ in lookups]
+        if lookups:
+            rows = self.chain[level + 1].objects.filter(pk__in=list(deltas)) \
+                .values_list('pk', *lookups)
+            for pk, *ancestors in rows:
+                for total, ancestor in zip(totals[1:], ancestors):
+                    total[ancestor] += deltas[pk]
+        for model, total in zip(self.chain[level + 1:], totals):
+            rows = [(pk, delta) for pk, delta in total.items() if delta]
+            if not rows:
+                continue
+            quote = connection.ops.quote_name
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'UPDATE {table} SET {field} = {field} + v.delta'
+                    ' FROM (VALUES {values}) AS v (id, delta)'
+                    ' WHERE {table}.id = v.id'.format(
+                        table=quote(model._meta.db_table),
+                        field=quote(self.field),
+                        values=', '.join(['(%s, %s)'] * len(rows))
+                    ),
+                    [value for row in rows for value in row]
+                )
+            model_changed(model)
+
+    def adjust_cached(self, instance, level, delta):
+        """Mirror the update on the ancestors already loaded on instance"""
+        obj = instance
+        for model, name in zip(self.chain[level:], self.parents[level:]):
+            field = model._meta.get_field(name)
+            if not field.is_cached(obj):
+                return
+            obj = field.get_cached_value(obj)
+            setattr(obj, self.field, getattr(obj, self.field) + delta)
+
+    def rebuild(self):
+        """Recompute every counter from scratch with one UPDATE per rank"""
+        for level, model in enumerate(self.chain[1:]):
+            lookup = '__'.join(self.parents[:level + 1])
+            counts = self.model.objects.filter(**{lookup: OuterRef('pk')}) \
+                .order_by().values(lookup) \
+                .annotate(count=Count('*')).values('count')
+            model.objects.update(**{self.field: Coalesce(
+                Subquery(counts, output_field=IntegerField()),
+                0
+            )})
+            model_changed(model)
+
+
+def get_counters():
+    from core import models
+    return [
+        DescendantCounter(
+            models.InsectSpecies,
+            'speciesCount',
+            ['genus', 'tribe', 'subFamily', 'family', 'superFamily']
+        ),
+        DescendantCounter(
+            models.PlantSpecies,
+            'speciesCount',
+            ['genus', 'family']
+        ),
+        DescendantCounter(
+            models.Place,
+            'placesCount',
+            ['town', 'city', 'region', 'country']
+        ),
+    ]
@@ -0,0 +1,86 @@
+"""Streaming CSV export of the lists of the reference viewsets.
+
+Rows are read through a server-side cursor chunk by chunk and written out
+as they come, so memory stays constant whatever the size of the table."""
+import csv
+
+from django.core.exceptions import FieldDoesNotExist
+
+from rest_framework import renderers
+
+
+# Rows read from the cursor and written out at a time
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object returning what is written to it"""
+
+    def write(self, value):
+        return value
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    """Render data as CSV, one row per object. Lists are streamed by the
+    viewsets instead: this renders the other responses of ?format=csv,
+    e.g. errors."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        rows = [row if isinstance(row, dict) else {'': row} for row in rows]
+        header = list(dict.fromkeys(name for row in rows for name in row))
+        writer = csv.writer(Echo())
+        lines = [writer.writerow(header)] + [
+            writer.writerow([row.get(name) for name in header])
+            for row in rows
+        ]
+        return ''.join(lines).encode(self.charset)
+
+
+def columns(serializer, names=False):
+    """Return the (header, lookup) of the model fields of a serializer.
+    Foreign keys are exported as ids, or with names as the name of the
+    related object read through a join."""
+    model = serializer.Meta.model
+    result = []
+    for name, field in serializer.fields.items():
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.concrete or model_field.many_to_many:
+            continue
+        lookup = model_field.attname
+        if model_field.is_relation and names:
+            try:
+                model_field.related_model._meta.get_field('name')
+                lookup = model_field.name + '__name'
+            except FieldDoesNotExist:
+                pass
+        result.append((name, lookup))
+    return result
+
+
+def stream_csv(queryset, columns, chunk_size=CHUNK_SIZE):
+    """Yield the header then the rows of the queryset as CSV, chunk_size
+    rows at a time"""
+    if not queryset.ordered:
+        queryset = queryset.order_by('id')
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, _ in columns])
+    rows = queryset.values_list(
+        *[lookup for _, lookup in columns]
+    ).iterator(chunk_size=chunk_size)
+    lines = []
+    for row in rows:
+        lines.append(writer.writerow(row))
+        if len(lines) == chunk_size:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
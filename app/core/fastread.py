@@ -0,0 +1,89 @@
+"""Read path of the list and retrieve actions for plain serializers.
+
+When every field of a serializer renders a model column, the rows are read
+as tuples and turned into the dicts the serializer would return, without
+building model instances nor walking the serializer fields. Only the values
+whose representation differs from the database value go through their
+field, e.g. decimals rendered as strings, so the JSON renderer writes the
+same bytes.
+
+The renderer keeps the C encoder of the standard library. Faster encoders
+such as orjson write some floats and non finite numbers differently from
+json.dumps, e.g. 1e16 rather than 1e+16, so the two read paths would no
+longer answer the same bytes for the same rows."""
+from django.core.exceptions import FieldDoesNotExist
+
+from rest_framework import serializers
+
+# Fields rendering their column, through to_representation
+FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.EmailField,
+    serializers.BooleanField,
+    serializers.FloatField,
+    serializers.DecimalField,
+    serializers.DateField,
+    serializers.DateTimeField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+# Plans by serializer class, None for the ones that do not qualify
+_plans = {}
+
+
+def get_plan(serializer):
+    """Return the (key, attname, convert) of the fields of a serializer, or
+    None when it does not render plain columns"""
+    key = type(serializer)
+    if key not in _plans:
+        _plans[key] = build_plan(serializer)
+    return _plans[key]
+
+
+def build_plan(serializer):
+    if type(serializer).to_representation \
+            is not serializers.Serializer.to_representation:
+        return None
+    model = serializer.Meta.model
+    plan = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if type(field) not in FIELDS:
+            return None
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.many_to_many:
+            return None
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            # Rendered as the id of the related object: the column itself
+            if field.pk_field is not None or not model_field.is_relation:
+                return None
+            convert = None
+        elif model_field.is_relation:
+            return None
+        else:
+            convert = field.to_representation
+        plan.append((name, model_field.attname, convert))
+    return plan
+
+
+def represent(queryset, plan):
+    """Return the representations of the rows of queryset"""
+    keys = [key for key, _, _ in plan]
+    converters = [
+        (i, convert) for i, (_, _, convert) in enumerate(plan)
+        if convert is not None
+    ]
+    data = []
+    for row in queryset.values_list(*[attname for _, attname, _ in plan]):
+        if converters:
+            row = list(row)
+            for i, convert in converters:
+                if row[i] is not None:
+                    row[i] = convert(row[i])
+        data.append(dict(zip(keys, row)))
+    return data
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Errors listed in the report, the others are only counted
+MAX_ERRORS = 20
+
+
+class ChecklistCommand(BaseCommand):
+    """Base command creating the missing taxa of a checklist file, see
+    core.checklist. Rows with errors are reported and skipped."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or TSV file with a header')
+        parser.add_argument(
+            '--delimiter',
+            help='Column delimiter, by default a tab for .tsv and .tab '
+                 'files and a comma otherwise'
+        )
+        parser.add_argument('--encoding', default='utf-8')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be created without writing anything'
+        )
+
+    def get_checklist(self):
+        raise NotImplementedError
+
+    def handle(self, *args, **options):
+        path = options['path']
+        delimiter = options['delimiter']
+        if delimiter is None:
+            delimiter = '\t' if path.endswith(('.tsv', '.tab')) else ','
+        delimiter = delimiter.replace('\\t', '\t')
+
+        checklist = self.get_checklist()
+        self.stdout.write('Reading %s...' % path)
+        checklist.load()
+        try:
+            with open(path, newline='', encoding=options['encoding']) as f:
+                checklist.read(f, delimiter)
+        except (OSError, UnicodeDecodeError, ValueError) as exc:
+            raise CommandError(exc)
+
+        self.stdout.write(
+            '%d rows, %d with errors' % (checklist.rows, len(checklist.errors))
+        )
+        for line, error in checklist.errors[:MAX_ERRORS]:
+            self.stdout.write(self.style.WARNING(
+                'Line %d: %s' % (line, error)
+            ))
+        for model, count in checklist.counts():
+            self.stdout.write('%d %s to create' % (count, model.__name__))
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS('Dry run, nothing written'))
+            return
+        checklist.save()
+        self.stdout.write(self.style.SUCCESS('Checklist imported !'))
@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import snapshot
+
+
+class Command(BaseCommand):
+    """Django command to write every core table to Parquet files"""
+    help = 'Export a columnar snapshot of the core tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.SNAPSHOT_WORKERS,
+            help='Processes writing the tables'
+        )
+        parser.add_argument(
+            '--directory',
+            default=settings.SNAPSHOT_DIR,
+            help='Directory replaced by the snapshot'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('Exporting snapshot...')
+        start = time.monotonic()
+        try:
+            counts = snapshot.export(
+                options['directory'],
+                options['workers']
+            )
+        except snapshot.SnapshotRunning as exc:
+            raise CommandError(exc)
+        for table, count in sorted(counts.items()):
+            self.stdout.write('%s: %d rows' % (table, count))
+        self.stdout.write(self.style.SUCCESS(
+            'Snapshot of %d tables exported to %s in %.1f s !' % (
+                len(counts),
+                options['directory'],
+                time.monotonic() - start
+            )
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.counters import get_counters
+
+
+class Command(BaseCommand):
+    """Django command to recompute the species and places counters"""
+
+    def handle(self, *args, **options):
+        for counter in get_counters():
+            self.stdout.write(
+                'Counting %s under %s...' % (
+                    counter.model._meta.verbose_name_plural,
+                    ', '.join(model.__name__ for model in counter.chain[1:])
+                )
+            )
+            with transaction.atomic():
+                counter.rebuild()
+
+        self.stdout.write(self.style.SUCCESS('Counters rebuilt !'))
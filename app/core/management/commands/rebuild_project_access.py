@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core import access
+
+
+class Command(BaseCommand):
+    """Django command to recompute the projects each user can access"""
+
+    def handle(self, *args, **options):
+        self.stdout.write('Indexing project accesses...')
+        with transaction.atomic():
+            access.rebuild()
+
+        self.stdout.write(self.style.SUCCESS('Project accesses rebuilt !'))
@@ -0,0 +1,93 @@
+# Generated by Django 2.1.15 on 2026-10-18 08:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='city',
+            index=models.Index(fields=['name', 'id'], name='core_city_name_fb1056_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='country',
+            index=models.Index(fields=['name', 'id'], name='core_countr_name_c51781_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='insectfamilies',
+            index=models.Index(fields=['name', 'id'], name='core_insect_name_cdf8f5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='insectgenera',
+            index=models.Index(fields=['name', 'id'], name='core_insect_name_73788b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='insectgodfather',
+            index=models.Index(fields=['name', 'id'], name='core_insect_name_783dae_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='insectspecies',
+            index=models.Index(fields=['name', 'id'], name='core_insect_name_0f96b9_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='insectsubfamilies',
+            index=models.Index(fields=['name', 'id'], name='core_insect_name_9494d3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='insectsubgenera',
+            index=models.Index(fields=['name', 'id'], name='core_insect_name_bf639d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='insectsuperfamilies',
+            index=models.Index(fields=['name', 'id'], name='core_insect_name_d4f915_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='insecttrap',
+            index=models.Index(fields=['name', 'id'], name='core_insect_name_330786_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='insecttribes',
+            index=models.Index(fields=['name', 'id'], name='core_insect_name_4bc116_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='place',
+            index=models.Index(fields=['name', 'id'], name='core_place_name_5e4e93_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='placetype',
+            index=models.Index(fields=['name', 'id'], name='core_placet_name_3c9421_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plantfamilies',
+            index=models.Index(fields=['name', 'id'], name='core_plantf_name_6c6f4a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plantgenera',
+            index=models.Index(fields=['name', 'id'], name='core_plantg_name_e95f4d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='plantspecies',
+            index=models.Index(fields=['name', 'id'], name='core_plants_name_2700a4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['name', 'id'], name='core_projec_name_63902c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='region',
+            index=models.Index(fields=['name', 'id'], name='core_region_name_36011e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='town',
+            index=models.Index(fields=['name', 'id'], name='core_town_name_c42018_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['name', 'id'], name='core_user_name_0fb7a6_idx'),
+        ),
+    ]
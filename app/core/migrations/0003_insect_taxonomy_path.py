@@ -0,0 +1,79 @@
+# Generated by Django 2.1.15 on 2026-10-18 08:46
+
+from django.db import migrations, models
+
+
+BUILD_PATHS = [
+    'UPDATE core_insectsuperfamilies '
+    "SET path = id || '/'",
+    'UPDATE core_insectfamilies AS child '
+    "SET path = parent.path || child.id || '/' "
+    'FROM core_insectsuperfamilies AS parent '
+    'WHERE child."superFamily_id" = parent.id',
+    'UPDATE core_insectsubfamilies AS child '
+    "SET path = parent.path || child.id || '/' "
+    'FROM core_insectfamilies AS parent '
+    'WHERE child."family_id" = parent.id',
+    'UPDATE core_insecttribes AS child '
+    "SET path = parent.path || child.id || '/' "
+    'FROM core_insectsubfamilies AS parent '
+    'WHERE child."subFamily_id" = parent.id',
+    'UPDATE core_insectgenera AS child '
+    "SET path = parent.path || child.id || '/' "
+    'FROM core_insecttribes AS parent '
+    'WHERE child."tribe_id" = parent.id',
+    'UPDATE core_insectspecies AS child '
+    "SET path = parent.path || child.id || '/' "
+    'FROM core_insectgenera AS parent '
+    'WHERE child."genus_id" = parent.id',
+    'UPDATE core_insectsubgenera AS child '
+    "SET path = parent.path || child.id || '/' "
+    'FROM core_insectgenera AS parent '
+    'WHERE child."genus_id" = parent.id',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_name_id_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='insectfamilies',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='insectgenera',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='insectspecies',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='insectsubfamilies',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='insectsubgenera',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='insectsuperfamilies',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='insecttribes',
+            name='path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunSQL(BUILD_PATHS, migrations.RunSQL.noop),
+    ]
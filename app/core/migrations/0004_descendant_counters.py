@@ -0,0 +1,122 @@
+# Generated by Django 2.1.15 on 2026-10-18 08:48
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+COUNTERS = [
+    (
+        'InsectSpecies',
+        'speciesCount',
+        [
+            ('InsectGenera', 'genus'),
+            ('InsectTribes', 'genus__tribe'),
+            ('InsectSubFamilies', 'genus__tribe__subFamily'),
+            ('InsectFamilies', 'genus__tribe__subFamily__family'),
+            (
+                'InsectSuperFamilies',
+                'genus__tribe__subFamily__family__superFamily'
+            ),
+        ]
+    ),
+    (
+        'PlantSpecies',
+        'speciesCount',
+        [
+            ('PlantGenera', 'genus'),
+            ('PlantFamilies', 'genus__family'),
+        ]
+    ),
+    (
+        'Place',
+        'placesCount',
+        [
+            ('Town', 'town'),
+            ('City', 'town__city'),
+            ('Region', 'town__city__region'),
+            ('Country', 'town__city__region__country'),
+        ]
+    ),
+]
+
+
+def count_descendants(apps, schema_editor):
+    for leaf_name, field, ancestors in COUNTERS:
+        leaf = apps.get_model('core', leaf_name)
+        for model_name, lookup in ancestors:
+            counts = leaf.objects.filter(**{lookup: OuterRef('pk')}) \
+                .order_by().values(lookup) \
+                .annotate(count=Count('*')).values('count')
+            apps.get_model('core', model_name).objects.update(**{
+                field: Coalesce(
+                    Subquery(counts, output_field=IntegerField()),
+                    0
+                )
+            })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_insect_taxonomy_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='city',
+            name='placesCount',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='country',
+            name='placesCount',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='insectfamilies',
+            name='speciesCount',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='insectgenera',
+            name='speciesCount',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='insectsubfamilies',
+            name='speciesCount',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='insectsuperfamilies',
+            name='speciesCount',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='insecttribes',
+            name='speciesCount',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='plantfamilies',
+            name='speciesCount',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='plantgenera',
+            name='speciesCount',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='region',
+            name='placesCount',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='town',
+            name='placesCount',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_descendants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.1.15 on 2026-10-18 08:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+COPY_ANCESTORS = (
+    'UPDATE core_place AS place '
+    'SET city_id = town.city_id, '
+    'region_id = city.region_id, '
+    'country_id = region.country_id '
+    'FROM core_town AS town '
+    'JOIN core_city AS city ON town.city_id = city.id '
+    'JOIN core_region AS region ON city.region_id = region.id '
+    'WHERE place.town_id = town.id'
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_descendant_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='place',
+            name='city',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.City'),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='country',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.Country'),
+        ),
+        migrations.AddField(
+            model_name='place',
+            name='region',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.Region'),
+        ),
+        migrations.RunSQL(COPY_ANCESTORS, migrations.RunSQL.noop),
+    ]
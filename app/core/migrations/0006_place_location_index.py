@@ -0,0 +1,16 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_place_ancestry'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX core_place_location_gist ON core_place '
+            'USING gist (point("longitudeDec", "latitudeDec"))',
+            'DROP INDEX core_place_location_gist'
+        ),
+    ]
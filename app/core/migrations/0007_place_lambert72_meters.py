@@ -0,0 +1,23 @@
+# Generated by Django 2.1.15 on 2026-10-18 08:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_place_location_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='place',
+            name='latitudeLambert72',
+            field=models.DecimalField(blank=True, decimal_places=10, max_digits=16, null=True),
+        ),
+        migrations.AlterField(
+            model_name='place',
+            name='longitudeLambert72',
+            field=models.DecimalField(blank=True, decimal_places=10, max_digits=16, null=True),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 2.1.15 on 2026-10-18 09:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+BUILD_CLUSTERS = '''
+INSERT INTO core_placecluster (zoom, "row", col, type_id, count,
+    "latitudeSum", "longitudeSum")
+SELECT %s, floor("latitudeDec"::float8 / %s::float8),
+    floor("longitudeDec"::float8 / %s::float8), type_id, count(*),
+    sum("latitudeDec"::float8), sum("longitudeDec"::float8)
+FROM core_place
+GROUP BY 2, 3, type_id
+'''
+
+
+def build_clusters(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for zoom in range(settings.PLACE_CLUSTER_MAX_ZOOM + 1):
+            size = 360 / 2 ** zoom / settings.PLACE_CLUSTER_GRID
+            cursor.execute(BUILD_CLUSTERS, [zoom, size, size])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_place_lambert72_meters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaceCluster',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zoom', models.PositiveSmallIntegerField()),
+                ('row', models.IntegerField()),
+                ('col', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('latitudeSum', models.FloatField(default=0)),
+                ('longitudeSum', models.FloatField(default=0)),
+                ('type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.PlaceType')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='placecluster',
+            unique_together={('zoom', 'row', 'col', 'type')},
+        ),
+        migrations.RunPython(build_clusters, migrations.RunPython.noop),
+    ]
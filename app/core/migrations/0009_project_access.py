@@ -0,0 +1,37 @@
+# Generated by Django 2.1.15 on 2026-10-18 09:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+INDEX_ACCESSES = (
+    'INSERT INTO core_projectaccess (user_id, project_id) '
+    'SELECT "projectLeader_id", id FROM core_project '
+    'UNION '
+    'SELECT user_id, project_id FROM core_projectmembership '
+    'WHERE is_active'
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_place_clusters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectAccess',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='accesses', to='core.Project')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='projectAccesses', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='projectaccess',
+            unique_together={('user', 'project')},
+        ),
+        migrations.RunSQL(INDEX_ACCESSES, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 2.1.15 on 2026-10-18 10:30
+
+from django.db import migrations
+from django.db.models import Count
+
+
+NATURAL_KEYS = [
+    ('City', ('region', 'name')),
+    ('Country', ('name',)),
+    ('InsectFamilies', ('superFamily', 'name')),
+    ('InsectGenera', ('tribe', 'name')),
+    ('InsectSpecies', ('genus', 'name')),
+    ('InsectSubFamilies', ('family', 'name')),
+    ('InsectSubGenera', ('genus', 'name')),
+    ('InsectSuperFamilies', ('name',)),
+    ('InsectTribes', ('subFamily', 'name')),
+    ('Place', ('codeSite',)),
+    ('PlantFamilies', ('name',)),
+    ('PlantGenera', ('family', 'name')),
+    ('PlantSpecies', ('genus', 'name')),
+    ('Region', ('country', 'name')),
+    ('Town', ('city', 'name')),
+]
+
+MAX_DUPLICATES = 20
+
+
+def check_duplicates(apps, schema_editor):
+    """Refuse to add the unique constraints while rows share a natural key,
+    listing them so they can be merged or renamed first"""
+    duplicates = []
+    for model_name, fields in NATURAL_KEYS:
+        rows = apps.get_model('core', model_name).objects.order_by() \
+            .values(*fields).annotate(count=Count('*')) \
+            .filter(count__gt=1)
+        for row in rows[:MAX_DUPLICATES]:
+            duplicates.append('%s %s: %d rows' % (
+                model_name,
+                ', '.join('%s=%s' % (f, row[f]) for f in fields),
+                row['count']
+            ))
+    if duplicates:
+        raise ValueError(
+            'Duplicate natural keys, merge or rename them before '
+            'migrating:\n%s' % '\n'.join(duplicates)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_project_access'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='city',
+            unique_together={('region', 'name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='country',
+            unique_together={('name',)},
+        ),
+        migrations.AlterUniqueTogether(
+            name='insectfamilies',
+            unique_together={('superFamily', 'name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='insectgenera',
+            unique_together={('tribe', 'name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='insectspecies',
+            unique_together={('genus', 'name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='insectsubfamilies',
+            unique_together={('family', 'name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='insectsubgenera',
+            unique_together={('genus', 'name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='insectsuperfamilies',
+            unique_together={('name',)},
+        ),
+        migrations.AlterUniqueTogether(
+            name='insecttribes',
+            unique_together={('subFamily', 'name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='place',
+            unique_together={('codeSite',)},
+        ),
+        migrations.AlterUniqueTogether(
+            name='plantfamilies',
+            unique_together={('name',)},
+        ),
+        migrations.AlterUniqueTogether(
+            name='plantgenera',
+            unique_together={('family', 'name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='plantspecies',
+            unique_together={('genus', 'name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='region',
+            unique_together={('country', 'name')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='town',
+            unique_together={('city', 'name')},
+        ),
+    ]
@@ -1,8 +1,12 @@
+from django.apps import apps
 from django.db import models
+from django.db.models.functions import Concat, Substr
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, \
                                         PermissionsMixin
 
+from core.versions import model_changed
+
 
 class UserManager(BaseUserManager):
 
@@ -37,52 +41,218 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     USERNAME_FIELD = 'email'
 
+    class Meta:
+        indexes = [models.Index(fields=['name', 'id'])]
+
 
 class BaseModel(models.Model):
     name = models.CharField(max_length=255, blank=False)
+    # Fields identifying a row for clients, backed by a unique index
+    natural_key_fields = None
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        """Leave the non editable fields out of updates: they are maintained
+        with queries and the values held in memory may be stale"""
+        if not self._state.adding and not args \
+                and not kwargs.get('force_insert') \
+                and kwargs.get('update_fields') is None:
+            fields = [
+                field for field in self._meta.concrete_fields
+                if not field.primary_key
+            ]
+            if not all(field.editable for field in fields):
+                kwargs['update_fields'] = [
+                    field.name for field in fields if field.editable
+                ]
+        super().save(*args, **kwargs)
+
     class Meta:
         abstract = True
+        indexes = [models.Index(fields=['name', 'id'])]
+
+
+class TaxonomyModel(BaseModel):
+    """Taxonomy rank keeping the materialized path of its ancestors ids,
+    e.g. '3/12/40/' for a sub family, so the descendants of any node are
+    found with one indexed prefix scan"""
+    path = models.CharField(
+            max_length=255,
+            db_index=True,
+            editable=False,
+            default=''
+        )
+    rank = None
+    parent_field = None
+
+    class Meta(BaseModel.Meta):
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        old_path = type(self).objects.filter(pk=self.pk) \
+            .values_list('path', flat=True).get()
+        path = self.build_path()
+        if path != old_path:
+            type(self).objects.filter(pk=self.pk).update(path=path)
+            if old_path:
+                self.move_descendants(old_path, path)
+        self.path = path
+
+    def build_path(self):
+        if self.parent_field is None:
+            return '%d/' % self.pk
+        parent = self._meta.get_field(self.parent_field)
+        parent_path = parent.related_model.objects \
+            .filter(pk=getattr(self, parent.attname)) \
+            .values_list('path', flat=True).get()
+        return '%s%d/' % (parent_path, self.pk)
+
+    def move_descendants(self, old_path, path):
+        """Rewrite the path prefix of every descendant after a reparent"""
+        for model in self.descendant_models():
+            model.objects.filter(path__startswith=old_path).update(
+                path=Concat(
+                    models.Value(path),
+                    Substr('path', len(old_path) + 1),
+                    output_field=models.CharField()
+                )
+            )
+            model_changed(model)
+
+    @classmethod
+    def descendant_models(cls):
+        """Return the models of the ranks below this one"""
+        descendants = []
+        for model in apps.get_app_config('core').get_models():
+            parent = model
+            while issubclass(parent, TaxonomyModel) and parent.parent_field:
+                parent = parent._meta.get_field(
+                            parent.parent_field
+                        ).related_model
+                if parent is cls:
+                    descendants.append(model)
+                    break
+        return descendants
 
 
 class PlantFamilies(BaseModel):
     """Plant family"""
+    speciesCount = models.IntegerField(default=0, editable=False)
+    natural_key_fields = ('name',)
+
+    class Meta(BaseModel.Meta):
+        unique_together = [('name',)]
 
 
 class PlantGenera(BaseModel):
     """Plant genus"""
     family = models.ForeignKey(PlantFamilies, on_delete=models.CASCADE)
+    speciesCount = models.IntegerField(default=0, editable=False)
+    natural_key_fields = ('family', 'name')
+
+    class Meta(BaseModel.Meta):
+        unique_together = [('family', 'name')]
 
 
 class PlantSpecies(BaseModel):
     """Plant species"""
     genus = models.ForeignKey(PlantGenera, on_delete=models.CASCADE)
+    natural_key_fields = ('genus', 'name')
+
+    class Meta(BaseModel.Meta):
+        unique_together = [('genus', 'name')]
 
 
 class PlaceType(BaseModel):
     """Place type"""
 
 
-class Country(BaseModel):
+class GeographyModel(BaseModel):
+    """Geographic rank whose ancestors are copied on the places below it"""
+    parent_field = None
+
+    class Meta(BaseModel.Meta):
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        old_parent = None
+        if self.parent_field is not None and not self._state.adding:
+            old_parent = type(self).objects.filter(pk=self.pk) \
+                .values_list(self.parent_field, flat=True).first()
+        super().save(*args, **kwargs)
+        if old_parent is not None \
+                and old_parent != getattr(self, self.parent_field + '_id'):
+            self.update_places()
+            model_changed(Place)
+
+    def update_places(self):
+        """Copy the new ancestors of this rank on its places"""
+        raise NotImplementedError
+
+
+class Country(GeographyModel):
     """Country"""
+    placesCount = models.IntegerField(default=0, editable=False)
+    natural_key_fields = ('name',)
+
+    class Meta(GeographyModel.Meta):
+        unique_together = [('name',)]
 
 
-class Region(BaseModel):
+class Region(GeographyModel):
     """Region"""
     country = models.ForeignKey(Country, on_delete=models.CASCADE)
+    placesCount = models.IntegerField(default=0, editable=False)
+    parent_field = 'country'
+    natural_key_fields = ('country', 'name')
 
+    class Meta(GeographyModel.Meta):
+        unique_together = [('country', 'name')]
 
-class City(BaseModel):
+    def update_places(self):
+        Place.objects.filter(region=self).update(country=self.country_id)
+
+
+class City(GeographyModel):
     """City"""
     region = models.ForeignKey(Region, on_delete=models.CASCADE)
+    placesCount = models.IntegerField(default=0, editable=False)
+    parent_field = 'region'
+    natural_key_fields = ('region', 'name')
+
+    class Meta(GeographyModel.Meta):
+        unique_together = [('region', 'name')]
+
+    def update_places(self):
+        country = Region.objects.filter(pk=self.region_id) \
+            .values_list('country', flat=True).get()
+        Place.objects.filter(city=self).update(
+            region=self.region_id,
+            country=country
+        )
 
 
-class Town(BaseModel):
+class Town(GeographyModel):
     """Town"""
     city = models.ForeignKey(City, on_delete=models.CASCADE)
+    placesCount = models.IntegerField(default=0, editable=False)
+    parent_field = 'city'
+    natural_key_fields = ('city', 'name')
+
+    class Meta(GeographyModel.Meta):
+        unique_together = [('city', 'name')]
+
+    def update_places(self):
+        region, country = City.objects.filter(pk=self.city_id) \
+            .values_list('region', 'region__country').get()
+        Place.objects.filter(town=self).update(
+            city=self.city_id,
+            region=region,
+            country=country
+        )
 
 
 class Place(BaseModel):
@@ -91,20 +261,83 @@ class Place(BaseModel):
     comment = models.CharField(max_length=200, null=True, blank=True)
     codeSite = models.CharField(max_length=200)
     town = models.ForeignKey(Town, on_delete=models.CASCADE)
+    # Lambert 72 northing (latitude) and easting (longitude) in meters
     latitudeLambert72 = models.DecimalField(
-            max_digits=13,
+            max_digits=16,
             decimal_places=10,
             null=True,
             blank=True
         )
     longitudeLambert72 = models.DecimalField(
-            max_digits=13,
+            max_digits=16,
             decimal_places=10,
             null=True,
             blank=True
         )
     latitudeDec = models.DecimalField(max_digits=13, decimal_places=10)
     longitudeDec = models.DecimalField(max_digits=13, decimal_places=10)
+    # Ancestors of the town, copied to filter places without joins
+    city = models.ForeignKey(
+            City,
+            on_delete=models.CASCADE,
+            null=True,
+            editable=False
+        )
+    region = models.ForeignKey(
+            Region,
+            on_delete=models.CASCADE,
+            null=True,
+            editable=False
+        )
+    country = models.ForeignKey(
+            Country,
+            on_delete=models.CASCADE,
+            null=True,
+            editable=False
+        )
+    natural_key_fields = ('codeSite',)
+
+    class Meta(BaseModel.Meta):
+        unique_together = [('codeSite',)]
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        self.city_id, self.region_id, self.country_id = Town.objects \
+            .filter(pk=self.town_id) \
+            .values_list('city', 'city__region', 'city__region__country') \
+            .get()
+        super().save(*args, **kwargs)
+        if not adding:
+            Place.objects.filter(pk=self.pk).update(
+                city=self.city_id,
+                region=self.region_id,
+                country=self.country_id
+            )
+
+
+class PlaceCluster(models.Model):
+    """Places of one type aggregated on a cell of the grid of a map zoom
+    level, maintained from the Place signals"""
+    zoom = models.PositiveSmallIntegerField()
+    row = models.IntegerField()
+    col = models.IntegerField()
+    type = models.ForeignKey(PlaceType, on_delete=models.CASCADE)
+    count = models.IntegerField(default=0)
+    latitudeSum = models.FloatField(default=0)
+    longitudeSum = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ('zoom', 'row', 'col', 'type')
+
+
+class ProjectQuerySet(models.QuerySet):
+
+    def accessible_by(self, user):
+        """Return the projects the user can see: all of them for staff,
+        else the ones they lead or are an active member of"""
+        if user.is_staff:
+            return self
+        return self.filter(accesses__user=user)
 
 
 class Project(BaseModel):
@@ -125,6 +358,8 @@ class Project(BaseModel):
                     related_name='members'
                 )
 
+    objects = ProjectQuerySet.as_manager()
+
 
 class ProjectMembership(models.Model):
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
@@ -132,6 +367,24 @@ class ProjectMembership(models.Model):
     is_active = models.BooleanField(default=False)
 
 
+class ProjectAccess(models.Model):
+    """Project a user leads or is an active member of, maintained from the
+    Project and ProjectMembership signals"""
+    user = models.ForeignKey(
+            get_user_model(),
+            on_delete=models.CASCADE,
+            related_name='projectAccesses'
+        )
+    project = models.ForeignKey(
+            Project,
+            on_delete=models.CASCADE,
+            related_name='accesses'
+        )
+
+    class Meta:
+        unique_together = ('user', 'project')
+
+
 class InsectGodfather(BaseModel):
     """Insect godfahter"""
 
@@ -140,41 +393,87 @@ class InsectTrap(BaseModel):
     """Insect trap"""
 
 
-class InsectSuperFamilies(BaseModel):
+class InsectSuperFamilies(TaxonomyModel):
     """Insect super families"""
+    speciesCount = models.IntegerField(default=0, editable=False)
+    rank = 'superfamily'
+    natural_key_fields = ('name',)
+
+    class Meta(TaxonomyModel.Meta):
+        unique_together = [('name',)]
 
 
-class InsectFamilies(BaseModel):
+class InsectFamilies(TaxonomyModel):
     """Insect families"""
     superFamily = models.ForeignKey(
                             InsectSuperFamilies,
                             on_delete=models.CASCADE
                         )
+    speciesCount = models.IntegerField(default=0, editable=False)
+    rank = 'family'
+    parent_field = 'superFamily'
+    natural_key_fields = ('superFamily', 'name')
 
+    class Meta(TaxonomyModel.Meta):
+        unique_together = [('superFamily', 'name')]
 
-class InsectSubFamilies(BaseModel):
+
+class InsectSubFamilies(TaxonomyModel):
     """Insect sub families"""
     family = models.ForeignKey(InsectFamilies, on_delete=models.CASCADE)
+    speciesCount = models.IntegerField(default=0, editable=False)
+    rank = 'subfamily'
+    parent_field = 'family'
+    natural_key_fields = ('family', 'name')
+
+    class Meta(TaxonomyModel.Meta):
+        unique_together = [('family', 'name')]
 
 
-class InsectTribes(BaseModel):
+class InsectTribes(TaxonomyModel):
     """Insect tribes"""
     subFamily = models.ForeignKey(InsectSubFamilies, on_delete=models.CASCADE)
+    speciesCount = models.IntegerField(default=0, editable=False)
+    rank = 'tribe'
+    parent_field = 'subFamily'
+    natural_key_fields = ('subFamily', 'name')
+
+    class Meta(TaxonomyModel.Meta):
+        unique_together = [('subFamily', 'name')]
 
 
-class InsectGenera(BaseModel):
+class InsectGenera(TaxonomyModel):
     """Insect genera"""
     tribe = models.ForeignKey(InsectTribes, on_delete=models.CASCADE)
+    speciesCount = models.IntegerField(default=0, editable=False)
+    rank = 'genus'
+    parent_field = 'tribe'
+    natural_key_fields = ('tribe', 'name')
 
+    class Meta(TaxonomyModel.Meta):
+        unique_together = [('tribe', 'name')]
 
-class InsectSpecies(BaseModel):
+
+class InsectSpecies(TaxonomyModel):
     """Insect species"""
     genus = models.ForeignKey(InsectGenera, on_delete=models.CASCADE)
     otherName = models.CharField(max_length=255, null=True)
     godfather = models.ForeignKey(InsectGodfather, on_delete=models.CASCADE)
     year = models.IntegerField()
+    rank = 'species'
+    parent_field = 'genus'
+    natural_key_fields = ('genus', 'name')
+
+    class Meta(TaxonomyModel.Meta):
+        unique_together = [('genus', 'name')]
 
 
-class InsectSubGenera(BaseModel):
+class InsectSubGenera(TaxonomyModel):
     """Insect sub genera is a mix info between specie and gene"""
     genus = models.ForeignKey(InsectGenera, on_delete=models.CASCADE)
+    rank = 'subgenus'
+    parent_field = 'genus'
+    natural_key_fields = ('genus', 'name')
+
+    class Meta(TaxonomyModel.Meta):
+        unique_together = [('genus', 'name')]
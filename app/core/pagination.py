@@ -0,0 +1,239 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(pagination.BasePagination):
+    """Keyset pagination ordered by (name, id).
+    The cursor holds the (name, id) of the last row seen, so every page is
+    an indexed range scan whatever its depth."""
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('name', 'id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.page_size = settings.API_PAGE_SIZE
+        self.max_page_size = settings.API_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        name_field, id_field = self.ordering
+        if position is not None:
+            queryset = self.after(queryset, position, reverse)
+        if reverse:
+            queryset = queryset.order_by('-' + name_field, '-' + id_field)
+        else:
+            queryset = queryset.order_by(name_field, id_field)
+
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        self.page = results[:page_size]
+        if reverse:
+            self.page.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return self.page
+
+    def after(self, queryset, position, reverse=False):
+        """Return the rows past position in the ordering, or before it when
+        reverse. The row comparison is a single range of the (name, id)
+        index, which an OR of the two columns is not."""
+        meta = queryset.model._meta
+        quote = connections[queryset.db].ops.quote_name
+        columns = ', '.join(
+            '%s.%s' % (
+                quote(meta.db_table),
+                quote(meta.get_field(field).column)
+            )
+            for field in self.ordering
+        )
+        return queryset.extra(
+            where=['(%s) %s (%%s, %%s)' % (columns, '<' if reverse else '>')],
+            params=list(position)
+        )
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request):
+        """Return the ((name, id), reverse) position stored in the cursor"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            cursor = json.loads(
+                    base64.urlsafe_b64decode(encoded.encode('ascii'))
+                )
+            position = (str(cursor['n']), int(cursor['i']))
+            reverse = bool(cursor['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, obj, reverse):
+        name_field, id_field = self.ordering
+        cursor = {
+                'n': getattr(obj, name_field),
+                'i': getattr(obj, id_field),
+                'r': int(reverse)
+            }
+        encoded = base64.urlsafe_b64encode(
+                json.dumps(cursor, separators=(',', ':')).encode('utf-8')
+            ).decode('ascii')
+        return replace_query_param(
+                self.base_url,
+                self.cursor_query_param,
+                encoded
+            )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(
+                    self.base_url,
+                    self.cursor_query_param
+                )
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(
+                    self.base_url,
+                    self.cursor_query_param
+                )
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+def estimate_count(queryset):
+    """Return the planner row estimate of an unfiltered queryset's table,
+    or None when it cannot be estimated"""
+    query = queryset.query
+    if query.where or query.distinct or query.combinator \
+            or query.low_mark or query.high_mark is not None:
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [connection.ops.quote_name(queryset.model._meta.db_table)]
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator reading the row count of unfiltered tables from the
+    Postgres catalog statistics instead of running COUNT(*).
+    Filtered querysets and small tables are counted exactly."""
+    estimated = False
+
+    @cached_property
+    def count(self):
+        if isinstance(self.object_list, QuerySet):
+            estimate = estimate_count(self.object_list)
+            if estimate is not None \
+                    and estimate >= settings.API_ESTIMATED_COUNT_THRESHOLD:
+                self.estimated = True
+                return estimate
+        return super().count
+
+    def page(self, number):
+        """Return the page of the given number. Past an estimated count the
+        rows are read anyway and the count raised to the ones seen, since
+        the estimate may be below the real count."""
+        if not (self.count and self.estimated):
+            return super().page(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        bottom = (number - 1) * self.per_page
+        # One more row than the page tells whether another one follows
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        if bottom + len(rows) > self.count:
+            self.count = bottom + len(rows)
+            self.__dict__.pop('num_pages', None)
+        return self._get_page(rows[:self.per_page], number, self)
+
+
+class EstimatedCountPagination(pagination.PageNumberPagination):
+    """Page number pagination whose count is estimated on large tables"""
+    django_paginator_class = EstimatedCountPaginator
+    page_size_query_param = 'page_size'
+
+    def __init__(self):
+        self.page_size = settings.API_PAGE_SIZE
+        self.max_page_size = settings.API_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not queryset.ordered:
+            queryset = queryset.order_by('id')
+        return super().paginate_queryset(queryset, request, view)
+
+
+class PaginationModeMixin:
+    """Opt-in pagination: lists stay unpaginated unless the client asks
+    for one of `pagination_modes` with `?paginate=<mode>`"""
+    pagination_query_param = 'paginate'
+    pagination_modes = {
+        'cursor': KeysetPagination,
+        'page': EstimatedCountPagination,
+    }
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            mode = self.request.query_params.get(self.pagination_query_param)
+            pagination_class = self.pagination_modes.get(mode)
+            self._paginator = pagination_class() if pagination_class else None
+        return self._paginator
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == 'list' and self.paginator is None \
+                and not queryset.ordered:
+            # Whole lists come in the order of the pages
+            queryset = queryset.order_by('id')
+        return queryset
@@ -0,0 +1,49 @@
+"""Compact binary rendering of the API responses for field devices.
+
+MessagePack is negotiated with Accept: application/msgpack (or
+?format=msgpack). With ?layout=columns, lists are sent as one array of
+values per field instead of one object per item, so each key is sent
+once."""
+import msgpack
+
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+
+# Query parameter selecting the layout of lists
+LAYOUT_QUERY_PARAM = 'layout'
+
+
+def to_columns(items):
+    """Return a list of objects as {key: [values]}, or the list as is when
+    its items are not all objects"""
+    if not all(isinstance(item, dict) for item in items):
+        return items
+    keys = list(dict.fromkeys(key for item in items for key in item))
+    return {key: [item.get(key) for item in items] for key in keys}
+
+
+class MessagePackRenderer(renderers.BaseRenderer):
+    """Render data as MessagePack, with the values JSON would give for
+    dates, decimals and the like"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        request = (renderer_context or {}).get('request')
+        if request is not None \
+                and request.query_params.get(LAYOUT_QUERY_PARAM) == 'columns':
+            if isinstance(data, list):
+                data = to_columns(data)
+            elif isinstance(data, dict) \
+                    and isinstance(data.get('results'), list):
+                data = dict(data, results=to_columns(data['results']))
+        return msgpack.packb(
+            data,
+            use_bin_type=True,
+            default=encoders.JSONEncoder().default
+        )
@@ -0,0 +1,40 @@
+from django.apps import apps
+from django.db.models.signals import m2m_changed, post_delete, \
+    post_migrate, post_save
+
+from rest_framework.authtoken.models import Token
+
+from core import access
+from core.counters import get_counters
+from core.versions import model_changed, models_migrated, \
+    relation_changed
+
+
+def connect_signals():
+    """Connect the receivers keeping derived data in sync with core models"""
+    models = list(apps.get_app_config('core').get_models()) + [Token]
+    for model in models:
+        post_save.connect(
+            model_changed,
+            sender=model,
+            dispatch_uid='core_version_save_%s' % model._meta.label_lower
+        )
+        post_delete.connect(
+            model_changed,
+            sender=model,
+            dispatch_uid='core_version_delete_%s' % model._meta.label_lower
+        )
+        for field in model._meta.local_many_to_many:
+            through = field.remote_field.through
+            m2m_changed.connect(
+                relation_changed,
+                sender=through,
+                dispatch_uid='core_version_m2m_%s' % through._meta.label_lower
+            )
+    post_migrate.connect(
+        models_migrated,
+        dispatch_uid='core_version_migrate'
+    )
+    for counter in get_counters():
+        counter.connect()
+    access.connect()
@@ -0,0 +1,279 @@
+"""Columnar snapshot of every core table as Parquet files.
+
+Tables are written by a pool of worker processes, one table per task.
+All workers read the same Postgres snapshot, exported by the parent
+transaction, so the files are consistent with each other. Foreign keys are
+kept as integer columns, next to a <field>_name column holding the name of
+the related object, stored dictionary encoded by Parquet.
+
+Files are written to a temporary directory swapped in place of the
+previous snapshot once complete. They are kept out of the media files and
+only served to staff, which can see every project. Exports run in a
+process of their own and hold a lock, so that only one writes a directory
+at a time."""
+import fcntl
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection, connections, transaction
+
+from core.pagination import estimate_count
+
+
+# Rows read from the cursor and written as one row group at a time
+CHUNK_SIZE = 50000
+
+# Only columns exported of the tables holding personal data
+INCLUDED = {('core', 'user'): {'id', 'name'}}
+
+TYPES = {
+    'AutoField': pa.int64(),
+    'BigAutoField': pa.int64(),
+    'IntegerField': pa.int64(),
+    'BigIntegerField': pa.int64(),
+    'SmallIntegerField': pa.int64(),
+    'PositiveIntegerField': pa.int64(),
+    'PositiveSmallIntegerField': pa.int64(),
+    'FloatField': pa.float64(),
+    'BooleanField': pa.bool_(),
+    'NullBooleanField': pa.bool_(),
+    'DateField': pa.date32(),
+    'DateTimeField': pa.timestamp('us', tz='UTC'),
+}
+
+
+class SnapshotRunning(Exception):
+    """Raised when another export of the snapshot is under way"""
+
+
+def snapshot_models():
+    """Return the models of the core tables, many to many tables included"""
+    return list(apps.get_app_config('core').get_models(
+        include_auto_created=True
+    ))
+
+
+def arrow_type(field):
+    if field.is_relation:
+        field = field.target_field
+    if field.get_internal_type() == 'DecimalField':
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    return TYPES.get(field.get_internal_type(), pa.string())
+
+
+def columns(model):
+    """Return the (name, lookup, arrow type) of the columns of a model"""
+    result = []
+    meta = model._meta
+    included = INCLUDED.get((meta.app_label, meta.model_name))
+    for field in meta.concrete_fields:
+        if included is not None and field.name not in included:
+            continue
+        result.append((field.name, field.attname, arrow_type(field)))
+        if field.is_relation:
+            try:
+                field.related_model._meta.get_field('name')
+            except FieldDoesNotExist:
+                continue
+            result.append(
+                (field.name + '_name', field.name + '__name', pa.string())
+            )
+    return result
+
+
+def write_table(model, path, chunk_size=CHUNK_SIZE):
+    """Write the rows of a model to a Parquet file and return their count"""
+    spec = columns(model)
+    schema = pa.schema([pa.field(name, type) for name, _, type in spec])
+    rows = model._base_manager.order_by('pk').values_list(
+        *[lookup for _, lookup, _ in spec]
+    ).iterator(chunk_size=chunk_size)
+    count = 0
+    writer = pq.ParquetWriter(path, schema)
+    try:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                writer.write_table(to_table(chunk, schema))
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            writer.write_table(to_table(chunk, schema))
+            count += len(chunk)
+    finally:
+        writer.close()
+    return count
+
+
+def to_table(rows, schema):
+    values = list(zip(*rows)) or [[] for _ in schema]
+    return pa.Table.from_arrays(
+        [
+            pa.array(column, type=field.type)
+            for column, field in zip(values, schema)
+        ],
+        schema=schema
+    )
+
+
+def export_table(label, directory, snapshot=None):
+    """Write the table of a model, read in the exported snapshot when
+    given, and return its row count"""
+    model = apps.get_model(label)
+    path = os.path.join(directory, model._meta.db_table + '.parquet')
+    with transaction.atomic():
+        if snapshot is not None:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ'
+                )
+                cursor.execute('SET TRANSACTION SNAPSHOT %s', [snapshot])
+        return write_table(model, path)
+
+
+def export(directory=None, workers=None):
+    """Write every core table to directory and return the row counts by
+    table. With one worker the tables are read in the current transaction,
+    e.g. for tests."""
+    directory = directory or settings.SNAPSHOT_DIR
+    workers = workers or settings.SNAPSHOT_WORKERS
+    with lock(directory):
+        return export_locked(directory, workers)
+
+
+def export_locked(directory, workers):
+    # The largest tables first, so that they do not finish last
+    models = sorted(
+        snapshot_models(),
+        key=lambda model: -(estimate_count(model._base_manager.all()) or 0)
+    )
+    labels = [model._meta.label for model in models]
+    parent = os.path.dirname(os.path.normpath(directory))
+    os.makedirs(parent, exist_ok=True)
+    temp = tempfile.mkdtemp(dir=parent, prefix='.snapshot-')
+    try:
+        if workers == 1:
+            with transaction.atomic():
+                counts = [export_table(label, temp) for label in labels]
+        else:
+            counts = export_parallel(labels, temp, workers)
+        replace(temp, directory)
+    except BaseException:
+        shutil.rmtree(temp, ignore_errors=True)
+        raise
+    return {
+        model._meta.db_table: count for model, count in zip(models, counts)
+    }
+
+
+@contextmanager
+def lock(directory):
+    """Hold the lock of the snapshot of directory, raising SnapshotRunning
+    when another export holds it"""
+    path = os.path.normpath(directory) + '.lock'
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise SnapshotRunning(
+                'A snapshot is already being exported to %s' % directory
+            )
+        yield
+
+
+def running(directory=None):
+    """Return whether a snapshot is being exported to directory"""
+    try:
+        with lock(directory or settings.SNAPSHOT_DIR):
+            return False
+    except SnapshotRunning:
+        return True
+
+
+def start():
+    """Export the snapshot in the background, through the export_snapshot
+    command: the pool is not forked from the current process and its
+    database connections stay open"""
+    return spawn([sys.executable, 'manage.py', 'export_snapshot'])
+
+
+def spawn(args):
+    """Start a command of the app in a session of its own, waited for by a
+    thread so that it leaves no zombie process once done"""
+    process = subprocess.Popen(
+        args,
+        cwd=settings.BASE_DIR,
+        start_new_session=True
+    )
+    threading.Thread(target=process.wait, daemon=True).start()
+    return process
+
+
+def export_parallel(labels, directory, workers):
+    # Forked workers must not share the connections of the parent, which
+    # opens its own once they are started
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    with context.Pool(min(workers, len(labels))) as pool:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ'
+                )
+                cursor.execute('SELECT pg_export_snapshot()')
+                snapshot, = cursor.fetchone()
+            # The snapshot lives as long as this transaction
+            return pool.starmap(
+                export_table,
+                [(label, directory, snapshot) for label in labels],
+                chunksize=1
+            )
+
+
+def replace(temp, directory):
+    """Move a complete snapshot in place of the previous one"""
+    old = None
+    if os.path.exists(directory):
+        old = tempfile.mkdtemp(
+            dir=os.path.dirname(os.path.normpath(directory)),
+            prefix='.snapshot-old-'
+        )
+        os.rename(directory, os.path.join(old, 'snapshot'))
+    os.rename(temp, directory)
+    if old is not None:
+        shutil.rmtree(old)
+
+
+def file_path(name, directory=None):
+    """Return the path of a file of the current snapshot, None for any
+    other name"""
+    directory = directory or settings.SNAPSHOT_DIR
+    if name not in files(directory):
+        return None
+    return os.path.join(directory, name)
+
+
+def files(directory=None):
+    """Return the names of the files of the current snapshot"""
+    directory = directory or settings.SNAPSHOT_DIR
+    try:
+        return sorted(
+            name for name in os.listdir(directory)
+            if name.endswith('.parquet')
+        )
+    except FileNotFoundError:
+        return []
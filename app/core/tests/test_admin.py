@@ -39,3 +39,10 @@ class AdminSiteTest(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+    def test_place_changelist_page(self):
+        """Test the estimated count changelist works"""
+        url = reverse('admin:core_place_changelist')
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
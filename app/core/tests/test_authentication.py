@@ -0,0 +1,81 @@
+from django.test import TestCase
+
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.authentication import (
+    CachedTokenAuthentication,
+    TokenCache,
+    token_cache
+)
+from core.tests.test_models import sample_user
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test the in-memory cache of the token users"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = sample_user()
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_cached_token_no_query(self):
+        """Test a known token is authenticated without a query"""
+        self.auth.authenticate_credentials(self.token.key)
+
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token, self.token)
+        self.assertEqual(token_cache.stats()['hits'], 1)
+        self.assertEqual(token_cache.stats()['misses'], 1)
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token is not authenticated from the cache"""
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.token.delete()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_deactivated_user_rejected(self):
+        """Test a deactivated user is not authenticated from the cache"""
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_changed_user_reloaded(self):
+        """Test the cached user is reloaded after a change"""
+        self.auth.authenticate_credentials(self.token.key)
+
+        self.user.name = 'new name'
+        self.user.save()
+
+        user, _ = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user.name, 'new name')
+
+    def test_cache_bounded(self):
+        """Test the least recently used token is evicted"""
+        cache = TokenCache(size=2, ttl=60)
+        cache.set('a', 'token a', 1)
+        cache.set('b', 'token b', 1)
+        cache.get('a', 1)
+        cache.set('c', 'token c', 1)
+
+        self.assertIsNone(cache.get('b', 1))
+        self.assertEqual(cache.get('a', 1), 'token a')
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_cache_expires(self):
+        """Test entries are dropped after their time to live"""
+        cache = TokenCache(size=2, ttl=0)
+        cache.set('a', 'token a', 1)
+
+        self.assertIsNone(cache.get('a', 1))
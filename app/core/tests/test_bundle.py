@@ -0,0 +1,169 @@
+import gzip
+import json
+
+import brotli
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import bundle, models
+from core.tests.test_models import sample_insectSpecie, sample_town, \
+    sample_user
+from core.tests.test_versions import LOCAL_CACHE
+
+from place.views import PlaceTypeViewset
+
+
+BUNDLE_URL = reverse('bundle')
+
+
+class PublicBundleTests(TestCase):
+
+    def test_auth_required(self):
+        """Test authentification is required"""
+        res = APIClient().get(BUNDLE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(API_BUNDLE_BACKGROUND=False)
+class BundleTests(TestCase):
+    """Test the bundle of the reference tables"""
+
+    def setUp(self):
+        bundle.BUNDLE.content = None
+        self.client = APIClient()
+        self.client.force_authenticate(user=sample_user())
+
+    def get_tables(self, **headers):
+        res = self.client.get(BUNDLE_URL, **headers)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return json.loads(res.content)['tables']
+
+    def test_tables_as_listed(self):
+        """Test the tables hold the rows of their list endpoints"""
+        sample_insectSpecie()
+        sample_town()
+
+        tables = self.get_tables()
+
+        for key, url in (
+            ('insect/species', reverse('insect:insectspecies-list')),
+            ('place/town', reverse('place:town-list')),
+            ('plant/family', reverse('plant:plantfamilies-list')),
+        ):
+            self.assertEqual(tables[key], json.loads(
+                self.client.get(url).content
+            ))
+        self.assertNotIn('place/place', tables)
+
+    def test_precompressed(self):
+        """Test brotli is preferred to gzip and both hold the bundle"""
+        sample_town()
+        body = self.client.get(BUNDLE_URL).content
+
+        res = self.client.get(BUNDLE_URL, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(res.content), body)
+        res = self.client.get(BUNDLE_URL, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(res.content), body)
+        self.assertIn('Accept-Encoding', res['Vary'])
+
+    def test_served_from_memory(self):
+        """Test an unchanged bundle is sent without queries"""
+        self.client.get(BUNDLE_URL)
+
+        with self.assertNumQueries(0):
+            self.client.get(BUNDLE_URL)
+
+    def test_not_modified(self):
+        """Test a client holding the current version gets a 304"""
+        etag = self.client.get(BUNDLE_URL)['ETag']
+
+        res = self.client.get(BUNDLE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_etag_per_encoding(self):
+        """Test each content coding has its own ETag, matched exactly"""
+        etag = self.client.get(BUNDLE_URL)['ETag']
+        gzipped = self.client.get(
+            BUNDLE_URL,
+            HTTP_ACCEPT_ENCODING='gzip'
+        )['ETag']
+        self.assertNotEqual(gzipped, etag)
+
+        for header, code in [
+            (gzipped, status.HTTP_200_OK),
+            (etag[:-2] + '"', status.HTTP_200_OK),
+            ('"x%s' % etag[1:], status.HTTP_200_OK),
+            ('"other", %s' % etag, status.HTTP_304_NOT_MODIFIED),
+            ('W/' + etag, status.HTTP_304_NOT_MODIFIED),
+            ('*', status.HTTP_304_NOT_MODIFIED),
+        ]:
+            res = self.client.get(BUNDLE_URL, HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(res.status_code, code, header)
+
+    def test_new_version_on_change(self):
+        """Test a change of a reference table gives a new bundle"""
+        res = self.client.get(BUNDLE_URL)
+
+        town = sample_town()
+
+        new = self.client.get(BUNDLE_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(new.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(new['ETag'], res['ETag'])
+        self.assertEqual(
+            [row['id'] for row in json.loads(new.content)['tables'][
+                'place/town']],
+            [town.id]
+        )
+
+    def test_select_encoding(self):
+        """Test the codings and qualities of Accept-Encoding"""
+        self.assertEqual(bundle.select_encoding(''), 'identity')
+        self.assertEqual(bundle.select_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(bundle.select_encoding('br;q=0, gzip'), 'gzip')
+        self.assertEqual(bundle.select_encoding('*'), 'br')
+        self.assertEqual(bundle.select_encoding('deflate'), 'identity')
+
+
+class BackgroundBundleTests(TransactionTestCase):
+    """Test the bundle rebuilt in the background"""
+
+    def test_stale_while_rebuilding(self):
+        """Test the previous bundle is served until the new one is built"""
+        placeTypes = bundle.Bundle()
+        placeTypes.register('place/placetype', PlaceTypeViewset)
+        old = placeTypes.get()
+
+        models.PlaceType.objects.create(name='pitfall')
+
+        self.assertIs(placeTypes.get(), old)
+        placeTypes.thread.join()
+        new = placeTypes.get()
+        self.assertNotEqual(new.version, old.version)
+        self.assertIn(b'pitfall', new.encoded['identity'])
+
+    @override_settings(CACHES=LOCAL_CACHE)
+    def test_rebuilt_without_shared_cache(self):
+        """Test a cache local to the process keeps the bundle until a change
+        of this process or for a few seconds"""
+        placeTypes = bundle.Bundle()
+        placeTypes.register('place/placetype', PlaceTypeViewset)
+        old = placeTypes.get()
+        self.assertIs(placeTypes.get(), old)
+
+        models.PlaceType.objects.create(name='pitfall')
+
+        new = placeTypes.get()
+        self.assertIn(b'pitfall', new.encoded['identity'])
+        self.assertIsNone(placeTypes.thread)
+        with override_settings(API_BUNDLE_LOCAL_TTL=0):
+            placeTypes.rebuild(placeTypes.version())
+            self.assertIsNot(placeTypes.get(), placeTypes.get())
@@ -1,9 +1,13 @@
+from io import StringIO
 from unittest.mock import patch
 
 from django.core.management import call_command
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core import models
+from core.tests.test_models import sample_plantSpecie, sample_project
+
 
 class CommandTests(TestCase):
 
@@ -21,3 +25,29 @@ class CommandTests(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+    def test_rebuild_counters(self):
+        """Test counters drifted by bulk writes are repaired"""
+        specie = sample_plantSpecie()
+        models.PlantGenera.objects.update(speciesCount=42)
+
+        call_command('rebuild_counters', stdout=StringIO())
+
+        genus = models.PlantGenera.objects.get(id=specie.genus_id)
+        self.assertEqual(genus.speciesCount, 1)
+        self.assertEqual(
+            models.PlantFamilies.objects.get(id=genus.family_id).speciesCount,
+            1
+        )
+
+    def test_rebuild_project_access(self):
+        """Test accesses drifted by bulk writes are repaired"""
+        project = sample_project()
+        models.ProjectAccess.objects.all().delete()
+
+        call_command('rebuild_project_access', stdout=StringIO())
+
+        self.assertEqual(
+            list(models.ProjectAccess.objects.values_list('user', 'project')),
+            [(project.projectLeader_id, project.id)]
+        )
@@ -0,0 +1,156 @@
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import models
+from core.tests.test_models import sample_city, sample_country, \
+    sample_place, sample_project, sample_region, sample_town, sample_user
+from core.tests.test_versions import LOCAL_CACHE, run_elsewhere
+
+
+PLACE_URL = reverse('place:place-list')
+
+TOWN_URL = reverse('place:town-list')
+
+
+def detail_project_url(project_id):
+    return reverse('project:project-detail', args=[project_id])
+
+
+class ConditionalGetTests(TestCase):
+    """Test the ETags of the lists and objects"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_not_modified(self):
+        """Test a client holding the ETag gets a 304 without queries"""
+        sample_town()
+        res = self.client.get(TOWN_URL)
+        self.assertEqual(res['Cache-Control'], 'private, no-cache')
+
+        with self.assertNumQueries(0):
+            again = self.client.get(TOWN_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(again.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(again['ETag'], res['ETag'])
+        self.assertEqual(again.content, b'')
+
+    def test_modified_on_change(self):
+        """Test a change of the table gives a new ETag"""
+        town = sample_town()
+        etag = self.client.get(TOWN_URL)['ETag']
+
+        town.name = 'other town'
+        town.save()
+
+        res = self.client.get(TOWN_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(res.data[0]['name'], 'other town')
+
+    def test_etag_per_representation(self):
+        """Test queries, formats and users have their own ETags"""
+        etags = {
+            self.client.get(TOWN_URL)['ETag'],
+            self.client.get(TOWN_URL, {'name': 'x'})['ETag'],
+            self.client.get(TOWN_URL, {'format': 'csv'})['ETag'],
+        }
+        self.client.force_authenticate(
+            user=sample_user(email='other@ulb.ac.be')
+        )
+        etags.add(self.client.get(TOWN_URL)['ETag'])
+
+        self.assertEqual(len(etags), 4)
+
+    def test_no_etag_on_error(self):
+        """Test objects not found are sent without ETag"""
+        res = self.client.get(reverse('place:town-detail', args=[0]))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', res)
+
+    def test_copied_ancestors(self):
+        """Test moving a town changes the places filtered on its country"""
+        place = sample_place()
+        other = sample_country(name='other country')
+        url = '%s?country=%d' % (PLACE_URL, other.id)
+        etag = self.client.get(url)['ETag']
+
+        city = sample_city(
+            name='other city',
+            region=sample_region(name='other region', country=other)
+        )
+        town = models.Town.objects.get(pk=place.town_id)
+        town.city = city
+        town.save()
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in res.data], [place.id])
+
+    def test_many_to_many_change(self):
+        """Test adding a place to a project changes the project"""
+        project = sample_project(projectLeader=self.user)
+        place = sample_place()
+        url = detail_project_url(project.id)
+        etag = self.client.get(url)['ETag']
+
+        project.places.add(place)
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['places']), 1)
+
+    def test_access_change(self):
+        """Test a lost access is not answered by a 304"""
+        project = sample_project(projectLeader=self.user)
+        url = detail_project_url(project.id)
+        etag = self.client.get(url)['ETag']
+
+        project.projectLeader = sample_user(email='leader@ulb.ac.be')
+        project.save()
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(API_CONDITIONAL_GET=False)
+    def test_disabled(self):
+        """Test no ETag is sent when conditional requests are off"""
+        res = self.client.get(TOWN_URL)
+
+        self.assertNotIn('ETag', res)
+
+    @override_settings(CACHES=LOCAL_CACHE)
+    def test_no_etag_without_shared_cache(self):
+        """Test no ETag is sent when versions are local to the process"""
+        res = self.client.get(TOWN_URL)
+
+        self.assertNotIn('ETag', res)
+
+
+class SharedConditionalGetTests(TransactionTestCase):
+    """Test the ETags after changes made by other processes"""
+
+    def test_modified_in_other_process(self):
+        """Test a town renamed by another process gives a new ETag"""
+        client = APIClient()
+        client.force_authenticate(user=sample_user())
+        town = sample_town()
+        etag = client.get(TOWN_URL)['ETag']
+
+        run_elsewhere(
+            'from core.models import Town;'
+            'town = Town.objects.get(pk=%d);'
+            'town.name = "other town";'
+            'town.save()' % town.id
+        )
+
+        res = client.get(TOWN_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(res.data[0]['name'], 'other town')
@@ -0,0 +1,113 @@
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import fastread
+from core.tests.test_models import sample_insectSpecie, sample_place, \
+    sample_project, sample_user
+
+from place.serializers import PlaceDetailSerializer, PlaceSerializer
+from project.serializers import ProjectSerializer
+
+
+PLACE_URL = reverse('place:place-list')
+
+SPECIE_URL = reverse('insect:insectspecies-list')
+
+
+def detail_place_url(place_id):
+    return reverse('place:place-detail', args=[place_id])
+
+
+class FastReadTests(TestCase):
+    """Test lists and objects read without the serializers"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=sample_user())
+
+    def get_both(self, url, params=None):
+        """Return the bodies of a GET with and without the fast path"""
+        bodies = []
+        for fast in (True, False):
+            with override_settings(API_FAST_READ=fast):
+                res = self.client.get(url, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            bodies.append(res.content)
+        return bodies
+
+    def test_plain_serializers_only(self):
+        """Test the serializers rendering more than columns are left out"""
+        self.assertIsNotNone(fastread.build_plan(PlaceSerializer()))
+        self.assertIsNone(fastread.build_plan(PlaceDetailSerializer()))
+        self.assertIsNone(fastread.build_plan(ProjectSerializer()))
+
+    def test_list_identical(self):
+        """Test lists of decimals, nulls and foreign keys are identical"""
+        sample_place(latitudeDec=Decimal('50.8467123456'))
+        sample_place(name='other place', longitudeDec=Decimal('-4.1'))
+
+        fast, slow = self.get_both(PLACE_URL)
+
+        self.assertEqual(fast, slow)
+        self.assertIn(b'"latitudeDec":"50.8467123456"', fast)
+
+    def test_filtered_list_identical(self):
+        """Test the list filters apply to the fast path"""
+        specie = sample_insectSpecie()
+        sample_insectSpecie(name='other specie')
+
+        fast, slow = self.get_both(
+            SPECIE_URL,
+            {'under': 'genus:%d' % specie.genus_id, 'name': 'x'}
+        )
+
+        self.assertEqual(fast, slow)
+
+    def test_retrieve_identical(self):
+        """Test objects are identical and unknown ids not found"""
+        place = sample_place()
+
+        fast, slow = self.get_both(
+            reverse('place:town-detail', args=[place.town_id])
+        )
+
+        self.assertEqual(fast, slow)
+        res = self.client.get(reverse('place:town-detail', args=[0]))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_retrieve_invalid_id(self):
+        """Test ids that are not numbers are not found"""
+        for fast in (True, False):
+            with override_settings(API_FAST_READ=fast):
+                res = self.client.get(
+                    reverse('place:town-detail', args=['abc'])
+                )
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_queries(self):
+        """Test a fast list reads its rows with one query"""
+        for i in range(3):
+            sample_place(name='place %d' % i)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(PLACE_URL)
+
+        self.assertEqual(len(res.data), 3)
+
+    def test_object_permissions_kept(self):
+        """Test objects checked against the user still need access"""
+        project = sample_project(
+            projectLeader=sample_user(email='leader@ulb.ac.be')
+        )
+
+        res = self.client.get(
+            reverse('project:project-detail', args=[project.id])
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
@@ -83,11 +83,13 @@ def sample_project(name='test project', projectLeader=None):
 def sample_place(
                     name='test place',
                     type=None,
-                    codeSite='code site',
+                    codeSite=None,
                     latitudeDec=11.2,
                     longitudeDec=-32.99,
                     town=None,
                 ):
+    if codeSite is None:
+        codeSite = 'code %s' % name
     if type is None:
         type = sample_placeType()
     if town is None:
@@ -209,3 +211,150 @@ class ModelTests(TestCase):
         baseModel = sample_plantFamily()
 
         self.assertEqual(str(baseModel), baseModel.name)
+
+    def test_insect_taxonomy_path(self):
+        """Test insect ranks store the ids of their ancestors"""
+        specie = sample_insectSpecie()
+        genus = specie.genus
+        tribe = genus.tribe
+        subFamily = tribe.subFamily
+        family = subFamily.family
+        superFamily = family.superFamily
+
+        self.assertEqual(
+            specie.path,
+            '%d/%d/%d/%d/%d/%d/' % (
+                superFamily.id,
+                family.id,
+                subFamily.id,
+                tribe.id,
+                genus.id,
+                specie.id
+            )
+        )
+
+    def test_insect_taxonomy_path_reparent(self):
+        """Test moving a rank rewrites the path of its descendants"""
+        specie = sample_insectSpecie()
+        subFamily = specie.genus.tribe.subFamily
+        otherFamily = sample_insectFamily(name='other family')
+
+        subFamily.family = otherFamily
+        subFamily.save()
+
+        specie.refresh_from_db()
+        self.assertTrue(specie.path.startswith(otherFamily.path))
+        self.assertEqual(
+            models.InsectSpecies.objects.filter(
+                path__startswith=otherFamily.path
+            ).get(),
+            specie
+        )
+
+    def test_insect_taxonomy_path_stale_instances(self):
+        """Test paths are read from the database, not from instances
+        loaded before their ancestors moved"""
+        genus = sample_insectGenus()
+        tribe = models.InsectTribes.objects.get(pk=genus.tribe_id)
+        tribe.subFamily = sample_insectSubFamily(name='other sub family')
+        tribe.save()
+
+        specie = sample_insectSpecie(insectGen=genus)
+        genus.name = 'renamed genus'
+        genus.save()
+
+        genus.refresh_from_db()
+        self.assertTrue(genus.path.startswith(tribe.path))
+        self.assertEqual(specie.path, '%s%d/' % (genus.path, specie.id))
+
+    def test_species_counters(self):
+        """Test species counters follow creation, reparent and deletion"""
+        specie = sample_insectSpecie()
+        genus = specie.genus
+        family = genus.tribe.subFamily.family
+        sample_insectSpecie(name='test specie 2', insectGen=genus)
+        otherGenus = sample_insectGenus(name='other genus')
+
+        genus.refresh_from_db()
+        family.refresh_from_db()
+        self.assertEqual(genus.speciesCount, 2)
+        self.assertEqual(family.speciesCount, 2)
+
+        specie.genus = otherGenus
+        specie.save()
+        specie.refresh_from_db()
+        specie.delete()
+
+        genus.refresh_from_db()
+        otherGenus.refresh_from_db()
+        family.refresh_from_db()
+        self.assertEqual(genus.speciesCount, 1)
+        self.assertEqual(otherGenus.speciesCount, 0)
+        self.assertEqual(family.speciesCount, 1)
+
+    def test_places_counters_rank_reparent(self):
+        """Test moving a city moves its places count between regions"""
+        place = sample_place()
+        city = place.town.city
+        region = city.region
+        otherRegion = sample_region(name='other region')
+
+        city.region = otherRegion
+        city.save()
+
+        region.refresh_from_db()
+        otherRegion.refresh_from_db()
+        self.assertEqual(region.placesCount, 0)
+        self.assertEqual(otherRegion.placesCount, 1)
+        self.assertEqual(
+            models.Country.objects.get(id=region.country_id).placesCount,
+            1
+        )
+
+    def test_place_ancestry_follows_reparent(self):
+        """Test places keep the ancestors of their town after a move"""
+        place = sample_place()
+        city = place.town.city
+        otherCountry = sample_country(name='other country')
+        otherRegion = sample_region(name='other region', country=otherCountry)
+
+        self.assertEqual(place.region_id, city.region_id)
+
+        city.region = otherRegion
+        city.save()
+
+        place.refresh_from_db()
+        self.assertEqual(place.city_id, city.id)
+        self.assertEqual(place.region_id, otherRegion.id)
+        self.assertEqual(place.country_id, otherCountry.id)
+
+    def test_project_access_follows_memberships(self):
+        """Test the access index holds the leader and the active members"""
+        leader = sample_user(email='leader@ulb.ac.be')
+        member = sample_user(email='member@ulb.ac.be')
+        project = sample_project(projectLeader=leader)
+
+        def accessible(user):
+            return list(models.Project.objects.accessible_by(user))
+
+        membership = models.ProjectMembership.objects.create(
+            user=member,
+            project=project,
+            is_active=False
+        )
+        self.assertEqual(accessible(leader), [project])
+        self.assertEqual(accessible(member), [])
+
+        membership.is_active = True
+        membership.save()
+        self.assertEqual(accessible(member), [project])
+
+        project.projectLeader = member
+        project.save()
+        self.assertEqual(accessible(leader), [])
+
+        membership.delete()
+        self.assertEqual(accessible(member), [project])
+
+        project.delete()
+        self.assertFalse(models.ProjectAccess.objects.exists())
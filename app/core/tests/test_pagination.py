@@ -0,0 +1,162 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+from rest_framework import status
+
+from core import models
+from core.pagination import EstimatedCountPaginator, KeysetPagination, \
+    estimate_count
+from core.tests.test_models import sample_placeType, sample_user
+
+
+PLACETYPE_URL = reverse('place:placetype-list')
+
+
+class KeysetPaginationTests(TestCase):
+    """Test the opt-in cursor pagination of the list endpoints"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        for name in ['b', 'a', 'c', 'a', 'b']:
+            models.PlaceType.objects.create(name=name)
+
+    def test_list_not_paginated_by_default(self):
+        """Test lists stay plain when no pagination is asked"""
+        res = self.client.get(PLACETYPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 5)
+
+    def test_walk_all_pages(self):
+        """Test following next links returns every row in (name, id) order"""
+        expected = list(
+            models.PlaceType.objects.order_by('name', 'id')
+            .values_list('id', flat=True)
+        )
+        seen = []
+        url = PLACETYPE_URL + '?paginate=cursor&page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data['results']), 2)
+            seen += [item['id'] for item in res.data['results']]
+            url = res.data['next']
+
+        self.assertEqual(seen, expected)
+
+    def test_previous_link(self):
+        """Test the previous link returns the page before"""
+        res = self.client.get(PLACETYPE_URL + '?paginate=cursor&page_size=2')
+        first_page = res.data['results']
+        self.assertIsNone(res.data['previous'])
+
+        res = self.client.get(res.data['next'])
+        res = self.client.get(res.data['previous'])
+
+        self.assertEqual(res.data['results'], first_page)
+
+    def test_cursor_stable_after_insert(self):
+        """Test rows inserted before the cursor do not shift the next page"""
+        res = self.client.get(PLACETYPE_URL + '?paginate=cursor&page_size=2')
+        next_url = res.data['next']
+        expected = self.client.get(next_url).data['results']
+
+        sample_placeType(name='0 first')
+        res = self.client.get(next_url)
+
+        self.assertEqual(res.data['results'], expected)
+
+    def test_page_is_index_range(self):
+        """Test the rows past the cursor are one range of the (name, id)
+        index"""
+        first = models.PlaceType.objects.order_by('name', 'id').first()
+        queryset = KeysetPagination().after(
+            models.PlaceType.objects.order_by('name', 'id'),
+            (first.name, first.id)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+        plan = queryset.explain()
+
+        self.assertIn('Index Cond: (ROW(', plan)
+        self.assertEqual(
+            list(queryset),
+            list(models.PlaceType.objects.order_by('name', 'id')[1:])
+        )
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor returns 404"""
+        res = self.client.get(PLACETYPE_URL + '?paginate=cursor&cursor=abc')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class EstimatedCountPaginationTests(TestCase):
+    """Test the page number pagination with estimated counts"""
+
+    def setUp(self):
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        for i in range(5):
+            sample_placeType(name='type %d' % i)
+
+    def test_page_small_table_exact_count(self):
+        """Test small tables report their exact count"""
+        res = self.client.get(PLACETYPE_URL + '?paginate=page&page_size=2')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 5)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    @patch('core.pagination.estimate_count', return_value=50000)
+    def test_page_large_table_estimated(self, estimate):
+        """Test unfiltered large tables use the catalog estimate"""
+        res = self.client.get(PLACETYPE_URL + '?paginate=page&page_size=2')
+
+        self.assertEqual(res.data['count'], 50000)
+        self.assertEqual(estimate.call_count, 1)
+
+    @patch('core.pagination.estimate_count', return_value=3)
+    @override_settings(API_ESTIMATED_COUNT_THRESHOLD=0)
+    def test_pages_past_low_estimate(self, estimate):
+        """Test the pages past an estimate below the real count are found"""
+        url = PLACETYPE_URL + '?paginate=page&page_size=2'
+        res = self.client.get(url + '&page=2')
+
+        self.assertEqual(res.data['count'], 5)
+        self.assertIsNotNone(res.data['next'])
+
+        res = self.client.get(url + '&page=3')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertIsNone(res.data['next'])
+        res = self.client.get(url + '&page=4')
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_estimate_skipped_when_filtered(self):
+        """Test filtered querysets are never estimated"""
+        queryset = models.PlaceType.objects.filter(name='type 1')
+
+        self.assertIsNone(estimate_count(queryset))
+
+    @override_settings(API_ESTIMATED_COUNT_THRESHOLD=0)
+    def test_estimate_reads_catalog(self):
+        """Test the estimate comes from pg_class once the table is analyzed"""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_placetype')
+        paginator = EstimatedCountPaginator(
+                models.PlaceType.objects.order_by('id'),
+                2
+            )
+
+        self.assertEqual(paginator.count, 5)
@@ -0,0 +1,124 @@
+import json
+from decimal import Decimal
+
+import msgpack
+
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import models
+from core.renderers import to_columns
+from core.tests.test_models import create_superuser, sample_place, \
+    sample_user
+
+
+PLACE_URL = reverse('place:place-list')
+
+PLACETYPE_URL = reverse('place:placetype-list')
+
+
+class MessagePackTests(TestCase):
+    """Test MessagePack negotiation"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=sample_user())
+
+    def test_list_msgpack(self):
+        """Test lists are sent as MessagePack on request, with the values
+        of the JSON responses"""
+        sample_place(latitudeDec=Decimal('50.8467123456'))
+        sample_place(name='other place')
+
+        res = self.client.get(PLACE_URL, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        self.assertEqual(
+            msgpack.unpackb(res.content, raw=False),
+            json.loads(self.client.get(PLACE_URL).content)
+        )
+
+    def test_list_columns(self):
+        """Test lists are sent as arrays of columns with ?layout=columns"""
+        place = sample_place()
+        other = sample_place(name='other place')
+
+        res = self.client.get(
+            PLACE_URL,
+            {'format': 'msgpack', 'layout': 'columns'}
+        )
+
+        data = msgpack.unpackb(res.content, raw=False)
+        self.assertEqual(data['id'], [place.id, other.id])
+        self.assertEqual(data['codeSite'], [place.codeSite, other.codeSite])
+
+    def test_paginated_columns(self):
+        """Test the results of a page are sent as columns"""
+        place = sample_place()
+
+        res = self.client.get(PLACE_URL, {
+            'format': 'msgpack',
+            'layout': 'columns',
+            'paginate': 'page'
+        })
+
+        data = msgpack.unpackb(res.content, raw=False)
+        self.assertEqual(data['results']['id'], [place.id])
+        self.assertEqual(data['count'], 1)
+
+    def test_errors_msgpack(self):
+        """Test errors are sent as MessagePack too"""
+        res = self.client.post(
+            PLACETYPE_URL,
+            {},
+            HTTP_ACCEPT='application/msgpack'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertIn('detail', msgpack.unpackb(res.content, raw=False))
+
+    def test_to_columns(self):
+        """Test missing keys are null and non object lists kept"""
+        self.assertEqual(
+            to_columns([{'a': 1}, {'a': 2, 'b': 3}]),
+            {'a': [1, 2], 'b': [None, 3]}
+        )
+        self.assertEqual(to_columns([1, 2]), [1, 2])
+
+
+class MessagePackParserTests(TestCase):
+    """Test MessagePack request bodies"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=create_superuser(
+            email='admin@ulb.ac.be',
+            password='test123'
+        ))
+
+    def test_create_msgpack(self):
+        """Test objects can be created from a MessagePack body"""
+        res = self.client.post(
+            PLACETYPE_URL,
+            msgpack.packb({'name': 'pitfall'}, use_bin_type=True),
+            content_type='application/msgpack'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(
+            models.PlaceType.objects.filter(name='pitfall').exists()
+        )
+
+    def test_invalid_msgpack(self):
+        """Test a malformed body is a bad request"""
+        res = self.client.post(
+            PLACETYPE_URL,
+            b'\xc1',
+            content_type='application/msgpack'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
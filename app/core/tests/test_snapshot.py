@@ -0,0 +1,227 @@
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
+
+from django.conf import settings
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import snapshot
+from core.tests.test_models import create_superuser, sample_insectSpecie, \
+    sample_place, sample_project, sample_user
+
+
+SNAPSHOT_URL = reverse('core:snapshot')
+
+
+def file_url(name):
+    return reverse('core:snapshot-file', args=[name])
+
+
+class SnapshotTests(TestCase):
+    """Test the Parquet snapshot of the core tables"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'snapshot')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self, table):
+        return pq.read_table(
+            os.path.join(self.path, table + '.parquet')
+        ).to_pydict()
+
+    def test_export_every_table(self):
+        """Test every core table is written with its row count"""
+        sample_project()
+
+        counts = snapshot.export(self.path, workers=1)
+
+        self.assertEqual(
+            sorted(counts),
+            sorted(
+                model._meta.db_table for model in snapshot.snapshot_models()
+            )
+        )
+        self.assertEqual(counts['core_project'], 1)
+        self.assertEqual(
+            sorted(os.listdir(self.path)),
+            sorted(table + '.parquet' for table in counts)
+        )
+
+    def test_foreign_keys_and_names(self):
+        """Test foreign keys are exported as ids next to related names"""
+        specie = sample_insectSpecie()
+
+        snapshot.export(self.path, workers=1)
+
+        species = self.read('core_insectspecies')
+        self.assertEqual(species['id'], [specie.id])
+        self.assertEqual(species['genus'], [specie.genus_id])
+        self.assertEqual(species['genus_name'], [specie.genus.name])
+        self.assertEqual(species['godfather_name'], [specie.godfather.name])
+
+    def test_column_types(self):
+        """Test decimals stay exact"""
+        place = sample_place(latitudeDec=Decimal('50.8467123456'))
+
+        snapshot.export(self.path, workers=1)
+
+        places = self.read('core_place')
+        self.assertEqual(places['latitudeDec'], [Decimal('50.8467123456')])
+        self.assertEqual(places['town_name'], [place.town.name])
+
+    def test_users_id_and_name_only(self):
+        """Test only the ids and names of the users are exported"""
+        user = sample_user()
+
+        snapshot.export(self.path, workers=1)
+
+        self.assertEqual(
+            self.read('core_user'),
+            {'id': [user.id], 'name': [user.name]}
+        )
+
+    def test_export_replaces_previous(self):
+        """Test a new snapshot replaces the files of the previous one"""
+        os.makedirs(self.path)
+        open(os.path.join(self.path, 'stale.parquet'), 'w').close()
+
+        snapshot.export(self.path, workers=1)
+
+        self.assertNotIn('stale.parquet', os.listdir(self.path))
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            ['snapshot', 'snapshot.lock']
+        )
+
+    def test_background_process_reaped(self):
+        """Test a background export is waited for once done"""
+        process = snapshot.spawn([sys.executable, '-c', ''])
+
+        deadline = time.monotonic() + 10
+        while process.returncode is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        self.assertEqual(process.returncode, 0)
+
+
+class ParallelSnapshotTests(TransactionTestCase):
+    """Test the snapshot written by worker processes"""
+
+    def test_export_parallel(self):
+        """Test workers export the committed rows"""
+        project = sample_project()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'snapshot')
+
+        counts = snapshot.export(path, workers=2)
+
+        self.assertEqual(counts['core_project'], 1)
+        projects = pq.read_table(
+            os.path.join(path, 'core_project.parquet')
+        ).to_pydict()
+        self.assertEqual(projects['projectLeader'], [project.projectLeader_id])
+
+
+class SnapshotApiTests(TestCase):
+    """Test the snapshot endpoint"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.directory = tempfile.mkdtemp()
+        self.settings = override_settings(
+            MEDIA_ROOT=self.media,
+            SNAPSHOT_DIR=os.path.join(self.directory, 'snapshot'),
+            SNAPSHOT_WORKERS=1
+        )
+        self.settings.enable()
+        self.client = APIClient()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media)
+        shutil.rmtree(self.directory)
+
+    def test_staff_required(self):
+        """Test only staff can export snapshots or download their files"""
+        snapshot.export(workers=1)
+        self.client.force_authenticate(sample_user())
+
+        res = self.client.post(SNAPSHOT_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        res = self.client.get(file_url('core_project.parquet'))
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    @patch('core.snapshot.start')
+    def test_export_snapshot(self, start):
+        """Test staff can start a snapshot and list its files"""
+        self.client.force_authenticate(create_superuser(
+            email='admin@ulb.ac.be',
+            password='test123'
+        ))
+        snapshot.export(workers=1)
+
+        res = self.client.post(SNAPSHOT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        start.assert_called_once_with()
+        self.assertIn(file_url('core_project.parquet'), res.data['files'])
+        self.assertFalse(os.listdir(self.media))
+        res = self.client.get(SNAPSHOT_URL)
+        self.assertFalse(res.data['running'])
+        self.assertEqual(
+            len(res.data['files']),
+            len(snapshot.snapshot_models())
+        )
+
+    @patch('core.snapshot.start')
+    def test_export_running(self, start):
+        """Test no snapshot is started while another is being exported"""
+        self.client.force_authenticate(create_superuser(
+            email='admin@ulb.ac.be',
+            password='test123'
+        ))
+
+        with snapshot.lock(settings.SNAPSHOT_DIR):
+            self.assertTrue(self.client.get(SNAPSHOT_URL).data['running'])
+            res = self.client.post(SNAPSHOT_URL)
+            with self.assertRaises(snapshot.SnapshotRunning):
+                snapshot.export(workers=1)
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        start.assert_not_called()
+        self.assertEqual(snapshot.files(), [])
+
+    def test_download_file(self):
+        """Test staff can download the files of the snapshot only"""
+        self.client.force_authenticate(create_superuser(
+            email='admin@ulb.ac.be',
+            password='test123'
+        ))
+        sample_project()
+        snapshot.export(workers=1)
+
+        res = self.client.get(file_url('core_project.parquet'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        projects = pq.read_table(
+            io.BytesIO(b''.join(res.streaming_content))
+        ).to_pydict()
+        self.assertEqual(len(projects['id']), 1)
+        for name in ['missing.parquet', '..', '.snapshot-lock']:
+            res = self.client.get(file_url(name))
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
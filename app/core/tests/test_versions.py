@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import models
+from core.tests.test_models import sample_insectGenus, \
+    sample_insectSpecie, sample_user
+from core.versions import bump_version, get_versions
+
+
+LOCAL_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+
+def run_elsewhere(code):
+    """Run Python code in another process of the app, on the test
+    database"""
+    subprocess.run(
+        [sys.executable, 'manage.py', 'shell', '-c', code],
+        cwd=settings.BASE_DIR,
+        env=dict(os.environ, DB_NAME=connection.settings_dict['NAME']),
+        check=True
+    )
+
+
+class VersionTests(TestCase):
+    """Test the change versions of the models"""
+
+    def test_bumped_on_change(self):
+        """Test a save gives the model a new version"""
+        version = get_versions(models.PlaceType)
+
+        models.PlaceType.objects.create(name='pitfall')
+
+        self.assertNotEqual(get_versions(models.PlaceType), version)
+        self.assertEqual(
+            get_versions(models.PlaceType),
+            get_versions(models.PlaceType)
+        )
+
+    @override_settings(CACHES=LOCAL_CACHE)
+    def test_local_cache_not_trusted(self):
+        """Test a cache local to the process never gives the same version
+        twice"""
+        bump_version(models.PlaceType)
+
+        self.assertNotEqual(
+            get_versions(models.PlaceType),
+            get_versions(models.PlaceType)
+        )
+
+
+class SharedVersionTests(TransactionTestCase):
+    """Test the versions bumped on commit and by other processes"""
+
+    def test_counters_bumped_on_commit(self):
+        """Test counters adjusted in a transaction get a new version once
+        committed"""
+        genus = sample_insectGenus()
+
+        with transaction.atomic():
+            sample_insectSpecie(insectGen=genus)
+            version = get_versions(models.InsectSuperFamilies)
+
+        self.assertNotEqual(get_versions(models.InsectSuperFamilies), version)
+
+    def test_change_in_other_process(self):
+        """Test the tree shows a rank created by another process"""
+        client = APIClient()
+        client.force_authenticate(user=sample_user())
+        url = reverse('insect:tree')
+        self.assertEqual(client.get(url).json(), [])
+
+        run_elsewhere(
+            'from core.models import InsectSuperFamilies;'
+            'InsectSuperFamilies.objects.create(name="Apoidea")'
+        )
+
+        self.assertEqual(
+            [node['name'] for node in client.get(url).json()],
+            ['Apoidea']
+        )
@@ -0,0 +1,79 @@
+import threading
+
+from rest_framework.renderers import JSONRenderer
+
+from core.versions import get_versions
+
+
+class Level:
+    """One rank of a tree: its model, the foreign key to the rank above,
+    the key its rows are nested under and the extra fields to return"""
+
+    def __init__(self, model, parent_field=None, children_key=None,
+                 fields=()):
+        self.model = model
+        self.parent_field = parent_field
+        self.children_key = children_key
+        self.fields = tuple(fields)
+
+
+class ModelTree:
+    """Nested tree over a chain of models linked by foreign keys.
+    It is built with one query per level, rendered as JSON once and kept in
+    memory until one of the models changes version."""
+
+    def __init__(self, *levels):
+        self.levels = levels
+        self.models = [level.model for level in levels]
+        self._lock = threading.Lock()
+        self._version = None
+        self._data = None
+        self._json = None
+
+    def current(self):
+        """Return the (tree, JSON bytes), rebuilding them if any level
+        changed"""
+        version = get_versions(*self.models)
+        with self._lock:
+            if self._version == version:
+                return self._data, self._json
+        data = self.build()
+        content = JSONRenderer().render(data)
+        with self._lock:
+            self._version = version
+            self._data = data
+            self._json = content
+        return data, content
+
+    def get(self):
+        """Return the tree"""
+        return self.current()[0]
+
+    def get_json(self):
+        """Return the tree rendered as JSON"""
+        return self.current()[1]
+
+    def build(self):
+        roots = []
+        parents = None
+        parent_key = None
+        for level in self.levels:
+            fields = ('id', 'name') + level.fields
+            columns = fields
+            if level.parent_field is not None:
+                columns += (level.parent_field + '_id',)
+            rows = level.model.objects.order_by('name', 'id') \
+                .values_list(*columns)
+            nodes = {}
+            for row in rows:
+                node = dict(zip(fields, row))
+                if level.children_key is not None:
+                    node[level.children_key] = []
+                if parents is None:
+                    roots.append(node)
+                elif row[-1] in parents:
+                    parents[row[-1]][parent_key].append(node)
+                nodes[node['id']] = node
+            parents = nodes
+            parent_key = level.children_key
+        return roots
@@ -0,0 +1,15 @@
+from django.urls import path
+
+from core import views
+
+
+app_name = 'core'
+
+urlpatterns = [
+    path('snapshot/', views.SnapshotView.as_view(), name='snapshot'),
+    path(
+        'snapshot/<str:name>',
+        views.SnapshotFileView.as_view(),
+        name='snapshot-file'
+    ),
+]
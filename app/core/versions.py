@@ -0,0 +1,98 @@
+import uuid
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from rest_framework import serializers
+
+
+def version_key(model):
+    """Return the cache key holding the change version of a model"""
+    return 'core:version:%s' % model._meta.label_lower
+
+
+def is_shared():
+    """Return whether the cache is shared by the processes of the app.
+    Versions kept by one process would miss the changes of the others."""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def get_versions(*models):
+    """Return the current change version of each model.
+    Versions are random tokens rather than counters, so a lost or evicted
+    key can never come back with a value that was already handed out.
+    Without a shared cache every call returns new versions, so nothing
+    checked against them is ever reused."""
+    if not is_shared():
+        return tuple(uuid.uuid4().hex for model in models)
+    return local_versions(*models)
+
+
+def local_versions(*models):
+    """Return the change version of each model held by the cache as is.
+    Without a shared cache they only follow the changes of this process,
+    so what is kept against them must also expire."""
+    keys = [version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return tuple(versions[key] for key in keys)
+
+
+def bump_version(model):
+    """Give a model a new change version"""
+    cache.set(version_key(model), uuid.uuid4().hex, None)
+
+
+def model_changed(sender, **kwargs):
+    """Signal receiver bumping the version of the changed model.
+    The version is bumped again on commit so that nothing cached by a
+    concurrent request before the commit survives it."""
+    bump_version(sender)
+    transaction.on_commit(lambda: bump_version(sender))
+
+
+def models_migrated(sender, **kwargs):
+    """Signal receiver giving every model of a migrated or flushed app a
+    new version, its rows and their ids may have changed"""
+    for model in sender.get_models(include_auto_created=True):
+        bump_version(model)
+
+
+def relation_changed(sender, instance, action, model, **kwargs):
+    """Signal receiver bumping the versions of a changed many to many
+    relation, its through model and the models on both sides"""
+    if action.startswith('post_'):
+        for changed in (sender, type(instance), model):
+            model_changed(changed)
+
+
+# Models rendered by each serializer class
+_rendered = {}
+
+
+def rendered_models(serializer):
+    """Return the models whose rows a serializer renders: its own and the
+    ones of its nested serializers and of the relations rendered by more
+    than their ids"""
+    key = type(serializer)
+    if key not in _rendered:
+        models = {serializer.Meta.model}
+        for field in serializer.fields.values():
+            if isinstance(field, serializers.ListSerializer):
+                field = field.child
+            if isinstance(field, serializers.ManyRelatedField):
+                field = field.child_relation
+            if isinstance(field, serializers.ModelSerializer):
+                models.update(rendered_models(field))
+            elif isinstance(field, serializers.RelatedField) \
+                    and not isinstance(
+                        field, serializers.PrimaryKeyRelatedField) \
+                    and field.queryset is not None:
+                models.add(field.queryset.model)
+        _rendered[key] = sorted(models, key=lambda model: model._meta.label)
+    return _rendered[key]
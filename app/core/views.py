@@ -1,14 +1,378 @@
-from rest_framework import viewsets, authentication, permissions
+import hashlib
 
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.http import FileResponse, Http404, HttpResponse, \
+    HttpResponseNotModified, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, \
+    patch_vary_headers
 
-class BasePermissionsViewset(viewsets.ModelViewSet):
+from rest_framework import generics, viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from core import bulk, bundle, export, fastread, snapshot
+from core.authentication import CachedTokenAuthentication
+from core.pagination import PaginationModeMixin
+from core.renderers import MessagePackRenderer
+from core.versions import get_versions, is_shared, rendered_models
+
+
+def parse_id(value):
+    """Return the id written in a query parameter, None unless it is made
+    of decimal digits and fits the 32 bit integer ids"""
+    if not value.isdecimal():
+        return None
+    value = int(value)
+    return value if value < 2 ** 31 else None
+
+
+class BasePermissionsViewset(PaginationModeMixin, viewsets.ModelViewSet):
     """Base viewset to manage models. \
         Admin can create/update, user can list/retrieve"""
-    authentication_classes = (authentication.TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
+    renderer_classes = tuple(api_settings.DEFAULT_RENDERER_CLASSES) + (
+        export.CSVRenderer,
+    )
+    # Models read by list and retrieve besides the ones their serializer
+    # renders, e.g. the ones their queryset is filtered on
+    version_models = ()
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', ]:
+        if self.action in ['list', 'retrieve', 'lookup', ]:
             self.permission_classes = [permissions.IsAuthenticated, ]
-        if self.action in ['create', 'update', 'partial_update', ]:
+        if self.action in [
+            'create',
+            'update',
+            'partial_update',
+            'bulk_create',
+            'bulk_update',
+            'upsert',
+        ]:
             self.permission_classes = [permissions.IsAdminUser, ]
         return [permission() for permission in self.permission_classes]
+
+    def list(self, request, *args, **kwargs):
+        not_modified = self.get_not_modified()
+        if not_modified is not None:
+            return not_modified
+        if request.accepted_renderer.format == export.CSVRenderer.format:
+            return self.export_csv()
+        plan = self.get_fast_plan()
+        if plan is not None and self.paginator is None:
+            return Response(fastread.represent(
+                self.filter_queryset(self.get_queryset()),
+                plan
+            ))
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        not_modified = self.get_not_modified()
+        if not_modified is not None:
+            return not_modified
+        plan = self.get_fast_plan()
+        if plan is None or self.needs_instance():
+            return super().retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            data = fastread.represent(queryset.filter(**{
+                self.lookup_field: self.kwargs[lookup_url_kwarg]
+            }), plan)
+        except (TypeError, ValueError, DjangoValidationError):
+            data = None
+        if not data:
+            raise Http404
+        return Response(data[0])
+
+    def get_etag(self):
+        """Return the strong ETag of the response, derived from the change
+        versions of the models it is read from, or None. Versions only
+        hold across processes in a shared cache, which ETags need."""
+        if not settings.API_CONDITIONAL_GET or not is_shared():
+            return None
+        versions = get_versions(*(
+            rendered_models(self.get_serializer())
+            + list(self.version_models)
+        ))
+        request = self.request
+        key = '\n'.join(versions + (
+            str(request.user.pk),
+            request.accepted_media_type,
+            request.get_full_path(),
+        ))
+        return '"%s"' % hashlib.sha1(key.encode()).hexdigest()[:20]
+
+    def get_not_modified(self):
+        """Return a 304 when the client already holds the current response,
+        before reading the queryset"""
+        self.etag = self.get_etag()
+        if self.etag is None:
+            return None
+        return get_conditional_response(self.request, etag=self.etag)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request,
+            response,
+            *args,
+            **kwargs
+        )
+        etag = getattr(self, 'etag', None)
+        if etag is not None and response.status_code in (
+            status.HTTP_200_OK,
+            status.HTTP_304_NOT_MODIFIED,
+        ):
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+            patch_vary_headers(response, ('Accept', ))
+        return response
+
+    def needs_instance(self):
+        """Return whether retrieving needs the model instance, for object
+        permissions or a custom get_object"""
+        if type(self).get_object is not generics.GenericAPIView.get_object:
+            return True
+        return any(
+            type(permission).has_object_permission
+            is not permissions.BasePermission.has_object_permission
+            for permission in self.get_permissions()
+        )
+
+    def get_fast_plan(self):
+        """Return how to read the rows of the JSON responses of list and
+        retrieve without the serializer, or None"""
+        if not settings.API_FAST_READ or type(self.request.accepted_renderer) \
+                not in (JSONRenderer, MessagePackRenderer):
+            return None
+        return fastread.get_plan(self.get_serializer())
+
+    def export_csv(self):
+        """Stream the objects matching the list filters as CSV, with the
+        names of the related objects instead of their ids on ?names=true"""
+        names = self.request.query_params.get('names') in ('1', 'true')
+        queryset = self.filter_queryset(self.get_queryset())
+        response = StreamingHttpResponse(
+            export.stream_csv(
+                queryset,
+                export.columns(self.get_serializer(), names)
+            ),
+            content_type='text/csv; charset=utf-8'
+        )
+        response['Content-Disposition'] = 'attachment; filename="%s.csv"' \
+            % queryset.model._meta.model_name
+        return response
+
+    def get_bulk_items(self):
+        items = self.request.data
+        if not isinstance(items, list):
+            raise ValidationError('Expected a list of items.')
+        if len(items) > settings.API_BULK_MAX_SIZE:
+            raise ValidationError(
+                'At most %d items are accepted.' % settings.API_BULK_MAX_SIZE
+            )
+        return items
+
+    @action(methods=['post'], detail=False, url_path='bulk', url_name='bulk')
+    def bulk_create(self, request):
+        """Create the objects of a list in one transaction, or none of them
+        and return the errors of every item"""
+        items = self.get_bulk_items()
+        serializer = self.get_serializer()
+        bulk.preload(serializer, items)
+        rows, errors = bulk.validate(serializer, items)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        objs = bulk.create(serializer.Meta.model, rows)
+        return Response(
+            self.get_serializer(objs, many=True).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request):
+        """Partially update the objects of a list, identified by their id,
+        in one transaction, or none of them and return the errors of every
+        item"""
+        items = self.get_bulk_items()
+        ids = [item.get('id') for item in items if isinstance(item, dict)]
+        found = self.get_queryset().in_bulk(
+            [pk for pk in ids if isinstance(pk, int)]
+        )
+        instances = []
+        missing = []
+        for item in items:
+            pk = item.get('id') if isinstance(item, dict) else None
+            instance = found.pop(pk, None) if isinstance(pk, int) else None
+            instances.append(instance)
+            if instance is None:
+                missing.append({'id': ['Unknown or repeated id.']})
+            else:
+                missing.append({})
+        serializer = self.get_serializer(partial=True)
+        bulk.preload(serializer, items)
+        rows, errors = bulk.validate(serializer, items, instances)
+        errors = [
+            lookup or error for error, lookup in zip(errors, missing)
+        ]
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        objs = bulk.update(serializer.Meta.model, instances, rows)
+        return Response(self.get_serializer(objs, many=True).data)
+
+    def get_natural_key(self, data):
+        """Return the filters on the natural key of the model given in
+        data, e.g. {'genus_id': 3, 'name': 'mellifera'}"""
+        model = self.get_queryset().model
+        if not model.natural_key_fields:
+            raise Http404
+        key = {}
+        errors = {}
+        for name in model.natural_key_fields:
+            field = model._meta.get_field(name)
+            value = data.get(name)
+            if value in (None, ''):
+                errors[name] = ['This field is required.']
+                continue
+            try:
+                key[field.attname] = \
+                    (field.target_field if field.is_relation else field) \
+                    .to_python(value)
+            except DjangoValidationError as exc:
+                errors[name] = exc.messages
+        if errors:
+            raise ValidationError(errors)
+        return key
+
+    @action(methods=['get'], detail=False)
+    def lookup(self, request):
+        """Return the object with the natural key given in the query, e.g.
+        ?genus=3&name=mellifera"""
+        key = self.get_natural_key(request.query_params)
+        instance = self.get_queryset().filter(**key).first()
+        if instance is None:
+            raise Http404
+        return Response(self.get_serializer(instance).data)
+
+    @action(methods=['put'], detail=False)
+    def upsert(self, request):
+        """Partially update the object with the natural key of the data, or
+        create it when there is none"""
+        if not isinstance(request.data, dict):
+            raise ValidationError('Expected an object.')
+        key = self.get_natural_key(request.data)
+        try:
+            return self.save_natural(key)
+        except IntegrityError:
+            # Created by another request since the lookup: update it
+            return self.save_natural(key)
+
+    def save_natural(self, key):
+        instance = self.get_queryset().filter(**key).first()
+        serializer = self.get_serializer(
+            instance,
+            data=self.request.data,
+            partial=instance is not None
+        )
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            serializer.save()
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if instance is None
+            else status.HTTP_200_OK
+        )
+
+
+class SnapshotView(APIView):
+    """List the Parquet files of the snapshot of the core tables, or start
+    writing a new one in the background"""
+    authentication_classes = (CachedTokenAuthentication, )
+    permission_classes = (permissions.IsAdminUser, )
+
+    def get(self, request):
+        return Response({
+            'files': self.urls(snapshot.files()),
+            'running': snapshot.running(),
+        })
+
+    def post(self, request):
+        if snapshot.running():
+            return Response(
+                {'detail': 'A snapshot is already being exported.'},
+                status=status.HTTP_409_CONFLICT
+            )
+        snapshot.start()
+        return Response(
+            {'files': self.urls(snapshot.files()), 'running': True},
+            status=status.HTTP_202_ACCEPTED
+        )
+
+    def urls(self, names):
+        return [reverse('core:snapshot-file', args=[name]) for name in names]
+
+
+class SnapshotFileView(APIView):
+    """Download a Parquet file of the snapshot of the core tables"""
+    authentication_classes = (CachedTokenAuthentication, )
+    permission_classes = (permissions.IsAdminUser, )
+
+    def get(self, request, name):
+        path = snapshot.file_path(name)
+        if path is None:
+            raise Http404
+        return FileResponse(
+            open(path, 'rb'),
+            as_attachment=True,
+            content_type='application/octet-stream'
+        )
+
+
+class TreeView(APIView):
+    """Return a ModelTree. JSON is sent as the bytes rendered once per
+    version, the other formats are rendered from the cached tree."""
+    authentication_classes = (CachedTokenAuthentication, )
+    permission_classes = (permissions.IsAuthenticated, )
+    tree = None
+
+    def get(self, request, format=None):
+        if type(request.accepted_renderer) is JSONRenderer:
+            return HttpResponse(
+                self.tree.get_json(),
+                content_type='application/json'
+            )
+        return Response(self.tree.get())
+
+
+class BundleView(APIView):
+    """Return every reference table in one response, prerendered and
+    precompressed for the current version"""
+    authentication_classes = (CachedTokenAuthentication, )
+    permission_classes = (permissions.IsAuthenticated, )
+
+    def get(self, request):
+        content = bundle.BUNDLE.get()
+        encoding = bundle.select_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        etag = content.etag(encoding)
+        header = request.META.get('HTTP_IF_NONE_MATCH', '')
+        if bundle.etag_matches(header, etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                content.encoded[encoding],
+                content_type='application/json'
+            )
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ('Accept-Encoding', ))
+        return response
@@ -0,0 +1,33 @@
+from core.checklist import Checklist, Lookup, Rank
+from core.management.checklist import ChecklistCommand
+from core.models import (
+    InsectFamilies,
+    InsectGenera,
+    InsectGodfather,
+    InsectSpecies,
+    InsectSubFamilies,
+    InsectSuperFamilies,
+    InsectTribes,
+)
+
+
+class Command(ChecklistCommand):
+    """Django command to load an insect checklist with the columns
+    superFamily, family, subFamily, tribe, genus, species, godfather, year
+    and optionally otherName"""
+    help = 'Create the missing insect taxa of a CSV or TSV checklist'
+
+    def get_checklist(self):
+        return Checklist(
+            [
+                Rank('superFamily', InsectSuperFamilies),
+                Rank('family', InsectFamilies, 'superFamily'),
+                Rank('subFamily', InsectSubFamilies, 'family'),
+                Rank('tribe', InsectTribes, 'subFamily'),
+                Rank('genus', InsectGenera, 'tribe'),
+                Rank('species', InsectSpecies, 'genus'),
+            ],
+            lookups=[Lookup('godfather', InsectGodfather, 'godfather')],
+            fields={'year': int, 'otherName': str},
+            required=('year',)
+        )
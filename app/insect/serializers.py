@@ -17,8 +17,8 @@ class InsectSuperFamiliesSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = InsectSuperFamilies
-        fields = ('id', 'name')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'speciesCount')
+        read_only_fields = ('id', 'speciesCount')
 
 
 class InsectFamiliesSerializer(serializers.ModelSerializer):
@@ -30,8 +30,8 @@ class InsectFamiliesSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = InsectFamilies
-        fields = ('id', 'name', 'superFamily')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'superFamily', 'speciesCount')
+        read_only_fields = ('id', 'speciesCount')
         required_fields = ('name', 'superFamily')
 
 
@@ -44,8 +44,8 @@ class InsectSubFamiliesSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = InsectSubFamilies
-        fields = ('id', 'name', 'family')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'family', 'speciesCount')
+        read_only_fields = ('id', 'speciesCount')
         required_fields = ('name', 'family')
 
 
@@ -58,8 +58,8 @@ class InsectTribesSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = InsectTribes
-        fields = ('id', 'name', 'subFamily')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'subFamily', 'speciesCount')
+        read_only_fields = ('id', 'speciesCount')
         required_fields = ('name', 'subFamily')
 
 
@@ -72,8 +72,8 @@ class InsectGeneraSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = InsectGenera
-        fields = ('id', 'name', 'tribe')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'tribe', 'speciesCount')
+        read_only_fields = ('id', 'speciesCount')
         required_fields = ('name', 'tribe')
 
 
@@ -0,0 +1,129 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core import models
+from core.tests.test_models import sample_insectSpecie
+
+CHECKLIST = (
+    'Super family\tFamily\tSub family\tTribe\tGenus\tSpecies\tGodfather\t'
+    'Year\n'
+    'test insect super family\ttest insect family\ttest sub family\t'
+    'test tribe\ttest genus\ttest specie\ttest godfather\t2000\n'
+    'test insect super family\ttest insect family\ttest sub family\t'
+    'test tribe\ttest genus\tnew specie\tLinnaeus\t1758\n'
+    'Apoidea\tApidae\tApinae\tApini\tApis\tmellifera\tLinnaeus\t1758\n'
+    'Apoidea\tApidae\tApinae\tApini\tApis\tmellifera\tLinnaeus\t1758\n'
+    'Apoidea\tApidae\tApinae\tApini\tApis\tcerana\tFabricius\tunknown\n'
+    'Apoidea\tApidae\t\tApini\tApis\tdorsata\tFabricius\t1793\n'
+)
+
+
+class ImportInsectChecklistTests(TestCase):
+    """Test loading insect checklists"""
+
+    def setUp(self):
+        self.existing = sample_insectSpecie()
+        fd, self.path = tempfile.mkstemp(suffix='.tsv')
+        with os.fdopen(fd, 'w') as f:
+            f.write(CHECKLIST)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def import_checklist(self, **options):
+        out = StringIO()
+        call_command('import_insect_checklist', self.path, stdout=out,
+                     **options)
+        return out.getvalue()
+
+    def test_import_creates_missing_taxa(self):
+        """Test missing nodes are created below existing ones"""
+        out = self.import_checklist()
+
+        self.assertIn('6 rows, 2 with errors', out)
+        self.assertIn('Line 6: Invalid year: unknown', out)
+        self.assertIn('Line 7: No subFamily', out)
+        self.assertEqual(models.InsectSpecies.objects.count(), 3)
+        genus = models.InsectGenera.objects.get(name='Apis')
+        specie = models.InsectSpecies.objects.get(name='mellifera')
+        self.assertEqual(specie.genus, genus)
+        self.assertEqual(specie.year, 1758)
+        self.assertEqual(specie.godfather.name, 'Linnaeus')
+        self.assertEqual(specie.path, '%s%d/' % (genus.path, specie.id))
+        moved = models.InsectSpecies.objects.get(name='new specie')
+        self.assertEqual(moved.genus_id, self.existing.genus_id)
+        self.assertEqual(moved.godfather, specie.godfather)
+        self.assertEqual(
+            models.InsectSuperFamilies.objects.get(
+                name='test insect super family'
+            ).speciesCount,
+            2
+        )
+        self.assertEqual(
+            models.InsectSuperFamilies.objects.get(name='Apoidea')
+            .speciesCount,
+            1
+        )
+
+    def test_import_again_creates_nothing(self):
+        """Test importing a checklist twice is idempotent"""
+        self.import_checklist()
+
+        out = self.import_checklist()
+
+        self.assertIn('0 InsectSpecies to create', out)
+        self.assertEqual(models.InsectSpecies.objects.count(), 3)
+
+    def test_dry_run(self):
+        """Test a dry run reports the taxa to create without writing"""
+        out = self.import_checklist(dry_run=True)
+
+        self.assertIn('2 InsectSpecies to create', out)
+        self.assertIn('1 InsectGenera to create', out)
+        self.assertEqual(models.InsectSpecies.objects.count(), 1)
+
+    def test_values_not_fitting_reported(self):
+        """Test values that do not fit their column are reported per row
+        and the other rows imported"""
+        with open(self.path, 'a') as f:
+            f.write(
+                'Apoidea\tApidae\tApinae\tApini\t%s\tflorea\tFabricius\t'
+                '1787\n' % ('A' * 256)
+            )
+            f.write(
+                'Apoidea\tApidae\tApinae\tApini\tApis\tflorea\t%s\t'
+                '1787\n' % ('F' * 256)
+            )
+            f.write(
+                'Apoidea\tApidae\tApinae\tApini\tApis\tflorea\tFabricius'
+                '\t99999999999\n'
+            )
+
+        out = self.import_checklist()
+
+        self.assertIn('9 rows, 5 with errors', out)
+        self.assertIn(
+            'Line 8: Invalid genus: Ensure this value has at most 255 '
+            'characters (it has 256).',
+            out
+        )
+        self.assertIn('Line 9: Invalid godfather: Ensure this value', out)
+        self.assertIn(
+            'Line 10: Invalid year: Ensure this value is less than or equal '
+            'to 2147483647.',
+            out
+        )
+        self.assertEqual(models.InsectSpecies.objects.count(), 3)
+
+    def test_missing_column(self):
+        """Test a checklist without a rank column is rejected"""
+        with open(self.path, 'w') as f:
+            f.write('family,genus,species\n')
+
+        with self.assertRaises(CommandError):
+            self.import_checklist()
@@ -1,6 +1,12 @@
+import csv
+from unittest.mock import patch
+
+import msgpack
+
 from django.test import TestCase
 from django.urls import reverse
 
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 from rest_framework import status
 
@@ -32,10 +38,20 @@ GENUS_URL = reverse('insect:insectgenera-list')
 
 SPECIE_URL = reverse('insect:insectspecies-list')
 
+SPECIE_BULK_URL = reverse('insect:insectspecies-bulk')
+
+SPECIE_LOOKUP_URL = reverse('insect:insectspecies-lookup')
+
+SPECIE_UPSERT_URL = reverse('insect:insectspecies-upsert')
+
+GENUS_BULK_URL = reverse('insect:insectgenera-bulk')
+
 GODFATHER_URL = reverse('insect:insectgodfather-list')
 
 TRAP_URL = reverse('insect:insecttrap-list')
 
+TREE_URL = reverse('insect:tree')
+
 
 def detail_super_family_url(supFamily_id):
     """Return the detail url for insect super family"""
@@ -129,6 +145,18 @@ class PublicInsectApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def test_tree_auth_required(self):
+        """Test authentification is required"""
+        res = self.client.get(TREE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_csv_auth_required(self):
+        """Test authentification is required to export species"""
+        res = self.client.get(SPECIE_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
 
 class PrivateInsectApiTests(TestCase):
     """Test private as user"""
@@ -417,6 +445,201 @@ class PrivateInsectApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_list_specie_under_family(self):
+        """Test filtering species by an ancestor rank"""
+        specie1 = sample_insectSpecie()
+        family = specie1.genus.tribe.subFamily.family
+        otherFamily = sample_insectFamily(name='other family')
+        otherGenus = sample_insectGenus(
+                        name='other genus',
+                        insectTribe=sample_insectTribe(
+                            name='other tribe',
+                            insectSubFam=sample_insectSubFamily(
+                                name='other sub family',
+                                insectFam=otherFamily
+                            )
+                        )
+                    )
+        specie2 = sample_insectSpecie(name='other', insectGen=otherGenus)
+
+        res = self.client.get(SPECIE_URL, {'under': 'family:%d' % family.id})
+
+        serializer1 = serializers.InsectSpeciesSerializer(specie1)
+        serializer2 = serializers.InsectSpeciesSerializer(specie2)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(serializer1.data, res.data)
+        self.assertNotIn(serializer2.data, res.data)
+
+    def test_export_species_csv(self):
+        """Test species are streamed as CSV rows in id order"""
+        specie = sample_insectSpecie()
+        other = sample_insectSpecie(name='test 2')
+
+        res = self.client.get(SPECIE_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.reader(
+            b''.join(res.streaming_content).decode().splitlines()
+        ))
+        header = list(serializers.InsectSpeciesSerializer().fields)
+        self.assertEqual(rows[0], header)
+        self.assertEqual([row[0] for row in rows[1:]],
+                         [str(specie.id), str(other.id)])
+        self.assertEqual(rows[1][header.index('genus')], str(specie.genus_id))
+
+    def test_export_species_csv_names(self):
+        """Test the export gives related names on demand and accepts the
+        list filters"""
+        specie = sample_insectSpecie()
+        sample_insectSpecie(
+            name='elsewhere',
+            insectGen=sample_insectGenus(name='other genus')
+        )
+
+        res = self.client.get(SPECIE_URL, {
+            'format': 'csv',
+            'names': 'true',
+            'under': 'genus:%d' % specie.genus_id
+        })
+
+        rows = list(csv.DictReader(
+            b''.join(res.streaming_content).decode().splitlines()
+        ))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['genus'], specie.genus.name)
+        self.assertEqual(rows[0]['godfather'], specie.godfather.name)
+
+    def test_list_under_invalid_rank(self):
+        """Test an unknown rank in the under filter fails"""
+        res = self.client.get(SPECIE_URL, {'under': 'kingdom:1'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_under_invalid_id(self):
+        """Test ids that are not 32 bit integers fail"""
+        for pk in ('\u00b2', '1.5', '99999999999'):
+            res = self.client.get(SPECIE_URL, {'under': 'genus:' + pk})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_tree(self):
+        """Test retrieving the nested insect taxonomy"""
+        specie = sample_insectSpecie()
+        genus = specie.genus
+        tribe = genus.tribe
+        subFamily = tribe.subFamily
+        family = subFamily.family
+        superFamily = family.superFamily
+        sample_insectSuperFamily(name='empty super family')
+
+        res = self.client.get(TREE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.json()), 2)
+        self.assertEqual(res.json()[0]['families'], [])
+        node = res.json()[1]
+        self.assertEqual(node['id'], superFamily.id)
+        for key, obj in [
+            ('families', family),
+            ('subFamilies', subFamily),
+            ('tribes', tribe),
+            ('genera', genus),
+            ('species', specie),
+        ]:
+            self.assertEqual(len(node[key]), 1)
+            node = node[key][0]
+            self.assertEqual(node['id'], obj.id)
+            self.assertEqual(node['name'], obj.name)
+        self.assertEqual(node['godfather'], specie.godfather.id)
+        self.assertEqual(node['year'], specie.year)
+
+    def test_tree_cached_until_change(self):
+        """Test the tree is served from memory until a rank changes"""
+        genus = sample_insectGenus()
+        first = self.client.get(TREE_URL)
+
+        with self.assertNumQueries(0), \
+                patch.object(JSONRenderer, 'render') as render:
+            res = self.client.get(TREE_URL)
+
+        render.assert_not_called()
+        self.assertEqual(res.content, first.content)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        specie = sample_insectSpecie(insectGen=genus)
+        res = self.client.get(TREE_URL)
+
+        species = res.json()[0]['families'][0]['subFamilies'][0]['tribes'][
+            0]['genera'][0]['species']
+        self.assertEqual([s['id'] for s in species], [specie.id])
+
+    def test_tree_msgpack(self):
+        """Test the tree is sent in the other formats asked for"""
+        sample_insectGenus()
+
+        res = self.client.get(TREE_URL, {'format': 'msgpack'})
+
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        self.assertEqual(
+            msgpack.unpackb(res.content, raw=False),
+            self.client.get(TREE_URL).json()
+        )
+
+    def test_bulk_create_admin_required(self):
+        """Test bulk creating species requires an admin"""
+        genus = sample_insectGenus()
+
+        res = self.client.post(
+            SPECIE_BULK_URL,
+            [{'name': 'specie', 'genus': genus.id}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_lookup_specie(self):
+        """Test finding a specie by its genus and name"""
+        specie = sample_insectSpecie()
+
+        res = self.client.get(
+            SPECIE_LOOKUP_URL,
+            {'genus': specie.genus_id, 'name': specie.name}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], specie.id)
+
+    def test_lookup_specie_not_found(self):
+        """Test looking up a name unknown in the genus returns 404"""
+        specie = sample_insectSpecie()
+
+        res = self.client.get(
+            SPECIE_LOOKUP_URL,
+            {'genus': specie.genus_id, 'name': 'unknown'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_lookup_specie_invalid_key(self):
+        """Test a lookup needs every field of the key, parents as ids"""
+        res = self.client.get(SPECIE_LOOKUP_URL, {'genus': 'x'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('genus', res.data)
+        self.assertIn('name', res.data)
+
+    def test_upsert_admin_required(self):
+        """Test upserting a specie requires an admin"""
+        genus = sample_insectGenus()
+
+        res = self.client.put(
+            SPECIE_UPSERT_URL,
+            {'name': 'specie', 'genus': genus.id},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
 
 class PrivateInsectApiAsAdminTests(TestCase):
     """Test API as admin"""
@@ -715,3 +938,234 @@ class PrivateInsectApiAsAdminTests(TestCase):
 
         self.assertEqual(specie.name, payload['name'])
         self.assertEqual(specie.genus.id, payload['genus'])
+
+    def test_bulk_create_species(self):
+        """Test creating species in bulk keeps paths and counters"""
+        genus = sample_insectGenus()
+        godfather = sample_insectGodfather()
+        payload = [
+            {'name': 'specie %d' % i, 'genus': genus.id,
+             'godfather': godfather.id, 'year': 2000}
+            for i in range(3)
+        ]
+
+        res = self.client.post(SPECIE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['name'] for item in res.data],
+                         ['specie 0', 'specie 1', 'specie 2'])
+        genus.refresh_from_db()
+        self.assertEqual(genus.speciesCount, 3)
+        superFamily = models.InsectSuperFamilies.objects.get()
+        self.assertEqual(superFamily.speciesCount, 3)
+        for item in res.data:
+            specie = models.InsectSpecies.objects.get(id=item['id'])
+            self.assertEqual(specie.path, '%s%d/' % (genus.path, specie.id))
+
+    def test_bulk_create_errors(self):
+        """Test bulk creation returns the errors of every item and creates
+        nothing when one fails"""
+        genus = sample_insectGenus()
+        godfather = sample_insectGodfather()
+        payload = [
+            {'name': 'valid', 'genus': genus.id, 'godfather': godfather.id,
+             'year': 2000},
+            {'name': 'bad', 'genus': genus.id + 100,
+             'godfather': godfather.id, 'year': 2000},
+            'not an object',
+        ]
+
+        res = self.client.post(SPECIE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('genus', res.data[1])
+        self.assertIn('non_field_errors', res.data[2])
+        self.assertFalse(models.InsectSpecies.objects.exists())
+
+    def test_bulk_create_not_a_list(self):
+        """Test bulk creation expects a list"""
+        res = self.client.post(SPECIE_BULK_URL, {'name': 'x'}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_queries(self):
+        """Test bulk creation does not query per item"""
+        genus = sample_insectGenus()
+        godfather = sample_insectGodfather()
+
+        def payload(count):
+            return [
+                {'name': 'specie %d/%d' % (i, count), 'genus': genus.id,
+                 'godfather': godfather.id, 'year': 2000}
+                for i in range(count)
+            ]
+
+        with self.assertNumQueries(14):
+            self.client.post(SPECIE_BULK_URL, payload(2), format='json')
+        with self.assertNumQueries(14):
+            self.client.post(SPECIE_BULK_URL, payload(50), format='json')
+
+    def test_bulk_update_species(self):
+        """Test moving species in bulk moves their paths and counters"""
+        specie = sample_insectSpecie()
+        oldGenus = specie.genus
+        genus = sample_insectGenus(name='other genus')
+
+        res = self.client.patch(
+            SPECIE_BULK_URL,
+            [{'id': specie.id, 'name': 'moved', 'genus': genus.id}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        specie.refresh_from_db()
+        self.assertEqual(specie.name, 'moved')
+        self.assertEqual(specie.path, '%s%d/' % (genus.path, specie.id))
+        oldGenus.refresh_from_db()
+        genus.refresh_from_db()
+        self.assertEqual(oldGenus.speciesCount, 0)
+        self.assertEqual(genus.speciesCount, 1)
+
+    def test_bulk_update_reparent_rank(self):
+        """Test moving a genus in bulk moves its species below it"""
+        specie = sample_insectSpecie()
+        tribe = sample_insectTribe(name='other tribe')
+
+        res = self.client.patch(
+            GENUS_BULK_URL,
+            [{'id': specie.genus_id, 'tribe': tribe.id}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        specie.refresh_from_db()
+        self.assertEqual(
+            specie.path,
+            '%s%d/%d/' % (tribe.path, specie.genus_id, specie.id)
+        )
+        tribe.refresh_from_db()
+        self.assertEqual(tribe.speciesCount, 1)
+
+    def test_bulk_update_unknown_id(self):
+        """Test bulk update rejects unknown and repeated ids"""
+        specie = sample_insectSpecie()
+
+        res = self.client.patch(
+            SPECIE_BULK_URL,
+            [
+                {'id': specie.id, 'name': 'first'},
+                {'id': specie.id, 'name': 'again'},
+                {'id': specie.id + 100, 'name': 'unknown'},
+                {'name': 'no id'},
+            ],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        for error in res.data[1:]:
+            self.assertIn('id', error)
+        specie.refresh_from_db()
+        self.assertNotEqual(specie.name, 'first')
+
+    def test_create_specie_duplicate_fail(self):
+        """Test a genus cannot hold two species of the same name"""
+        specie = sample_insectSpecie()
+        payload = {
+            'name': specie.name,
+            'genus': specie.genus_id,
+            'godfather': specie.godfather_id,
+            'year': 2000
+        }
+
+        res = self.client.post(SPECIE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(models.InsectSpecies.objects.count(), 1)
+
+    def test_upsert_creates_specie(self):
+        """Test upserting an unknown key creates the specie"""
+        genus = sample_insectGenus()
+        godfather = sample_insectGodfather()
+        payload = {
+            'name': 'new specie',
+            'genus': genus.id,
+            'godfather': godfather.id,
+            'year': 2000
+        }
+
+        res = self.client.put(SPECIE_UPSERT_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        specie = models.InsectSpecies.objects.get(id=res.data['id'])
+        self.assertEqual(specie.path, '%s%d/' % (genus.path, specie.id))
+        genus.refresh_from_db()
+        self.assertEqual(genus.speciesCount, 1)
+
+    def test_upsert_updates_specie(self):
+        """Test upserting a known key updates the fields it gives"""
+        specie = sample_insectSpecie()
+
+        res = self.client.put(
+            SPECIE_UPSERT_URL,
+            {'name': specie.name, 'genus': specie.genus_id, 'year': 1999},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], specie.id)
+        specie.refresh_from_db()
+        self.assertEqual(specie.year, 1999)
+        self.assertEqual(models.InsectSpecies.objects.count(), 1)
+
+    def test_upsert_without_natural_key(self):
+        """Test models without a natural key have no upsert"""
+        res = self.client.put(
+            reverse('insect:insectgodfather-upsert'),
+            {'name': 'godfather'},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_create_duplicate_names(self):
+        """Test bulk creation rejects names repeated in a genus, in the
+        batch or in the database"""
+        specie = sample_insectSpecie()
+        item = {
+            'genus': specie.genus_id,
+            'godfather': specie.godfather_id,
+            'year': 2000
+        }
+        payload = [
+            dict(item, name='new'),
+            dict(item, name='new'),
+            dict(item, name=specie.name),
+        ]
+
+        res = self.client.post(SPECIE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('non_field_errors', res.data[1])
+        self.assertIn('non_field_errors', res.data[2])
+        self.assertEqual(models.InsectSpecies.objects.count(), 1)
+
+    def test_bulk_update_duplicate_name(self):
+        """Test bulk update rejects renaming to a taken name"""
+        specie = sample_insectSpecie()
+        other = sample_insectSpecie(name='other specie')
+
+        res = self.client.patch(
+            SPECIE_BULK_URL,
+            [
+                {'id': specie.id, 'year': 1999},
+                {'id': other.id, 'name': specie.name},
+            ],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('non_field_errors', res.data[1])
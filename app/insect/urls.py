@@ -1,6 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from core.bundle import BUNDLE
+
 from insect import views
 
 
@@ -16,6 +18,17 @@ router.register('species', views.InsectSpeciesViewset)
 router.register('godfather', views.InsectGodfatherViewset)
 router.register('trap', views.InsectTrapViewset)
 
+# Reference tables sent in the bundle
+BUNDLE.register('insect/superfamilies', views.InsectSuperFamiliesViewset)
+BUNDLE.register('insect/families', views.InsectFamiliesViewset)
+BUNDLE.register('insect/subfamilies', views.InsectSubFamiliesViewset)
+BUNDLE.register('insect/tribes', views.InsectTribesViewset)
+BUNDLE.register('insect/genus', views.InsectGeneraViewset)
+BUNDLE.register('insect/species', views.InsectSpeciesViewset)
+BUNDLE.register('insect/godfather', views.InsectGodfatherViewset)
+BUNDLE.register('insect/trap', views.InsectTrapViewset)
+
 urlpatterns = [
+    path('tree/', views.InsectTreeView.as_view(), name='tree'),
     path('', include(router.urls)),
 ]
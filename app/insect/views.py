@@ -1,4 +1,7 @@
-from core.views import BasePermissionsViewset
+from rest_framework.exceptions import ValidationError
+
+from core.tree import Level, ModelTree
+from core.views import BasePermissionsViewset, TreeView, parse_id
 
 from core.models import (
                     InsectSuperFamilies,
@@ -14,31 +17,80 @@ from core.models import (
 from insect import serializers
 
 
-class InsectSuperFamiliesViewset(BasePermissionsViewset):
+INSECT_TREE = ModelTree(
+    Level(InsectSuperFamilies, children_key='families'),
+    Level(InsectFamilies, 'superFamily', 'subFamilies'),
+    Level(InsectSubFamilies, 'family', 'tribes'),
+    Level(InsectTribes, 'subFamily', 'genera'),
+    Level(InsectGenera, 'tribe', 'species'),
+    Level(
+        InsectSpecies,
+        'genus',
+        fields=('godfather', 'year', 'otherName')
+    ),
+)
+
+
+RANKS = {
+    model.rank: model for model in (
+        InsectSuperFamilies,
+        InsectFamilies,
+        InsectSubFamilies,
+        InsectTribes,
+        InsectGenera,
+        InsectSpecies,
+    )
+}
+
+
+class InsectTaxonomyViewset(BasePermissionsViewset):
+    """Base viewset for insect ranks, filtering descendants of a node with
+    ?under=<rank>:<id> through the materialized path"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        under = self.request.query_params.get('under')
+        if under:
+            rank, _, pk = under.partition(':')
+            pk = parse_id(pk)
+            if rank not in RANKS or pk is None:
+                raise ValidationError(
+                    {'under': 'Expected <rank>:<id> with rank in %s' %
+                        ', '.join(RANKS)}
+                )
+            path = RANKS[rank].objects.filter(pk=pk) \
+                .values_list('path', flat=True).first()
+            if path is None:
+                return queryset.none()
+            queryset = queryset.filter(path__startswith=path)
+        return queryset
+
+
+class InsectSuperFamiliesViewset(InsectTaxonomyViewset):
     """Manage insect super families as admin"""
     serializer_class = serializers.InsectSuperFamiliesSerializer
     queryset = InsectSuperFamilies.objects.all()
 
 
-class InsectFamiliesViewset(BasePermissionsViewset):
+class InsectFamiliesViewset(InsectTaxonomyViewset):
     """Manage insect families as admin"""
     serializer_class = serializers.InsectFamiliesSerializer
     queryset = InsectFamilies.objects.all()
 
 
-class InsectSubFamiliesViewset(BasePermissionsViewset):
+class InsectSubFamiliesViewset(InsectTaxonomyViewset):
     """Manage insect sub families as admin"""
     serializer_class = serializers.InsectSubFamiliesSerializer
     queryset = InsectSubFamilies.objects.all()
 
 
-class InsectTribesViewset(BasePermissionsViewset):
+class InsectTribesViewset(InsectTaxonomyViewset):
     """Manage insect tribes as admin"""
     serializer_class = serializers.InsectTribesSerializer
     queryset = InsectTribes.objects.all()
 
 
-class InsectGeneraViewset(BasePermissionsViewset):
+class InsectGeneraViewset(InsectTaxonomyViewset):
     """Manage insect Genera as admin"""
     serializer_class = serializers.InsectGeneraSerializer
     queryset = InsectGenera.objects.all()
@@ -56,7 +108,12 @@ class InsectTrapViewset(BasePermissionsViewset):
     queryset = InsectTrap.objects.all()
 
 
-class InsectSpeciesViewset(BasePermissionsViewset):
+class InsectSpeciesViewset(InsectTaxonomyViewset):
     """Manage insect Species as admin"""
     serializer_class = serializers.InsectSpeciesSerializer
     queryset = InsectSpecies.objects.all()
+
+
+class InsectTreeView(TreeView):
+    """Return the whole insect taxonomy as a nested tree"""
+    tree = INSECT_TREE
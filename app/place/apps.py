@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class PlaceConfig(AppConfig):
     name = 'place'
+
+    def ready(self):
+        from place.signals import connect_signals
+        connect_signals()
@@ -0,0 +1,211 @@
+import math
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import connection
+
+from core.models import Place, PlaceCluster
+
+
+# Most cells a single clusters query may span
+MAX_CELLS = 2 ** 16
+
+# Clusters written per statement
+BATCH_SIZE = 1000
+
+
+def cell_size(zoom):
+    """Return the size in degrees of the cluster cells of a zoom level"""
+    return 360 / 2 ** zoom / settings.PLACE_CLUSTER_GRID
+
+
+def cell(zoom, lat, lon):
+    size = cell_size(zoom)
+    return math.floor(lat / size), math.floor(lon / size)
+
+
+def cell_range(zoom, min_lon, min_lat, max_lon, max_lat):
+    """Return the (min_row, min_col, max_row, max_col) cells of a box"""
+    return cell(zoom, min_lat, min_lon) + cell(zoom, max_lat, max_lon)
+
+
+def cells(lat, lon):
+    """Return the (zoom, row, col) of the cells holding a point"""
+    return [
+        (zoom,) + cell(zoom, lat, lon)
+        for zoom in range(settings.PLACE_CLUSTER_MAX_ZOOM + 1)
+    ]
+
+
+def totals(places):
+    """Return the [count, latitude sum, longitude sum] of (type, lat, lon)
+    places by (zoom, row, col, type) cluster"""
+    result = {}
+    for type_id, lat, lon in places:
+        for key in cells(lat, lon):
+            total = result.setdefault(key + (type_id,), [0, 0.0, 0.0])
+            total[0] += 1
+            total[1] += lat
+            total[2] += lon
+    return result
+
+
+def batches(places):
+    """Yield the clusters of places as rows of query parameters"""
+    rows = [key + tuple(total) for key, total in totals(places).items()]
+    for start in range(0, len(rows), BATCH_SIZE):
+        yield rows[start:start + BATCH_SIZE]
+
+
+def add_place(type_id, lat, lon):
+    """Count a place in its cluster of every zoom level"""
+    add_places([(type_id, lat, lon)])
+
+
+def add_places(places):
+    """Count (type, lat, lon) places in their clusters of every zoom
+    level, with one upsert per batch of clusters"""
+    table = connection.ops.quote_name(PlaceCluster._meta.db_table)
+    with connection.cursor() as cursor:
+        for rows in batches(places):
+            cursor.execute(
+                'INSERT INTO {table} (zoom, "row", col, type_id, count,'
+                ' "latitudeSum", "longitudeSum")'
+                ' VALUES {values}'
+                ' ON CONFLICT (zoom, "row", col, type_id) DO UPDATE SET'
+                ' count = {table}.count + EXCLUDED.count,'
+                ' "latitudeSum" = {table}."latitudeSum"'
+                ' + EXCLUDED."latitudeSum",'
+                ' "longitudeSum" = {table}."longitudeSum"'
+                ' + EXCLUDED."longitudeSum"'.format(
+                    table=table,
+                    values=', '.join(
+                        ['(%s, %s, %s, %s, %s, %s, %s)'] * len(rows)
+                    )
+                ),
+                [value for row in rows for value in row]
+            )
+
+
+def remove_place(type_id, lat, lon):
+    """Uncount a place from its cluster of every zoom level.
+    Only updates and deletes: clusters deleted by a cascade are not
+    created again."""
+    keys = cells(lat, lon)
+    params = [type_id]
+    for key in keys:
+        params += key
+    table = connection.ops.quote_name(PlaceCluster._meta.db_table)
+    where = 'WHERE type_id = %s AND (zoom, "row", col) IN ({keys})'.format(
+        keys=', '.join(['(%s, %s, %s)'] * len(keys))
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM {table} {where} AND count <= 1'.format(
+                table=table,
+                where=where
+            ),
+            params
+        )
+        cursor.execute(
+            'UPDATE {table} SET count = count - 1,'
+            ' "latitudeSum" = "latitudeSum" - %s,'
+            ' "longitudeSum" = "longitudeSum" - %s {where}'.format(
+                table=table,
+                where=where
+            ),
+            [lat, lon] + params
+        )
+
+
+def remove_places(places):
+    """Uncount (type, lat, lon) places from their clusters of every zoom
+    level, with one update and one delete per batch of clusters"""
+    table = connection.ops.quote_name(PlaceCluster._meta.db_table)
+    match = '{table}.zoom = v.zoom AND {table}."row" = v."row"' \
+        ' AND {table}.col = v.col AND {table}.type_id = v.type_id'
+    with connection.cursor() as cursor:
+        for rows in batches(places):
+            values = ', '.join(
+                ['(%s, %s, %s, %s, %s, %s::float8, %s::float8)'] * len(rows)
+            )
+            params = [value for row in rows for value in row]
+            cursor.execute(
+                ('UPDATE {table} SET count = {table}.count - v.count,'
+                 ' "latitudeSum" = {table}."latitudeSum" - v.lat,'
+                 ' "longitudeSum" = {table}."longitudeSum" - v.lon'
+                 ' FROM (VALUES {values})'
+                 ' AS v (zoom, "row", col, type_id, count, lat, lon)'
+                 ' WHERE ' + match).format(table=table, values=values),
+                params
+            )
+            cursor.execute(
+                ('DELETE FROM {table} USING (VALUES {values})'
+                 ' AS v (zoom, "row", col, type_id, count, lat, lon)'
+                 ' WHERE {table}.count <= 0 AND ' + match).format(
+                    table=table,
+                    values=values
+                ),
+                params
+            )
+
+
+def rebuild():
+    """Recompute every cluster with one INSERT ... SELECT per zoom level"""
+    table = connection.ops.quote_name(PlaceCluster._meta.db_table)
+    places = connection.ops.quote_name(Place._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM {table}'.format(table=table))
+        for zoom in range(settings.PLACE_CLUSTER_MAX_ZOOM + 1):
+            size = cell_size(zoom)
+            cursor.execute(
+                'INSERT INTO {table} (zoom, "row", col, type_id, count,'
+                ' "latitudeSum", "longitudeSum")'
+                ' SELECT %s, floor("latitudeDec"::float8 / %s::float8),'
+                ' floor("longitudeDec"::float8 / %s::float8), type_id,'
+                ' count(*),'
+                ' sum("latitudeDec"::float8), sum("longitudeDec"::float8)'
+                ' FROM {places} GROUP BY 2, 3, type_id'.format(
+                    table=table,
+                    places=places
+                ),
+                [zoom, size, size]
+            )
+
+
+def get_clusters(zoom, min_lon, min_lat, max_lon, max_lat, by_type=False):
+    """Return the centroid and count of the places of every cell of the
+    zoom level overlapping the box, and their count by type if asked"""
+    min_row, min_col, max_row, max_col = cell_range(
+        zoom,
+        min_lon,
+        min_lat,
+        max_lon,
+        max_lat
+    )
+    rows = PlaceCluster.objects.filter(
+        zoom=zoom,
+        row__range=(min_row, max_row),
+        col__range=(min_col, max_col)
+    ).order_by('row', 'col').values_list(
+        'row',
+        'col',
+        'type',
+        'count',
+        'latitudeSum',
+        'longitudeSum'
+    )
+    clusters = []
+    for _, group in groupby(rows, key=itemgetter(0, 1)):
+        group = list(group)
+        count = sum(row[3] for row in group)
+        cluster = {
+            'latitude': sum(row[4] for row in group) / count,
+            'longitude': sum(row[5] for row in group) / count,
+            'count': count,
+        }
+        if by_type:
+            cluster['types'] = {row[2]: row[3] for row in group}
+        clusters.append(cluster)
+    return clusters
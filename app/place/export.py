@@ -0,0 +1,55 @@
+import json
+
+
+# (property, lookup) of the place attributes exported with the coordinates
+PROPERTIES = (
+    ('name', 'name'),
+    ('codeSite', 'codeSite'),
+    ('comment', 'comment'),
+    ('type', 'type__name'),
+    ('town', 'town__name'),
+)
+
+
+def export_rows(queryset, chunk_size):
+    """Return an iterator over the (id, longitude, latitude, *properties) of
+    the places, read through a server-side cursor chunk_size rows at a
+    time"""
+    return queryset.order_by('id').values_list(
+        'id',
+        'longitudeDec',
+        'latitudeDec',
+        *[lookup for _, lookup in PROPERTIES]
+    ).iterator(chunk_size=chunk_size)
+
+
+def geojson_feature(row):
+    pk, longitude, latitude = row[:3]
+    return json.dumps({
+        'type': 'Feature',
+        'id': pk,
+        'geometry': {
+            'type': 'Point',
+            'coordinates': [float(longitude), float(latitude)],
+        },
+        'properties': {
+            name: value for (name, _), value in zip(PROPERTIES, row[3:])
+        },
+    }, separators=(',', ':'))
+
+
+def stream_geojson(queryset, chunk_size=2000):
+    """Yield a GeoJSON FeatureCollection of the places piece by piece, so
+    memory stays constant whatever the number of places"""
+    yield '{"type":"FeatureCollection","features":['
+    separator = ''
+    features = []
+    for row in export_rows(queryset, chunk_size):
+        features.append(geojson_feature(row))
+        if len(features) == chunk_size:
+            yield separator + ','.join(features)
+            separator = ','
+            features = []
+    if features:
+        yield separator + ','.join(features)
+    yield ']}'
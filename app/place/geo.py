@@ -0,0 +1,53 @@
+import math
+
+
+EARTH_RADIUS = 6371008.8
+
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+# Must match the expression of the core_place_location_gist index
+LOCATION = 'point("core_place"."longitudeDec", "core_place"."latitudeDec")'
+
+DISTANCE = (
+    '2 * %s * asin(sqrt('
+    'power(sin(radians("core_place"."latitudeDec" - %%s) / 2), 2)'
+    ' + cos(radians(%%s)) * cos(radians("core_place"."latitudeDec"))'
+    ' * power(sin(radians("core_place"."longitudeDec" - %%s) / 2), 2)'
+    '))' % EARTH_RADIUS
+)
+
+
+def filter_bbox(queryset, min_lon, min_lat, max_lon, max_lat):
+    """Return the places inside the box, using the GiST location index"""
+    return queryset.extra(
+        where=[LOCATION + ' <@ box(point(%s, %s), point(%s, %s))'],
+        params=[min_lon, min_lat, max_lon, max_lat]
+    )
+
+
+def radius_bbox(lat, lon, radius):
+    """Return the (min_lon, min_lat, max_lon, max_lat) box around a circle
+    of radius meters"""
+    dlat = radius / METERS_PER_DEGREE
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-9 or radius / METERS_PER_DEGREE / cos_lat >= 180:
+        dlon = 180
+    else:
+        dlon = radius / METERS_PER_DEGREE / cos_lat
+    return (
+        max(lon - dlon, -180),
+        max(lat - dlat, -90),
+        min(lon + dlon, 180),
+        min(lat + dlat, 90),
+    )
+
+
+def filter_near(queryset, lat, lon, radius):
+    """Return the places at most radius meters away from (lat, lon).
+    The bounding box of the circle is matched on the index first and only
+    the places inside it get their great circle distance computed."""
+    queryset = filter_bbox(queryset, *radius_bbox(lat, lon, radius))
+    return queryset.extra(
+        where=[DISTANCE + ' <= %s'],
+        params=[lat, lat, lon, radius]
+    )
@@ -0,0 +1,203 @@
+"""Density heatmap tiles of the places in the XYZ (web mercator) scheme.
+
+A tile is the 2D histogram of the places under its pixels, blurred so each
+place spreads over RADIUS pixels and colored on a log scale. Rendered
+tiles are cached on disk and deleted when a place under them changes."""
+import io
+import math
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from django.conf import settings
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+
+from core.models import Place
+from core.versions import get_versions
+
+from place.geo import filter_bbox
+
+
+TILE_SIZE = 256
+
+# Pixels over which a place is spread
+RADIUS = 8
+
+# Blurred density at which the color saturates
+SATURATION = 30
+
+# (intensity, RGBA) stops of the color gradient
+GRADIENT = (
+    (0.0, (0, 0, 255, 0)),
+    (0.15, (0, 0, 255, 140)),
+    (0.4, (0, 255, 255, 180)),
+    (0.6, (0, 255, 0, 200)),
+    (0.8, (255, 255, 0, 230)),
+    (1.0, (255, 0, 0, 255)),
+)
+
+MAX_LATITUDE = 85.0511287798
+
+# Past this many changed places every tile is dropped instead
+MAX_INVALIDATED = 100
+
+
+def world_size(zoom):
+    """Return the width in pixels of the world at a zoom level"""
+    return TILE_SIZE * 2 ** zoom
+
+
+def to_pixels(lat, lon, zoom):
+    """Return the global mercator pixel (x, y) of degrees"""
+    lat = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    size = world_size(zoom)
+    x = (lon + 180) / 360 * size
+    y = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / math.pi) / 2 * size
+    return x, y
+
+
+def to_degrees(x, y, zoom):
+    """Return the (lat, lon) of a global mercator pixel"""
+    size = world_size(zoom)
+    lon = x / size * 360 - 180
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / size))))
+    return lat, lon
+
+
+def tile_bbox(zoom, x, y, margin=0):
+    """Return the (min_lon, min_lat, max_lon, max_lat) of a tile grown by
+    margin pixels"""
+    size = world_size(zoom)
+    left = max(x * TILE_SIZE - margin, 0)
+    right = min((x + 1) * TILE_SIZE + margin, size)
+    top = max(y * TILE_SIZE - margin, 0)
+    bottom = min((y + 1) * TILE_SIZE + margin, size)
+    max_lat, min_lon = to_degrees(left, top, zoom)
+    min_lat, max_lon = to_degrees(right, bottom, zoom)
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def kernel():
+    """Return the 1D gaussian spreading a place, 1 at its center"""
+    offsets = np.arange(-RADIUS, RADIUS + 1)
+    return np.exp(-offsets ** 2 / (2 * (RADIUS / 2) ** 2))
+
+
+def blur(grid, weights):
+    """Convolve both axes of grid with weights, keeping the valid part"""
+    n = len(weights)
+    rows = sum(
+        weight * grid[i:grid.shape[0] - n + 1 + i]
+        for i, weight in enumerate(weights)
+    )
+    return sum(
+        weight * rows[:, i:rows.shape[1] - n + 1 + i]
+        for i, weight in enumerate(weights)
+    )
+
+
+def colorize(density):
+    """Return the RGBA pixels of a density grid"""
+    intensity = np.minimum(np.log1p(density) / math.log1p(SATURATION), 1)
+    stops = [stop for stop, _ in GRADIENT]
+    channels = [
+        np.interp(intensity, stops, [color[i] for _, color in GRADIENT])
+        for i in range(4)
+    ]
+    return np.dstack(channels).round().astype(np.uint8)
+
+
+def render(zoom, x, y):
+    """Return the PNG bytes of a tile"""
+    rows = filter_bbox(Place.objects.all(), *tile_bbox(zoom, x, y, RADIUS)) \
+        .annotate(
+            lat=Cast('latitudeDec', FloatField()),
+            lon=Cast('longitudeDec', FloatField()),
+        ).values_list('lat', 'lon')
+    points = np.array(list(rows), dtype=float).reshape(-1, 2)
+    px, py = to_pixels(points[:, 0], points[:, 1], zoom)
+    # Histogram of the tile and of the margin whose places blur into it
+    edges = np.arange(-RADIUS, TILE_SIZE + RADIUS + 1)
+    grid, _, _ = np.histogram2d(
+        py - y * TILE_SIZE,
+        px - x * TILE_SIZE,
+        bins=(edges, edges)
+    )
+    image = Image.fromarray(colorize(blur(grid, kernel())), 'RGBA')
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def tile_path(zoom, x, y):
+    return os.path.join(
+        settings.PLACE_HEATMAP_DIR,
+        str(zoom),
+        str(x),
+        '%d.png' % y
+    )
+
+
+def get_tile(zoom, x, y):
+    """Return the PNG bytes of a tile, rendered once then read from disk"""
+    path = tile_path(zoom, x, y)
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    version = get_versions(Place)
+    png = render(zoom, x, y)
+    if get_versions(Place) != version:
+        # Places changed while rendering: their invalidation may be done
+        return png
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Other processes only ever see complete files
+    fd, temp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(png)
+    os.replace(temp, path)
+    if get_versions(Place) != version:
+        # Changed since the check above; later changes delete it themselves
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    return png
+
+
+def invalidate(lat, lon):
+    """Delete the cached tiles a place at (lat, lon) is drawn on"""
+    for zoom in range(settings.PLACE_HEATMAP_MAX_ZOOM + 1):
+        px, py = to_pixels(float(lat), float(lon), zoom)
+        last = 2 ** zoom - 1
+        for x in range(
+            max(int((px - RADIUS) // TILE_SIZE), 0),
+            min(int((px + RADIUS) // TILE_SIZE), last) + 1
+        ):
+            for y in range(
+                max(int((py - RADIUS) // TILE_SIZE), 0),
+                min(int((py + RADIUS) // TILE_SIZE), last) + 1
+            ):
+                try:
+                    os.remove(tile_path(zoom, x, y))
+                except FileNotFoundError:
+                    pass
+
+
+def invalidate_many(points):
+    """Delete the cached tiles drawing any of the (lat, lon) points"""
+    if len(points) > MAX_INVALIDATED:
+        clear()
+        return
+    for lat, lon in points:
+        invalidate(lat, lon)
+
+
+def clear():
+    """Delete every cached tile, e.g. after bulk writes to the places"""
+    shutil.rmtree(settings.PLACE_HEATMAP_DIR, ignore_errors=True)
@@ -0,0 +1,152 @@
+"""Belgian Lambert 72 (EPSG:31370) <-> WGS84 conversion.
+
+Every function takes and returns numpy arrays (or scalars) so millions of
+coordinates are converted in a few vectorized passes. Lambert 72 x is the
+easting and y the northing, in meters."""
+import numpy as np
+
+
+# International 1924 ellipsoid of the Belgian Datum 1972
+BD72_A = 6378388.0
+BD72_F = 1 / 297.0
+
+WGS84_A = 6378137.0
+WGS84_F = 1 / 298.257223563
+
+# Lambert conic conformal projection of EPSG:31370
+LAT_1 = np.radians(51.16666723333333)
+LAT_2 = np.radians(49.8333339)
+LON_0 = np.radians(4.367486666666666)
+X_0 = 150000.013
+Y_0 = 5400088.438
+
+# (min_lon, min_lat, max_lon, max_lat) area of use of EPSG:31370, the
+# projection is meaningless far from Belgium
+BOUNDS = (2.5, 49.5, 6.4, 51.51)
+
+# BD72 -> WGS84 Helmert transformation (EPSG:15929, position vector):
+# translations in meters, rotations in arc seconds, scale in ppm
+TOWGS84 = (-106.8686, 52.2978, -103.7239, 0.3366, -0.457, 1.8422, -1.2747)
+
+# Iterations of the latitude fixed points, enough for sub-millimeter
+ITERATIONS = 6
+
+
+def eccentricity(f):
+    return np.sqrt(2 * f - f * f)
+
+
+def _m(lat, e):
+    sin = np.sin(lat)
+    return np.cos(lat) / np.sqrt(1 - e * e * sin * sin)
+
+
+def _t(lat, e):
+    sin = np.sin(lat)
+    return np.tan(np.pi / 4 - lat / 2) \
+        / ((1 - e * sin) / (1 + e * sin)) ** (e / 2)
+
+
+BD72_E = eccentricity(BD72_F)
+WGS84_E = eccentricity(WGS84_F)
+
+# Constants of the cone; the latitude of origin is the pole so r0 is 0
+N = (np.log(_m(LAT_1, BD72_E)) - np.log(_m(LAT_2, BD72_E))) \
+    / (np.log(_t(LAT_1, BD72_E)) - np.log(_t(LAT_2, BD72_E)))
+AF = BD72_A * _m(LAT_1, BD72_E) / (N * _t(LAT_1, BD72_E) ** N)
+
+
+def _helmert_matrix():
+    rx, ry, rz = np.radians(np.array(TOWGS84[3:6]) / 3600)
+    scale = 1 + TOWGS84[6] * 1e-6
+    return scale * np.array([
+        [1, -rz, ry],
+        [rz, 1, -rx],
+        [-ry, rx, 1],
+    ])
+
+
+SHIFT = np.array(TOWGS84[:3]).reshape(3, 1)
+TO_WGS84 = _helmert_matrix()
+TO_BD72 = np.linalg.inv(TO_WGS84)
+
+
+def project(lat, lon):
+    """Return the Lambert 72 (x, y) of BD72 geographic radians"""
+    r = AF * _t(lat, BD72_E) ** N
+    theta = N * (lon - LON_0)
+    return X_0 + r * np.sin(theta), Y_0 - r * np.cos(theta)
+
+
+def unproject(x, y):
+    """Return the BD72 geographic (lat, lon) radians of Lambert 72 (x, y)"""
+    dx = x - X_0
+    dy = Y_0 - y
+    t = (np.sqrt(dx * dx + dy * dy) / AF) ** (1 / N)
+    lon = np.arctan2(dx, dy) / N + LON_0
+    lat = np.pi / 2 - 2 * np.arctan(t)
+    for _ in range(ITERATIONS):
+        sin = BD72_E * np.sin(lat)
+        lat = np.pi / 2 - 2 * np.arctan(
+            t * ((1 - sin) / (1 + sin)) ** (BD72_E / 2)
+        )
+    return lat, lon
+
+
+def to_geocentric(lat, lon, a, e):
+    """Return the (3, n) geocentric coordinates of points on the ellipsoid"""
+    sin = np.sin(lat)
+    n = a / np.sqrt(1 - e * e * sin * sin)
+    return np.array([
+        n * np.cos(lat) * np.cos(lon),
+        n * np.cos(lat) * np.sin(lon),
+        n * (1 - e * e) * sin,
+    ])
+
+
+def from_geocentric(xyz, a, e):
+    """Return the geographic (lat, lon) radians of geocentric coordinates,
+    dropping the height"""
+    x, y, z = xyz
+    p = np.sqrt(x * x + y * y)
+    lat = np.arctan2(z, p * (1 - e * e))
+    for _ in range(ITERATIONS):
+        sin = np.sin(lat)
+        n = a / np.sqrt(1 - e * e * sin * sin)
+        lat = np.arctan2(z + e * e * n * sin, p)
+    return lat, np.arctan2(y, x)
+
+
+def in_bounds(latitude, longitude):
+    """Return whether WGS84 degrees lie in the area of use of Lambert 72"""
+    min_lon, min_lat, max_lon, max_lat = BOUNDS
+    return (min_lat <= latitude) & (latitude <= max_lat) \
+        & (min_lon <= longitude) & (longitude <= max_lon)
+
+
+def to_wgs84(x, y):
+    """Return the WGS84 (latitude, longitude) degrees of Lambert 72 (x, y)"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    lat, lon = unproject(x.ravel(), y.ravel())
+    xyz = TO_WGS84 @ to_geocentric(lat, lon, BD72_A, BD72_E) + SHIFT
+    lat, lon = from_geocentric(xyz, WGS84_A, WGS84_E)
+    return (
+        np.degrees(lat).reshape(x.shape),
+        np.degrees(lon).reshape(x.shape),
+    )
+
+
+def to_lambert72(latitude, longitude):
+    """Return the Lambert 72 (x, y) of WGS84 (latitude, longitude) degrees"""
+    latitude = np.asarray(latitude, dtype=float)
+    longitude = np.asarray(longitude, dtype=float)
+    xyz = to_geocentric(
+        np.radians(latitude.ravel()),
+        np.radians(longitude.ravel()),
+        WGS84_A,
+        WGS84_E
+    )
+    lat, lon = from_geocentric(TO_BD72 @ (xyz - SHIFT), BD72_A, BD72_E)
+    x, y = project(lat, lon)
+    return x.reshape(latitude.shape), y.reshape(latitude.shape)
@@ -0,0 +1,138 @@
+import numpy as np
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import FloatField, Q
+from django.db.models.functions import Cast
+
+from core.models import Place
+from core.versions import bump_version
+
+from place.lambert import in_bounds, to_lambert72
+
+
+class Command(BaseCommand):
+    """Django command to fill in or check the Lambert 72 coordinates of the
+    places from their WGS84 ones"""
+    help = 'Fill in the missing Lambert 72 coordinates of the places'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Report the places whose two sides disagree instead'
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='With --check, recompute Lambert 72 where they disagree'
+        )
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=1.0,
+            help='Distance in meters over which the two sides disagree'
+        )
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        if options['check']:
+            queryset = Place.objects.filter(
+                latitudeLambert72__isnull=False,
+                longitudeLambert72__isnull=False
+            )
+            self.stdout.write('Checking Lambert 72 coordinates...')
+        else:
+            queryset = Place.objects.filter(
+                Q(latitudeLambert72__isnull=True)
+                | Q(longitudeLambert72__isnull=True)
+            )
+            self.stdout.write('Filling in Lambert 72 coordinates...')
+
+        checked = updated = 0
+        mismatches = []
+        for ids, latitude, longitude, x, y in self.chunks(
+            queryset,
+            options['chunk_size']
+        ):
+            if not options['check']:
+                # Lambert 72 is only defined around Belgium
+                inside = in_bounds(latitude, longitude)
+                ids = ids[inside]
+                latitude = latitude[inside]
+                longitude = longitude[inside]
+            lambert_x, lambert_y = to_lambert72(latitude, longitude)
+            if options['check']:
+                checked += len(ids)
+                wrong = np.hypot(lambert_x - x, lambert_y - y) \
+                    > options['tolerance']
+                mismatches += ids[wrong].tolist()
+                if not options['fix']:
+                    continue
+                ids = ids[wrong]
+                lambert_x = lambert_x[wrong]
+                lambert_y = lambert_y[wrong]
+            with transaction.atomic():
+                update_lambert(ids, lambert_x, lambert_y)
+            updated += len(ids)
+
+        if updated:
+            bump_version(Place)
+        if options['check']:
+            self.stdout.write(
+                '%d of %d places disagree by more than %g m' % (
+                    len(mismatches),
+                    checked,
+                    options['tolerance']
+                )
+            )
+            if mismatches:
+                self.stdout.write(
+                    'Ids: %s' % ', '.join(str(pk) for pk in mismatches[:100])
+                )
+        self.stdout.write(self.style.SUCCESS(
+            'Lambert 72 coordinates of %d places updated !' % updated
+        ))
+
+    def chunks(self, queryset, size):
+        """Yield (ids, latitude, longitude, x, y) arrays of the places of
+        queryset in chunks of size rows, walking the primary key"""
+        rows = queryset.annotate(
+            lat=Cast('latitudeDec', FloatField()),
+            lon=Cast('longitudeDec', FloatField()),
+            x=Cast('longitudeLambert72', FloatField()),
+            y=Cast('latitudeLambert72', FloatField()),
+        ).order_by('id').values_list('id', 'lat', 'lon', 'x', 'y')
+        last = 0
+        while True:
+            chunk = list(rows.filter(id__gt=last)[:size])
+            if not chunk:
+                return
+            last = chunk[-1][0]
+            ids, latitude, longitude, x, y = zip(*chunk)
+            yield (
+                np.array(ids),
+                np.array(latitude),
+                np.array(longitude),
+                np.array(x, dtype=float),
+                np.array(y, dtype=float),
+            )
+
+
+def update_lambert(ids, x, y):
+    """Write the Lambert 72 coordinates of many places in one statement"""
+    if not len(ids):
+        return
+    table = connection.ops.quote_name(Place._meta.db_table)
+    values = ', '.join(['(%s, %s::numeric, %s::numeric)'] * len(ids))
+    params = []
+    for row in zip(ids.tolist(), y.round(10).tolist(), x.round(10).tolist()):
+        params += row
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'UPDATE {table} SET "latitudeLambert72" = v.y,'
+            ' "longitudeLambert72" = v.x'
+            ' FROM (VALUES {values}) AS v(id, y, x)'
+            ' WHERE {table}.id = v.id'.format(table=table, values=values),
+            params
+        )
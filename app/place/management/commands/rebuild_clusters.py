@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from place import clusters
+
+
+class Command(BaseCommand):
+    """Django command to recompute the place clusters of every zoom level"""
+
+    def handle(self, *args, **options):
+        self.stdout.write('Clustering places...')
+        with transaction.atomic():
+            clusters.rebuild()
+
+        self.stdout.write(self.style.SUCCESS('Clusters rebuilt !'))
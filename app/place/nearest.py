@@ -0,0 +1,292 @@
+import heapq
+import math
+import random
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.models import Place
+from core.versions import is_shared
+
+from place.geo import EARTH_RADIUS, METERS_PER_DEGREE
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Return the great circle distance in meters between two points"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) \
+        * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1, math.sqrt(a)))
+
+
+# Cache key counting the committed changes of the place coordinates
+CHANGES_KEY = 'place:index:changes'
+
+
+def get_changes():
+    """Return the count of place changes shared by every process, None
+    without a shared cache. The count starts from a random value, so an
+    evicted key does not count the same changes again."""
+    if not is_shared():
+        return None
+    changes = cache.get(CHANGES_KEY)
+    if changes is None:
+        cache.add(CHANGES_KEY, random.getrandbits(62), None)
+        changes = cache.get(CHANGES_KEY)
+    return changes
+
+
+def count_change():
+    """Count a committed change of the places and return the new count.
+    Increments are atomic in memcached, so each count is only returned to
+    one writer."""
+    if not is_shared():
+        return None
+    try:
+        return cache.incr(CHANGES_KEY)
+    except ValueError:
+        get_changes()
+        return cache.incr(CHANGES_KEY)
+
+
+class PlaceIndex:
+    """In-memory grid of the place coordinates answering k nearest
+    neighbour queries.
+    Places are bucketed in square cells of `cell_size` degrees and a query
+    visits rings of cells around its own until no unvisited cell can hold
+    a closer place. The grid is built on first use and then follows the
+    places saved and deleted by this process. It is built again once the
+    shared count of changes moved past the ones it followed, after the
+    writes of other processes and the bulk writes."""
+
+    # Cells per side of the blocks used to scan the grid from far away
+    block_size = 32
+
+    def __init__(self, cell_size=None):
+        self.cell_size = cell_size
+        self._lock = threading.RLock()
+        self._cells = None
+        self._blocks = None
+        self._locations = None
+        self._bounds = None
+        self._changes = None
+
+    @property
+    def built(self):
+        return self._cells is not None
+
+    def cell(self, lat, lon):
+        return (
+            math.floor(lat / self.cell_size),
+            math.floor(lon / self.cell_size)
+        )
+
+    def build(self, changes=None):
+        if self.cell_size is None:
+            self.cell_size = settings.PLACE_INDEX_CELL_SIZE
+        if changes is None:
+            changes = get_changes()
+        # Read before the rows: a change made meanwhile rebuilds again
+        self._changes = changes
+        self._cells = {}
+        self._blocks = {}
+        self._locations = {}
+        self._bounds = None
+        rows = Place.objects.values_list('id', 'latitudeDec', 'longitudeDec')
+        for pk, lat, lon in rows.iterator(chunk_size=10000):
+            self._add(pk, float(lat), float(lon))
+
+    def reset(self):
+        """Drop the grid, it is built again on the next query"""
+        with self._lock:
+            self._cells = None
+            self._blocks = None
+            self._locations = None
+            self._changes = None
+
+    def is_current(self, changes):
+        return self.built and changes is not None \
+            and self._changes == changes
+
+    def ensure_current(self):
+        """Build the grid, again if places changed that it did not follow.
+        Without a shared cache the changes of other processes are unknown
+        and the grid is built for every query."""
+        changes = get_changes()
+        if not self.is_current(changes):
+            with self._lock:
+                if not self.is_current(changes):
+                    self.build(changes)
+
+    def add(self, pk, lat, lon):
+        with self._lock:
+            if self.built:
+                self._remove(pk)
+                self._add(pk, float(lat), float(lon))
+
+    def remove(self, pk):
+        with self._lock:
+            if self.built:
+                self._remove(pk)
+
+    def saved(self, pk, lat, lon):
+        """Follow a committed save of a place"""
+        with self._lock:
+            self.add(pk, lat, lon)
+            self.follow(count_change())
+
+    def deleted(self, pk):
+        """Follow a committed deletion of a place"""
+        with self._lock:
+            self.remove(pk)
+            self.follow(count_change())
+
+    def follow(self, changes):
+        """Keep the grid current when the change just counted was the only
+        one since it was"""
+        if changes is not None and self._changes == changes - 1:
+            self._changes = changes
+
+    def _add(self, pk, lat, lon):
+        key = self.cell(lat, lon)
+        self._locations[pk] = (lat, lon)
+        if key not in self._cells:
+            self._cells[key] = {}
+            self._blocks.setdefault(self.block(key), set()).add(key)
+        self._cells[key][pk] = (lat, lon)
+        # Rows and columns holding cells; only grows, which keeps it valid
+        if self._bounds is None:
+            self._bounds = [key[0], key[0], key[1], key[1]]
+        else:
+            bounds = self._bounds
+            bounds[0] = min(bounds[0], key[0])
+            bounds[1] = max(bounds[1], key[0])
+            bounds[2] = min(bounds[2], key[1])
+            bounds[3] = max(bounds[3], key[1])
+
+    def _remove(self, pk):
+        location = self._locations.pop(pk, None)
+        if location is None:
+            return
+        key = self.cell(*location)
+        bucket = self._cells[key]
+        del bucket[pk]
+        if not bucket:
+            del self._cells[key]
+            block = self._blocks[self.block(key)]
+            block.discard(key)
+            if not block:
+                del self._blocks[self.block(key)]
+
+    def block(self, key):
+        return key[0] // self.block_size, key[1] // self.block_size
+
+    def ring(self, row, col, radius):
+        """Yield the keys of the cells at Chebyshev distance radius that
+        lie within the occupied rows and columns"""
+        min_row, max_row, min_col, max_col = self._bounds
+        first_col = max(col - radius, min_col)
+        last_col = min(col + radius, max_col)
+        for ring_row in {row - radius, row + radius}:
+            if min_row <= ring_row <= max_row:
+                for ring_col in range(first_col, last_col + 1):
+                    yield ring_row, ring_col
+        first_row = max(row - radius + 1, min_row)
+        last_row = min(row + radius - 1, max_row)
+        for ring_col in {col - radius, col + radius}:
+            if min_col <= ring_col <= max_col:
+                for ring_row in range(first_row, last_row + 1):
+                    yield ring_row, ring_col
+
+    def nearest(self, lat, lon, k):
+        """Return the [(distance, pk)] of the k places closest to (lat, lon),
+        closest first"""
+        self.ensure_current()
+        with self._lock:
+            k = min(k, len(self._locations))
+            if not k:
+                return []
+            cells = self._cells
+            row, col = self.cell(lat, lon)
+            min_row, max_row, min_col, max_col = self._bounds
+            # Rings closer than the occupied rows and columns are empty
+            radius = max(0, min_row - row, row - max_row,
+                         min_col - col, col - max_col)
+            last = max(row - min_row, max_row - row,
+                       col - min_col, max_col - col)
+            best = []
+            probes = 0
+            while radius <= last:
+                for key in self.ring(row, col, radius):
+                    probes += 1
+                    self.visit(cells.get(key), lat, lon, k, best)
+                if len(best) == k and -best[0][0] <= self.bound(lat, radius):
+                    break
+                if probes > 64 + len(cells) // 64:
+                    # Far from the places: ordering the occupied cells by
+                    # distance is cheaper than walking more rings
+                    best = self.scan(lat, lon, k)
+                    break
+                radius += 1
+        return sorted((-distance, pk) for distance, pk in best)
+
+    def visit(self, bucket, lat, lon, k, best):
+        """Push the places of a cell on the heap of the k closest"""
+        if not bucket:
+            return
+        for pk, (plat, plon) in bucket.items():
+            item = (-haversine(lat, lon, plat, plon), pk)
+            if len(best) < k:
+                heapq.heappush(best, item)
+            elif item > best[0]:
+                heapq.heapreplace(best, item)
+
+    def scan(self, lat, lon, k):
+        """Visit the occupied blocks, then their cells, by increasing
+        distance until none left can hold a closer place"""
+        best = []
+        for closest, block in self.by_distance(
+            lat,
+            lon,
+            self._blocks,
+            self.cell_size * self.block_size
+        ):
+            if len(best) == k and closest > -best[0][0]:
+                break
+            for closest, key in self.by_distance(
+                lat,
+                lon,
+                self._blocks[block],
+                self.cell_size
+            ):
+                if len(best) == k and closest > -best[0][0]:
+                    break
+                self.visit(self._cells[key], lat, lon, k, best)
+        return best
+
+    def by_distance(self, lat, lon, keys, size):
+        """Return the (lower bound of the distance, key) of square areas of
+        size degrees, closest first"""
+        half = size / 2
+        # No point is further than this from the center of its area
+        slack = size * METERS_PER_DEGREE * math.sqrt(2) / 2
+        return sorted(
+            (
+                haversine(lat, lon, key[0] * size + half, key[1] * size + half)
+                - slack,
+                key
+            )
+            for key in keys
+        )
+
+    def bound(self, lat, radius):
+        """Return a lower bound of the distance from a point at latitude lat
+        to any cell outside the rings already visited"""
+        gap = radius * self.cell_size
+        widest = min(90, abs(lat) + gap + self.cell_size)
+        return gap * METERS_PER_DEGREE * math.cos(math.radians(widest))
+
+
+PLACE_INDEX = PlaceIndex()
@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from rest_framework import serializers
 
 from core.models import (
@@ -9,6 +11,13 @@ from core.models import (
                     Place,
                 )
 
+from place.lambert import in_bounds, to_lambert72, to_wgs84
+
+
+def to_decimal(value):
+    """Round a computed coordinate to the decimal places of the fields"""
+    return Decimal('%.10f' % value)
+
 
 class PlaceTypeSerializer(serializers.ModelSerializer):
     """Serializer for PlaceType objects"""
@@ -24,8 +33,8 @@ class CountrySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Country
-        fields = ('id', 'name')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'placesCount')
+        read_only_fields = ('id', 'placesCount')
 
 
 class RegionSerializer(serializers.ModelSerializer):
@@ -36,8 +45,8 @@ class RegionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Region
-        fields = ('id', 'name', 'country')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'country', 'placesCount')
+        read_only_fields = ('id', 'placesCount')
         required_fields = ('name', 'country')
 
 
@@ -49,8 +58,8 @@ class CitySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = City
-        fields = ('id', 'name', 'region')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'region', 'placesCount')
+        read_only_fields = ('id', 'placesCount')
         required_fields = ('name', 'region')
 
 
@@ -62,13 +71,15 @@ class TownSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Town
-        fields = ('id', 'name', 'city')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'city', 'placesCount')
+        read_only_fields = ('id', 'placesCount')
         required_fields = ('name', 'city')
 
 
 class PlaceSerializer(serializers.ModelSerializer):
-    """Serializer for place objects"""
+    """Serializer for place objects.
+    Either side of the coordinates may be given, the other one is computed
+    (Lambert 72 only inside its area of use)."""
     type = serializers.PrimaryKeyRelatedField(
                             many=False, queryset=PlaceType.objects.all()
                         )
@@ -76,6 +87,10 @@ class PlaceSerializer(serializers.ModelSerializer):
                             many=False,
                             queryset=Town.objects.all()
                         )
+    coordinates = (
+            ('latitudeDec', 'longitudeDec'),
+            ('latitudeLambert72', 'longitudeLambert72'),
+        )
 
     class Meta:
         model = Place
@@ -92,6 +107,54 @@ class PlaceSerializer(serializers.ModelSerializer):
                 'longitudeDec'
             )
         read_only_fields = ('id',)
+        extra_kwargs = {
+                'latitudeDec': {'required': False},
+                'longitudeDec': {'required': False},
+            }
+
+    def validate(self, attrs):
+        wgs84, lambert = [
+                self.get_pair(attrs, *pair) for pair in self.coordinates
+            ]
+        if wgs84 is None and lambert is None:
+            if self.instance is None:
+                raise serializers.ValidationError(
+                        'WGS84 or Lambert 72 coordinates are required.'
+                    )
+        elif wgs84 is None:
+            latitude, longitude = to_wgs84(lambert[1], lambert[0])
+            attrs['latitudeDec'] = to_decimal(latitude)
+            attrs['longitudeDec'] = to_decimal(longitude)
+        elif lambert is None:
+            # Keep both sides consistent when only WGS84 moves
+            attrs['latitudeLambert72'] = None
+            attrs['longitudeLambert72'] = None
+            if in_bounds(*wgs84):
+                x, y = to_lambert72(*wgs84)
+                attrs['latitudeLambert72'] = to_decimal(y)
+                attrs['longitudeLambert72'] = to_decimal(x)
+        return attrs
+
+    def get_pair(self, attrs, latitude, longitude):
+        """Return the (latitude, longitude) given in attrs, or None.
+        On updates, a side left out keeps the value of the instance."""
+        pair = (attrs.get(latitude), attrs.get(longitude))
+        if pair == (None, None):
+            return None
+        if self.instance is not None:
+            pair = tuple(
+                attrs[name] if name in attrs
+                else getattr(self.instance, name)
+                for name in (latitude, longitude)
+            )
+        for name, value in zip((latitude, longitude), pair):
+            if value is None:
+                raise serializers.ValidationError({
+                        name: 'Required with %s.' % (
+                            longitude if name == latitude else latitude
+                        )
+                    })
+        return pair
 
 
 class PlaceDetailSerializer(PlaceSerializer):
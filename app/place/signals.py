@@ -0,0 +1,124 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, \
+    post_migrate, pre_save
+
+from core.bulk import bulk_saved
+from core.models import Place
+
+from place import clusters, heatmap
+from place.nearest import PLACE_INDEX, count_change
+
+
+def cluster_key(pk):
+    """Return the (type, lat, lon) of a place as stored in the database"""
+    row = Place.objects.filter(pk=pk) \
+        .values_list('type', 'latitudeDec', 'longitudeDec').first()
+    if row is None:
+        return None
+    return row[0], float(row[1]), float(row[2])
+
+
+def invalidate_tiles(*keys):
+    """Delete the heatmap tiles drawing the places of cluster keys"""
+    for key in keys:
+        if key is not None:
+            heatmap.invalidate(key[1], key[2])
+
+
+def place_saving(sender, instance, **kwargs):
+    """Remember where the place was clustered before this save"""
+    instance._cluster_key = None
+    if instance.pk is not None:
+        instance._cluster_key = cluster_key(instance.pk)
+
+
+def place_saved(sender, instance, **kwargs):
+    """Move the place in its clusters, and in the nearest neighbour index
+    and the heatmap tiles once committed"""
+    pk, lat, lon = instance.pk, instance.latitudeDec, instance.longitudeDec
+    transaction.on_commit(lambda: PLACE_INDEX.saved(pk, lat, lon))
+    old = instance.__dict__.pop('_cluster_key', None)
+    new = cluster_key(pk)
+    if old != new:
+        if old is not None:
+            clusters.remove_place(*old)
+        clusters.add_place(*new)
+    if old is None or old[1:] != new[1:]:
+        transaction.on_commit(lambda: invalidate_tiles(old, new))
+
+
+def place_deleted(sender, instance, **kwargs):
+    """Drop the place from its clusters, and from the nearest neighbour
+    index and the heatmap tiles once committed"""
+    pk, lat, lon = instance.pk, instance.latitudeDec, instance.longitudeDec
+    transaction.on_commit(lambda: PLACE_INDEX.deleted(pk))
+    transaction.on_commit(lambda: heatmap.invalidate(lat, lon))
+    clusters.remove_place(
+        instance.type_id,
+        float(instance.latitudeDec),
+        float(instance.longitudeDec)
+    )
+
+
+def places_bulk_saved(sender, objs, old, **kwargs):
+    """Move the places written in bulk in their clusters, and in the
+    heatmap tiles once committed. The nearest neighbour indexes of every
+    process are built again."""
+    removed = []
+    added = []
+    for place in objs:
+        new = (
+            place.type_id,
+            float(place.latitudeDec),
+            float(place.longitudeDec)
+        )
+        previous = None
+        if old is not None:
+            row = old[place.pk]
+            previous = (
+                row['type_id'],
+                float(row['latitudeDec']),
+                float(row['longitudeDec'])
+            )
+        if previous != new:
+            if previous is not None:
+                removed.append(previous)
+            added.append(new)
+    clusters.remove_places(removed)
+    clusters.add_places(added)
+    points = {key[1:] for key in removed + added}
+    transaction.on_commit(lambda: heatmap.invalidate_many(points))
+    transaction.on_commit(count_change)
+
+
+def places_migrated(sender, **kwargs):
+    """Build the nearest neighbour indexes again, the places of a migrated
+    or flushed database changed without signals"""
+    count_change()
+
+
+def connect_signals():
+    pre_save.connect(
+        place_saving,
+        sender=Place,
+        dispatch_uid='place_cluster_pre_save'
+    )
+    post_save.connect(
+        place_saved,
+        sender=Place,
+        dispatch_uid='place_index_save'
+    )
+    bulk_saved.connect(
+        places_bulk_saved,
+        sender=Place,
+        dispatch_uid='place_index_bulk_save'
+    )
+    post_delete.connect(
+        place_deleted,
+        sender=Place,
+        dispatch_uid='place_index_delete'
+    )
+    post_migrate.connect(
+        places_migrated,
+        dispatch_uid='place_index_migrate'
+    )
@@ -0,0 +1,101 @@
+from django.test import TestCase, override_settings
+
+from core import models
+from core.tests.test_models import sample_place, sample_placeType
+
+from place import clusters
+
+
+def snapshot():
+    """Return the clusters as comparable tuples"""
+    return [
+        (zoom, row, col, type, count, round(lat, 6), round(lon, 6))
+        for zoom, row, col, type, count, lat, lon
+        in models.PlaceCluster.objects.order_by(
+            'zoom', 'row', 'col', 'type'
+        ).values_list(
+            'zoom',
+            'row',
+            'col',
+            'type',
+            'count',
+            'latitudeSum',
+            'longitudeSum'
+        )
+    ]
+
+
+@override_settings(PLACE_CLUSTER_MAX_ZOOM=10)
+class PlaceClusterTests(TestCase):
+    """Test the precomputed place clusters"""
+
+    def setUp(self):
+        self.type = sample_placeType()
+        self.otherType = sample_placeType(name='other type')
+        self.brussels = sample_place(
+                name='brussels',
+                type=self.type,
+                latitudeDec=50.8467,
+                longitudeDec=4.3525
+            )
+        self.ixelles = sample_place(
+                name='ixelles',
+                type=self.otherType,
+                latitudeDec=50.8333,
+                longitudeDec=4.3667
+            )
+        self.liege = sample_place(
+                name='liege',
+                type=self.type,
+                latitudeDec=50.6326,
+                longitudeDec=5.5797
+            )
+
+    def assertMatchesRebuild(self):
+        incremental = snapshot()
+        clusters.rebuild()
+        self.assertEqual(incremental, snapshot())
+
+    def test_clusters_created(self):
+        """Test every place is counted once per zoom level"""
+        self.assertEqual(
+            sum(row[4] for row in snapshot() if row[0] == 3),
+            3
+        )
+        self.assertMatchesRebuild()
+
+    def test_clusters_follow_changes(self):
+        """Test moves, type changes and deletions update the clusters"""
+        self.brussels.latitudeDec = 51.2194
+        self.brussels.longitudeDec = 4.4025
+        self.brussels.save()
+        self.liege.type = self.otherType
+        self.liege.save()
+        self.ixelles.delete()
+
+        self.assertMatchesRebuild()
+
+    def test_delete_type_cascades(self):
+        """Test deleting a place type leaves no cluster of it behind"""
+        type_id = self.type.id
+        self.type.delete()
+
+        self.assertFalse(
+            models.PlaceCluster.objects.filter(type=type_id).exists()
+        )
+        self.assertTrue(models.PlaceCluster.objects.exists())
+        self.assertMatchesRebuild()
+
+    def test_get_clusters(self):
+        """Test the places of a cell are merged with their centroid"""
+        result = clusters.get_clusters(7, 4, 50.5, 6, 51, by_type=True)
+
+        self.assertEqual(len(result), 2)
+        brussels = max(result, key=lambda cluster: cluster['count'])
+        self.assertEqual(brussels['count'], 2)
+        self.assertAlmostEqual(brussels['latitude'], (50.8467 + 50.8333) / 2)
+        self.assertAlmostEqual(brussels['longitude'], (4.3525 + 4.3667) / 2)
+        self.assertEqual(
+            brussels['types'],
+            {self.type.id: 1, self.otherType.id: 1}
+        )
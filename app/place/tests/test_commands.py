@@ -0,0 +1,61 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import models
+from core.tests.test_models import sample_place
+
+
+class CommandTests(TestCase):
+
+    def test_convert_coordinates_fills_lambert(self):
+        """Test places around Belgium get their Lambert 72 coordinates"""
+        brussels = sample_place(
+                latitudeDec=50.840411283,
+                longitudeDec=4.368752141
+            )
+        far = sample_place(name='far place')
+
+        call_command('convert_coordinates', chunk_size=1, stdout=StringIO())
+
+        brussels.refresh_from_db()
+        far.refresh_from_db()
+        self.assertAlmostEqual(float(brussels.longitudeLambert72), 150000, 2)
+        self.assertAlmostEqual(float(brussels.latitudeLambert72), 170000, 2)
+        self.assertIsNone(far.latitudeLambert72)
+        self.assertIsNone(far.longitudeLambert72)
+
+    def test_convert_coordinates_check(self):
+        """Test inconsistent Lambert 72 coordinates are reported and fixed"""
+        place = sample_place(
+                latitudeDec=50.840411283,
+                longitudeDec=4.368752141
+            )
+        models.Place.objects.update(
+            latitudeLambert72=170000,
+            longitudeLambert72=150100
+        )
+        out = StringIO()
+
+        call_command('convert_coordinates', check=True, stdout=out)
+
+        self.assertIn('1 of 1 places disagree', out.getvalue())
+        self.assertIn('Ids: %d' % place.id, out.getvalue())
+
+        call_command('convert_coordinates', check=True, fix=True, stdout=out)
+
+        place.refresh_from_db()
+        self.assertAlmostEqual(float(place.longitudeLambert72), 150000, 2)
+
+    def test_rebuild_clusters(self):
+        """Test clusters drifted by bulk writes are repaired"""
+        place = sample_place()
+        models.PlaceCluster.objects.update(count=42)
+
+        call_command('rebuild_clusters', stdout=StringIO())
+
+        self.assertEqual(
+            set(models.PlaceCluster.objects.values_list('type', 'count')),
+            {(place.type_id, 1)}
+        )
@@ -0,0 +1,89 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.test import TestCase, override_settings
+
+from core.tests.test_models import sample_place
+
+from place import heatmap
+
+
+class HeatmapTests(TestCase):
+    """Test the density heatmap tiles"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings = override_settings(PLACE_HEATMAP_DIR=self.directory)
+        self.settings.enable()
+        sample_place(latitudeDec=50.8467, longitudeDec=4.3525)
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory)
+
+    def pixel(self, png, x, y):
+        return Image.open(io.BytesIO(png)).getpixel((x, y))
+
+    def test_render_draws_places(self):
+        """Test the tile is opaque on the place and clear far from it"""
+        px, py = heatmap.to_pixels(50.8467, 4.3525, 8)
+        x, y = int(px // 256), int(py // 256)
+
+        png = heatmap.render(8, x, y)
+
+        image = Image.open(io.BytesIO(png))
+        self.assertEqual(image.size, (256, 256))
+        self.assertEqual(image.mode, 'RGBA')
+        self.assertGreater(
+            self.pixel(png, int(px) % 256, int(py) % 256)[3],
+            0
+        )
+        self.assertEqual(self.pixel(png, (int(px) + 128) % 256, 0)[3], 0)
+
+    def test_empty_tile(self):
+        """Test a tile without places is transparent"""
+        png = heatmap.render(8, 0, 0)
+
+        self.assertEqual(Image.open(io.BytesIO(png)).getextrema()[3], (0, 0))
+
+    def test_tile_cached(self):
+        """Test tiles are written to disk and served from there"""
+        png = heatmap.get_tile(0, 0, 0)
+        path = heatmap.tile_path(0, 0, 0)
+
+        self.assertTrue(os.path.exists(path))
+        with open(path, 'wb') as f:
+            f.write(b'cached')
+        self.assertEqual(heatmap.get_tile(0, 0, 0), b'cached')
+        self.assertNotEqual(png, b'cached')
+
+    def test_invalidate_affected_tiles_only(self):
+        """Test a change only deletes the tiles drawing the place"""
+        heatmap.get_tile(0, 0, 0)
+        heatmap.get_tile(1, 1, 0)
+        heatmap.get_tile(1, 0, 1)
+
+        heatmap.invalidate(50.8467, 4.3525)
+
+        self.assertFalse(os.path.exists(heatmap.tile_path(0, 0, 0)))
+        self.assertFalse(os.path.exists(heatmap.tile_path(1, 1, 0)))
+        self.assertTrue(os.path.exists(heatmap.tile_path(1, 0, 1)))
+
+    def test_tile_changed_while_rendering(self):
+        """Test a tile rendered while a place changed is not kept"""
+        render = heatmap.render
+
+        def render_during_change(zoom, x, y):
+            png = render(zoom, x, y)
+            sample_place(name='new place', latitudeDec=50.9, longitudeDec=4.4)
+            return png
+
+        with patch.object(heatmap, 'render', render_during_change):
+            heatmap.get_tile(0, 0, 0)
+
+        self.assertFalse(os.path.exists(heatmap.tile_path(0, 0, 0)))
@@ -0,0 +1,52 @@
+import numpy as np
+
+from django.test import TestCase
+
+from place.lambert import in_bounds, to_lambert72, to_wgs84
+
+
+# (x, y) Lambert 72 and (latitude, longitude) WGS84 of reference points
+REFERENCES = [
+    ((150000, 170000), (50.840411283, 4.368752141)),
+    ((244000, 150000), (50.653044047, 5.698082007)),
+    ((22000, 200000), (51.095938040, 2.541368407)),
+]
+
+
+class LambertTests(TestCase):
+    """Test the Lambert 72 <-> WGS84 conversion"""
+
+    def test_to_wgs84(self):
+        """Test Lambert 72 points land on their WGS84 references"""
+        for (x, y), (latitude, longitude) in REFERENCES:
+            lat, lon = to_wgs84(x, y)
+
+            self.assertAlmostEqual(float(lat), latitude, places=8)
+            self.assertAlmostEqual(float(lon), longitude, places=8)
+
+    def test_to_lambert72(self):
+        """Test WGS84 points land on their Lambert 72 references"""
+        for (x, y), (latitude, longitude) in REFERENCES:
+            lambert_x, lambert_y = to_lambert72(latitude, longitude)
+
+            self.assertAlmostEqual(float(lambert_x), x, delta=0.001)
+            self.assertAlmostEqual(float(lambert_y), y, delta=0.001)
+
+    def test_round_trip_arrays(self):
+        """Test arrays keep their shape and come back within a millimeter"""
+        random = np.random.RandomState(42)
+        x = random.uniform(20000, 300000, (100, 3))
+        y = random.uniform(20000, 250000, (100, 3))
+
+        latitude, longitude = to_wgs84(x, y)
+        back_x, back_y = to_lambert72(latitude, longitude)
+
+        self.assertEqual(latitude.shape, (100, 3))
+        self.assertLess(np.abs(back_x - x).max(), 0.001)
+        self.assertLess(np.abs(back_y - y).max(), 0.001)
+
+    def test_in_bounds(self):
+        """Test only points around Belgium are in the area of use"""
+        mask = in_bounds(np.array([50.8, 10.1]), np.array([4.3, 9.1]))
+
+        self.assertEqual(mask.tolist(), [True, False])
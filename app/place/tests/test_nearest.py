@@ -0,0 +1,146 @@
+import random
+from unittest.mock import patch
+
+from django.test import TestCase, TransactionTestCase
+
+from core import bulk
+from core.models import Place
+from core.tests.test_models import sample_place
+from core.tests.test_versions import run_elsewhere
+
+from place.nearest import PLACE_INDEX, PlaceIndex, haversine
+
+
+class PlaceIndexTests(TestCase):
+    """Test the in-memory nearest place index"""
+
+    def setUp(self):
+        self.index = PlaceIndex(cell_size=0.05)
+        self.index.build()
+        self.random = random.Random(42)
+        self.points = {}
+        for pk in range(1, 2001):
+            lat = self.random.uniform(49.5, 51.5)
+            lon = self.random.uniform(2.5, 6.4)
+            self.points[pk] = (lat, lon)
+            self.index.add(pk, lat, lon)
+
+    def brute_force(self, lat, lon, k):
+        return sorted(
+            (haversine(lat, lon, plat, plon), pk)
+            for pk, (plat, plon) in self.points.items()
+        )[:k]
+
+    def test_nearest_matches_brute_force(self):
+        """Test the grid search returns the exact k nearest places"""
+        for _ in range(50):
+            lat = self.random.uniform(49, 52)
+            lon = self.random.uniform(2, 7)
+
+            self.assertEqual(
+                self.index.nearest(lat, lon, 5),
+                self.brute_force(lat, lon, 5)
+            )
+
+    def test_nearest_far_away(self):
+        """Test a query far from every place still finds them"""
+        self.assertEqual(
+            self.index.nearest(-33.9, 151.2, 3),
+            self.brute_force(-33.9, 151.2, 3)
+        )
+
+    def test_remove_and_move(self):
+        """Test removed places disappear and moved places follow"""
+        self.index.remove(1)
+        del self.points[1]
+        self.index.add(2, 0.0, 0.0)
+        self.points[2] = (0.0, 0.0)
+
+        self.assertEqual(self.index.nearest(0.1, 0.1, 1)[0][1], 2)
+        self.assertEqual(
+            self.index.nearest(50.5, 4.5, 10),
+            self.brute_force(50.5, 4.5, 10)
+        )
+
+
+class PlaceIndexVersionTests(TransactionTestCase):
+    """Test the index follows the places changed by this process and the
+    others"""
+
+    def setUp(self):
+        PLACE_INDEX.reset()
+        self.addCleanup(PLACE_INDEX.reset)
+        self.paris = sample_place(
+                        name='paris',
+                        latitudeDec=48.8566,
+                        longitudeDec=2.3522
+                    )
+        PLACE_INDEX.nearest(48.9, 2.4, 1)
+
+    def test_own_writes_followed(self):
+        """Test places saved and deleted here are followed without building
+        the grid again"""
+        with patch.object(PLACE_INDEX, 'build') as build:
+            place = sample_place(
+                        name='near paris',
+                        latitudeDec=48.9,
+                        longitudeDec=2.4
+                    )
+            self.assertEqual(
+                PLACE_INDEX.nearest(48.9, 2.4, 1)[0][1],
+                place.id
+            )
+            place.delete()
+            self.assertEqual(
+                PLACE_INDEX.nearest(48.9, 2.4, 1)[0][1],
+                self.paris.id
+            )
+
+        build.assert_not_called()
+
+    def test_bulk_write_rebuilt(self):
+        """Test places written in bulk build the grid again"""
+        place, = bulk.create(Place, [{
+            'name': 'near paris',
+            'codeSite': 'bulk',
+            'town': self.paris.town,
+            'type': self.paris.type,
+            'latitudeDec': 48.9,
+            'longitudeDec': 2.4,
+        }])
+
+        with patch.object(
+            PLACE_INDEX,
+            'build',
+            wraps=PLACE_INDEX.build
+        ) as build:
+            self.assertEqual(
+                PLACE_INDEX.nearest(48.9, 2.4, 1)[0][1],
+                place.id
+            )
+
+        build.assert_called_once()
+
+    def test_moved_elsewhere(self):
+        """Test a place moved by another process is found where it is"""
+        brussels = sample_place(
+                        name='brussels',
+                        latitudeDec=50.8467,
+                        longitudeDec=4.3525
+                    )
+        self.assertEqual(
+            PLACE_INDEX.nearest(48.9, 2.4, 1)[0][1],
+            self.paris.id
+        )
+
+        run_elsewhere(
+            'from core.models import Place;'
+            'place = Place.objects.get(pk=%d);'
+            'place.latitudeDec, place.longitudeDec = 48.9, 2.4;'
+            'place.save()' % brussels.id
+        )
+
+        self.assertEqual(
+            PLACE_INDEX.nearest(48.9, 2.4, 1)[0][1],
+            brussels.id
+        )
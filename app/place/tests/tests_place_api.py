@@ -1,3 +1,8 @@
+import csv
+import json
+import shutil
+import tempfile
+
 from django.test import TestCase
 from django.urls import reverse
 
@@ -15,7 +20,9 @@ from core.tests.test_models import (
         sample_place,
     )
 
-from place import serializers
+from place import clusters, serializers
+from place.tests.test_clusters import snapshot
+from place.nearest import PLACE_INDEX
 
 
 PLACETYPE_URL = reverse('place:placetype-list')
@@ -30,6 +37,22 @@ TOWN_URL = reverse('place:town-list')
 
 PLACE_URL = reverse('place:place-list')
 
+PLACE_BULK_URL = reverse('place:place-bulk')
+
+CITY_BULK_URL = reverse('place:city-bulk')
+
+PLACE_LOOKUP_URL = reverse('place:place-lookup')
+
+TOWN_UPSERT_URL = reverse('place:town-upsert')
+
+NEAREST_PLACE_URL = reverse('place:place-nearest')
+
+EXPORT_GEOJSON_URL = reverse('place:place-export_geojson')
+
+CLUSTERS_URL = reverse('place:place-clusters')
+
+HEATMAP_URL = reverse('place:heatmap', args=[0, 0, 0])
+
 
 def detail_placetype_url(placetype_id):
     """Return the detail url for a place type"""
@@ -117,6 +140,44 @@ class PublicPlaceApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def test_heatmap_auth_required(self):
+        """Test authentification is required to get heatmap tiles"""
+        res = self.client.get(HEATMAP_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_geojson_auth_required(self):
+        """Test authentification is required to export places"""
+        res = self.client.get(EXPORT_GEOJSON_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_place_bulk_auth_required(self):
+        """Test authentification is required to write places in bulk"""
+        place = sample_place()
+        payload = {
+                'name': 'bulk place',
+                'town': place.town_id,
+                'type': place.type_id,
+                'codeSite': 'bulk',
+                'latitudeDec': 50.8,
+                'longitudeDec': 4.3
+            }
+
+        res = self.client.post(PLACE_BULK_URL, [payload], format='json')
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        res = self.client.patch(
+            PLACE_BULK_URL,
+            [{'id': place.id, 'name': 'renamed'}],
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        self.assertEqual(
+            list(models.Place.objects.values_list('name', flat=True)),
+            [place.name]
+        )
+
 
 class PrivatePlaceApiTests(TestCase):
     """Test private as user"""
@@ -300,6 +361,122 @@ class PrivatePlaceApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_list_place_filter_country(self):
+        """Test filtering places by the country of their town"""
+        place1 = sample_place()
+        otherCountry = sample_country(name='other country')
+        otherTown = sample_town(
+                        name='other town',
+                        city=sample_city(
+                            name='other city',
+                            region=sample_region(
+                                name='other region',
+                                country=otherCountry
+                            )
+                        )
+                    )
+        place2 = sample_place(name='test 2', town=otherTown)
+
+        res = self.client.get(PLACE_URL, {'country': otherCountry.id})
+
+        serializer1 = serializers.PlaceSerializer(place1)
+        serializer2 = serializers.PlaceSerializer(place2)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn(serializer1.data, res.data)
+        self.assertIn(serializer2.data, res.data)
+
+    def test_list_place_filter_invalid(self):
+        """Test ancestor filters that are not ids fail"""
+        for value in ('abc', '\u00b2', '99999999999'):
+            res = self.client.get(PLACE_URL, {'region': value})
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_place_bbox(self):
+        """Test listing the places inside a bounding box"""
+        brussels = sample_place(
+                        name='brussels',
+                        latitudeDec=50.8467,
+                        longitudeDec=4.3525
+                    )
+        paris = sample_place(
+                        name='paris',
+                        latitudeDec=48.8566,
+                        longitudeDec=2.3522
+                    )
+
+        res = self.client.get(PLACE_URL, {'bbox': '2.5,49.5,6.4,51.5'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [place['id'] for place in res.data]
+        self.assertIn(brussels.id, ids)
+        self.assertNotIn(paris.id, ids)
+
+    def test_list_place_near(self):
+        """Test listing the places within a radius"""
+        brussels = sample_place(
+                        name='brussels',
+                        latitudeDec=50.8467,
+                        longitudeDec=4.3525
+                    )
+        antwerp = sample_place(
+                        name='antwerp',
+                        latitudeDec=51.2194,
+                        longitudeDec=4.4025
+                    )
+
+        res = self.client.get(
+                PLACE_URL,
+                {'near': '50.85,4.35', 'radius': 30000}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [place['id'] for place in res.data]
+        self.assertIn(brussels.id, ids)
+        self.assertNotIn(antwerp.id, ids)
+
+    def test_list_place_near_without_radius(self):
+        """Test the radius is required with near"""
+        res = self.client.get(PLACE_URL, {'near': '50.85,4.35'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_nearest_place(self):
+        """Test retrieving the closest places first"""
+        PLACE_INDEX.reset()
+        brussels = sample_place(
+                        name='brussels',
+                        latitudeDec=50.8467,
+                        longitudeDec=4.3525
+                    )
+        antwerp = sample_place(
+                        name='antwerp',
+                        latitudeDec=51.2194,
+                        longitudeDec=4.4025
+                    )
+        sample_place(name='paris', latitudeDec=48.8566, longitudeDec=2.3522)
+
+        res = self.client.get(
+                NEAREST_PLACE_URL,
+                {'lat': 51.0, 'lon': 4.4, 'k': 2}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [place['id'] for place in res.data],
+            [brussels.id, antwerp.id]
+        )
+        self.assertLess(res.data[0]['distance'], res.data[1]['distance'])
+
+    def test_nearest_place_invalid_k(self):
+        """Test k must be a small positive number"""
+        res = self.client.get(
+                NEAREST_PLACE_URL,
+                {'lat': 51.0, 'lon': 4.4, 'k': 0}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     # def test_list_place_with_project(self):
     #     """Test listing place"""
     #     place1 = sample_place()
@@ -316,6 +493,145 @@ class PrivatePlaceApiTests(TestCase):
     #     self.assertEqual(res.status_code, status.HTTP_200_OK)
     #     self.assertEqual(res.data, serializer.data)
 
+    def test_place_clusters(self):
+        """Test the places are clustered on the grid of the zoom level"""
+        sample_place(name='brussels', latitudeDec=50.8467, longitudeDec=4.3525)
+        sample_place(name='ixelles', latitudeDec=50.8333, longitudeDec=4.3667)
+        sample_place(name='liege', latitudeDec=50.6326, longitudeDec=5.5797)
+        sample_place(name='outside')
+
+        res = self.client.get(CLUSTERS_URL, {'bbox': '4,50.5,6,51', 'zoom': 7})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(item['count'] for item in res.data), [1, 2])
+        self.assertNotIn('types', res.data[0])
+
+    def test_place_clusters_by_type(self):
+        """Test clusters are broken down by place type on demand"""
+        place = sample_place(latitudeDec=50.8467, longitudeDec=4.3525)
+
+        res = self.client.get(
+            CLUSTERS_URL,
+            {'bbox': '4,50.5,6,51', 'zoom': 3, 'by_type': 'true'}
+        )
+
+        self.assertEqual(res.data[0]['types'], {place.type_id: 1})
+
+    def test_place_clusters_invalid(self):
+        """Test a missing or invalid zoom or a too large box fails"""
+        res = self.client.get(CLUSTERS_URL, {'bbox': '4,50.5,6,51'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(
+            CLUSTERS_URL,
+            {'bbox': '4,50.5,6,51', 'zoom': '\u00b2'}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(
+            CLUSTERS_URL,
+            {'bbox': '-180,-90,180,90', 'zoom': 14}
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_heatmap_tile(self):
+        """Test heatmap tiles are served as PNG"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        sample_place()
+
+        with self.settings(PLACE_HEATMAP_DIR=directory):
+            res = self.client.get(HEATMAP_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'image/png')
+        self.assertTrue(res.content.startswith(b'\x89PNG'))
+
+    def test_heatmap_tile_out_of_range(self):
+        """Test tiles outside the zoom level return 404"""
+        res = self.client.get(reverse('place:heatmap', args=[1, 2, 0]))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_geojson(self):
+        """Test places are streamed as a GeoJSON FeatureCollection"""
+        place = sample_place(latitudeDec=50.8467, longitudeDec=4.3525)
+        sample_place(name='test 2')
+
+        res = self.client.get(EXPORT_GEOJSON_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/geo+json')
+        data = json.loads(b''.join(res.streaming_content))
+        self.assertEqual(data['type'], 'FeatureCollection')
+        self.assertEqual(len(data['features']), 2)
+        feature = data['features'][0]
+        self.assertEqual(feature['id'], place.id)
+        self.assertEqual(feature['geometry']['coordinates'], [4.3525, 50.8467])
+        self.assertEqual(feature['properties']['type'], place.type.name)
+        self.assertEqual(feature['properties']['town'], place.town.name)
+
+    def test_export_places_csv(self):
+        """Test places matching the list filters are exported as CSV"""
+        otherCountry = sample_country(name='other country')
+        otherTown = sample_town(
+                        name='other town',
+                        city=sample_city(
+                            name='other city',
+                            region=sample_region(
+                                name='other region',
+                                country=otherCountry
+                            )
+                        )
+                    )
+        sample_place()
+        place = sample_place(name='test 2', town=otherTown)
+
+        res = self.client.get(
+            PLACE_URL,
+            {'format': 'csv', 'country': otherCountry.id, 'names': 'true'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        rows = list(csv.DictReader(
+            b''.join(res.streaming_content).decode().splitlines()
+        ))
+        self.assertEqual([row['id'] for row in rows], [str(place.id)])
+        self.assertEqual(rows[0]['town'], 'other town')
+        self.assertEqual(rows[0]['codeSite'], place.codeSite)
+        self.assertEqual(float(rows[0]['latitudeDec']), 11.2)
+
+    def test_export_geojson_filtered(self):
+        """Test the export accepts the list filters"""
+        otherCountry = sample_country(name='other country')
+        otherTown = sample_town(
+                        name='other town',
+                        city=sample_city(
+                            name='other city',
+                            region=sample_region(
+                                name='other region',
+                                country=otherCountry
+                            )
+                        )
+                    )
+        sample_place()
+        place = sample_place(name='test 2', town=otherTown)
+
+        res = self.client.get(EXPORT_GEOJSON_URL, {'country': otherCountry.id})
+
+        data = json.loads(b''.join(res.streaming_content))
+        self.assertEqual(
+            [feature['id'] for feature in data['features']],
+            [place.id]
+        )
+
+    def test_export_geojson_empty(self):
+        """Test an export without places is a valid empty collection"""
+        res = self.client.get(EXPORT_GEOJSON_URL)
+
+        data = json.loads(b''.join(res.streaming_content))
+        self.assertEqual(data, {'type': 'FeatureCollection', 'features': []})
+
     def test_retrieve_place(self):
         """Test retrieving a place"""
         place = sample_place()
@@ -337,6 +653,29 @@ class PrivatePlaceApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
 
+    def test_place_bulk_admin_required(self):
+        """Test admin is required to write places in bulk"""
+        place = sample_place()
+
+        res = self.client.post(PLACE_BULK_URL, [], format='json')
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        res = self.client.patch(
+            PLACE_BULK_URL,
+            [{'id': place.id, 'name': 'renamed'}],
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_lookup_place(self):
+        """Test finding a place by its site code"""
+        place = sample_place(codeSite='BX-12')
+        sample_place(name='other place')
+
+        res = self.client.get(PLACE_LOOKUP_URL, {'codeSite': 'BX-12'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], place.id)
+
 
 class PrivatePlaceApiAsAdminTests(TestCase):
     """Test API as admin"""
@@ -546,6 +885,57 @@ class PrivatePlaceApiAsAdminTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_place_from_lambert72(self):
+        """Test the WGS84 coordinates are computed from Lambert 72"""
+        payload = {
+                'name': 'place test name',
+                'town': sample_town().id,
+                'type': sample_placeType().id,
+                'codeSite': 10,
+                'latitudeLambert72': 170000,
+                'longitudeLambert72': 150000
+            }
+
+        res = self.client.post(PLACE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        place = models.Place.objects.get(id=res.data['id'])
+        self.assertAlmostEqual(float(place.latitudeDec), 50.840411283, 8)
+        self.assertAlmostEqual(float(place.longitudeDec), 4.368752141, 8)
+
+    def test_create_place_computes_lambert72(self):
+        """Test the Lambert 72 coordinates are computed from WGS84"""
+        payload = {
+                'name': 'place test name',
+                'town': sample_town().id,
+                'type': sample_placeType().id,
+                'codeSite': 10,
+                'latitudeDec': 50.840411283,
+                'longitudeDec': 4.368752141
+            }
+
+        res = self.client.post(PLACE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        place = models.Place.objects.get(id=res.data['id'])
+        self.assertAlmostEqual(float(place.latitudeLambert72), 170000, 2)
+        self.assertAlmostEqual(float(place.longitudeLambert72), 150000, 2)
+
+    def test_create_place_half_coordinates_fail(self):
+        """Test a latitude without its longitude should fail"""
+        payload = {
+                'name': 'place test name',
+                'town': sample_town().id,
+                'type': sample_placeType().id,
+                'codeSite': 10,
+                'latitudeLambert72': 170000
+            }
+
+        res = self.client.post(PLACE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('longitudeLambert72', res.data)
+
     def test_update_place(self):
         """Test updating place"""
         place = sample_place()
@@ -561,6 +951,27 @@ class PrivatePlaceApiAsAdminTests(TestCase):
         self.assertEqual(place.name, payload['name'])
         self.assertEqual(place.town.id, payload['town'])
 
+    def test_update_place_half_coordinates(self):
+        """Test one side of a pair is updated alone, the other kept"""
+        place = sample_place(latitudeDec=50.84, longitudeDec=4.36)
+        url = detail_place_url(place.id)
+
+        res = self.client.patch(url, {'latitudeDec': 50.85})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        place.refresh_from_db()
+        self.assertAlmostEqual(float(place.latitudeDec), 50.85)
+        self.assertAlmostEqual(float(place.longitudeDec), 4.36)
+        lambert = place.latitudeLambert72
+        self.assertIsNotNone(lambert)
+
+        res = self.client.patch(url, {'longitudeLambert72': 150000})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        place.refresh_from_db()
+        self.assertEqual(place.latitudeLambert72, lambert)
+        self.assertAlmostEqual(float(place.longitudeDec), 4.3687, 3)
+
     # def test_add_project_to_place(self):
     #     """Test adding a project to a place"""
     #     place = sample_place()
@@ -630,3 +1041,124 @@ class PrivatePlaceApiAsAdminTests(TestCase):
                 .data,
                 townSerializer.data
             )
+        self.assertEqual(place.city_id, town.city_id)
+        self.assertEqual(place.country_id, town.city.region.country_id)
+
+    def test_bulk_create_places(self):
+        """Test creating places in bulk keeps their derived data"""
+        town = sample_town()
+        type = sample_placeType()
+        payload = [
+            {
+                'name': 'place %d' % i,
+                'town': town.id,
+                'type': type.id,
+                'codeSite': i,
+                'latitudeDec': round(50.8 + i / 100, 4),
+                'longitudeDec': 4.3
+            }
+            for i in range(3)
+        ]
+
+        res = self.client.post(PLACE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIsNotNone(res.data[0]['latitudeLambert72'])
+        place = models.Place.objects.get(id=res.data[0]['id'])
+        self.assertEqual(place.city_id, town.city_id)
+        self.assertEqual(place.country_id, town.city.region.country_id)
+        town.refresh_from_db()
+        self.assertEqual(town.placesCount, 3)
+        self.assertEqual(
+            models.Country.objects.get(id=place.country_id).placesCount,
+            3
+        )
+        incremental = snapshot()
+        clusters.rebuild()
+        self.assertEqual(incremental, snapshot())
+
+    def test_bulk_update_places(self):
+        """Test moving places in bulk moves their counters and clusters"""
+        place = sample_place(latitudeDec=50.8467, longitudeDec=4.3525)
+        other = sample_place(name='other', latitudeDec=50.6, longitudeDec=5.5)
+        otherCity = sample_city(name='other city')
+        town = sample_town(name='other town', city=otherCity)
+
+        res = self.client.patch(
+            PLACE_BULK_URL,
+            [
+                {'id': place.id, 'town': town.id},
+                {'id': other.id, 'latitudeDec': 51.2, 'longitudeDec': 4.4},
+            ],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        place.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(place.city_id, otherCity.id)
+        self.assertEqual(float(other.latitudeDec), 51.2)
+        self.assertIsNotNone(other.latitudeLambert72)
+        town.refresh_from_db()
+        self.assertEqual(town.placesCount, 1)
+        incremental = snapshot()
+        clusters.rebuild()
+        self.assertEqual(incremental, snapshot())
+
+    def test_bulk_update_reparent_city(self):
+        """Test moving a city in bulk moves the ancestors of its places"""
+        place = sample_place()
+        region = sample_region(
+            name='other region',
+            country=sample_country(name='other country')
+        )
+        url = '%s?region=%d' % (PLACE_URL, region.id)
+        etag = self.client.get(url)['ETag']
+
+        res = self.client.patch(
+            CITY_BULK_URL,
+            [{'id': place.city_id, 'region': region.id}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        place.refresh_from_db()
+        self.assertEqual(place.region_id, region.id)
+        self.assertEqual(place.country_id, region.country_id)
+        region.refresh_from_db()
+        self.assertEqual(region.placesCount, 1)
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in res.data], [place.id])
+
+    def test_upsert_town(self):
+        """Test upserting a town creates it once then updates it"""
+        city = sample_city()
+        payload = {'name': 'new town', 'city': city.id}
+
+        res = self.client.put(TOWN_UPSERT_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        res = self.client.put(TOWN_UPSERT_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(
+            models.Town.objects.filter(name='new town').count(),
+            1
+        )
+
+    def test_bulk_create_places_duplicate_code(self):
+        """Test bulk creation rejects site codes already taken"""
+        place = sample_place()
+        payload = [{
+            'name': 'copy',
+            'town': place.town_id,
+            'type': place.type_id,
+            'codeSite': place.codeSite,
+            'latitudeDec': 50.8,
+            'longitudeDec': 4.3
+        }]
+
+        res = self.client.post(PLACE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('non_field_errors', res.data[0])
@@ -1,6 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from core.bundle import BUNDLE
+
 from place import views
 
 
@@ -14,7 +16,18 @@ router.register('city', views.CityViewset)
 router.register('town', views.TownViewset)
 router.register('place', views.PlaceViewset)
 
+# Reference tables sent in the bundle
+BUNDLE.register('place/placetype', views.PlaceTypeViewset)
+BUNDLE.register('place/country', views.CountryViewset)
+BUNDLE.register('place/region', views.RegionViewset)
+BUNDLE.register('place/city', views.CityViewset)
+BUNDLE.register('place/town', views.TownViewset)
 
 urlpatterns = [
+    path(
+        'heatmap/<int:z>/<int:x>/<int:y>.png',
+        views.HeatmapTileView.as_view(),
+        name='heatmap'
+    ),
     path('', include(router.urls)),
 ]
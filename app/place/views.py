@@ -1,6 +1,14 @@
-from core.views import BasePermissionsViewset
+import math
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+
+from core.authentication import CachedTokenAuthentication
+from core.views import BasePermissionsViewset, parse_id
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework import permissions
 
 
@@ -13,7 +21,24 @@ from core.models import (
                     Place
                 )
 
-from place import serializers
+from place import heatmap, serializers
+from place.clusters import MAX_CELLS, cell_range, get_clusters
+from place.export import stream_geojson
+from place.geo import filter_bbox, filter_near
+from place.nearest import PLACE_INDEX
+
+
+def parse_floats(params, name, count):
+    """Return the comma separated floats of a query parameter"""
+    try:
+        values = [float(value) for value in params[name].split(',')]
+    except (KeyError, ValueError):
+        values = []
+    if len(values) != count or not all(map(math.isfinite, values)):
+        raise ValidationError(
+            {name: 'Expected %d comma separated numbers' % count}
+        )
+    return values
 
 
 class PlaceTypeViewset(BasePermissionsViewset):
@@ -121,6 +146,97 @@ class PlaceViewset(BasePermissionsViewset):
         response['data'] = placeSerializer.data
         return Response(response)
 
+    @action(
+        methods=['get'],
+        detail=False,
+        url_path='nearest',
+        url_name='nearest'
+    )
+    def nearest(self, request):
+        """Return the k places closest to ?lat=&lon=, closest first"""
+        params = self.request.query_params
+        lat, = parse_floats(params, 'lat', 1)
+        lon, = parse_floats(params, 'lon', 1)
+        k = params.get('k', '10')
+        if not k.isdecimal() or not 0 < int(k) <= 100:
+            raise ValidationError({'k': 'Expected a number from 1 to 100'})
+        if not -90 <= lat <= 90 or not -180 <= lon <= 180:
+            raise ValidationError({'lat': 'Expected a valid lat and lon'})
+        neighbours = PLACE_INDEX.nearest(lat, lon, int(k))
+        places = Place.objects.in_bulk([pk for _, pk in neighbours])
+        response = []
+        for distance, pk in neighbours:
+            if pk in places:
+                data = serializers.PlaceSerializer(places[pk]).data
+                data['distance'] = distance
+                response.append(data)
+        return Response(response)
+
+    @action(
+        methods=['get'],
+        detail=False,
+        url_path='clusters',
+        url_name='clusters'
+    )
+    def clusters(self, request):
+        """Return the clusters of places of ?zoom= inside ?bbox=, counted
+        by place type with ?by_type=true"""
+        params = self.request.query_params
+        bbox = parse_floats(params, 'bbox', 4)
+        zoom = parse_id(params.get('zoom', ''))
+        if zoom is None:
+            raise ValidationError({'zoom': 'Expected a zoom level'})
+        zoom = min(zoom, settings.PLACE_CLUSTER_MAX_ZOOM)
+        min_row, min_col, max_row, max_col = cell_range(zoom, *bbox)
+        if (max_row - min_row + 1) * (max_col - min_col + 1) \
+                > MAX_CELLS:
+            raise ValidationError({'bbox': 'Too large for this zoom level'})
+        return Response(get_clusters(
+            zoom,
+            *bbox,
+            by_type=params.get('by_type') in ('true', '1')
+        ))
+
+    @action(
+        methods=['get'],
+        detail=False,
+        url_path='export.geojson',
+        url_name='export_geojson'
+    )
+    def export_geojson(self, request):
+        """Stream the places matching the list filters as GeoJSON"""
+        response = StreamingHttpResponse(
+            stream_geojson(self.filter_queryset(self.get_queryset())),
+            content_type='application/geo+json'
+        )
+        response['Content-Disposition'] = \
+            'attachment; filename="places.geojson"'
+        return response
+
+    def get_queryset(self):
+        """Filter places on the ancestors copied from their town, a
+        ?bbox=minlon,minlat,maxlon,maxlat or ?near=lat,lon&radius=m"""
+        queryset = self.queryset
+        params = self.request.query_params
+        for field in ('country', 'region', 'city'):
+            value = params.get(field)
+            if value:
+                value = parse_id(value)
+                if value is None:
+                    raise ValidationError({field: 'Expected an id'})
+                queryset = queryset.filter(**{field + '_id': value})
+        if params.get('bbox'):
+            queryset = filter_bbox(queryset, *parse_floats(params, 'bbox', 4))
+        if params.get('near'):
+            lat, lon = parse_floats(params, 'near', 2)
+            radius, = parse_floats(params, 'radius', 1)
+            if not -90 <= lat <= 90 or not -180 <= lon <= 180 or radius <= 0:
+                raise ValidationError(
+                    {'near': 'Expected a valid lat,lon and a positive radius'}
+                )
+            queryset = filter_near(queryset, lat, lon, radius)
+        return queryset
+
     def get_serializer_class(self):
         """Return appropriate serializer class"""
         if self.action in [
@@ -133,7 +249,14 @@ class PlaceViewset(BasePermissionsViewset):
         return self.serializer_class
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', ]:
+        if self.action in [
+            'list',
+            'retrieve',
+            'nearest',
+            'clusters',
+            'export_geojson',
+            'lookup',
+        ]:
             self.permission_classes = [permissions.IsAuthenticated, ]
         if self.action in [
             'create',
@@ -141,7 +264,24 @@ class PlaceViewset(BasePermissionsViewset):
             'partial_update',
             'add_project',
             'remove_project',
-            'update_attribute'
+            'update_attribute',
+            'bulk_create',
+            'bulk_update',
+            'upsert',
         ]:
             self.permission_classes = [permissions.IsAdminUser, ]
         return [permission() for permission in self.permission_classes]
+
+
+class HeatmapTileView(APIView):
+    """Return a PNG tile of the density of places"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request, z, x, y):
+        if z > settings.PLACE_HEATMAP_MAX_ZOOM or x >= 2 ** z or y >= 2 ** z:
+            raise Http404
+        return HttpResponse(
+            heatmap.get_tile(z, x, y),
+            content_type='image/png'
+        )
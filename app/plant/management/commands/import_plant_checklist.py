@@ -0,0 +1,16 @@
+from core.checklist import Checklist, Rank
+from core.management.checklist import ChecklistCommand
+from core.models import PlantFamilies, PlantGenera, PlantSpecies
+
+
+class Command(ChecklistCommand):
+    """Django command to load a plant checklist with the columns family,
+    genus and species"""
+    help = 'Create the missing plant taxa of a CSV or TSV checklist'
+
+    def get_checklist(self):
+        return Checklist([
+            Rank('family', PlantFamilies),
+            Rank('genus', PlantGenera, 'family'),
+            Rank('species', PlantSpecies, 'genus'),
+        ])
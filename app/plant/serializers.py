@@ -8,8 +8,8 @@ class PlantFamiliesSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = PlantFamilies
-        fields = ('id', 'name')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'speciesCount')
+        read_only_fields = ('id', 'speciesCount')
 
 
 class PlantGeneraSerializer(serializers.ModelSerializer):
@@ -20,8 +20,8 @@ class PlantGeneraSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = PlantGenera
-        fields = ('id', 'name', 'family')
-        read_only_fields = ('id',)
+        fields = ('id', 'name', 'family', 'speciesCount')
+        read_only_fields = ('id', 'speciesCount')
         required_fields = ('name', 'family')
 
 
@@ -0,0 +1,42 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import models
+from core.tests.test_models import sample_plantSpecie
+
+
+class ImportPlantChecklistTests(TestCase):
+    """Test loading plant checklists"""
+
+    def test_import_creates_missing_taxa(self):
+        """Test missing nodes are created below existing ones"""
+        specie = sample_plantSpecie()
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as f:
+            f.write(
+                'family,genus,species\n'
+                'test family,test Gene,test specie\n'
+                'test family,test Gene,other specie\n'
+                'Rosaceae,Rosa,canina\n'
+            )
+
+        call_command('import_plant_checklist', path, stdout=StringIO())
+        os.remove(path)
+
+        self.assertEqual(models.PlantSpecies.objects.count(), 3)
+        self.assertEqual(
+            models.PlantSpecies.objects.get(name='other specie').genus_id,
+            specie.genus_id
+        )
+        self.assertEqual(
+            models.PlantFamilies.objects.get(name='Rosaceae').speciesCount,
+            1
+        )
+        self.assertEqual(
+            models.PlantGenera.objects.get(id=specie.genus_id).speciesCount,
+            2
+        )
@@ -22,6 +22,8 @@ GENUS_URL = reverse('plant:plantgenera-list')
 
 SPECIE_URL = reverse('plant:plantspecies-list')
 
+TREE_URL = reverse('plant:tree')
+
 
 def detail_family_url(family_id):
     """Return the detail url for plant family"""
@@ -60,6 +62,12 @@ class PublicPlantApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
+    def test_tree_auth_required(self):
+        """Test authentification is required"""
+        res = self.client.get(TREE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
 
 class PrivatePlantApiTests(TestCase):
     """Test private as user"""
@@ -167,6 +175,25 @@ class PrivatePlantApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_retrieve_tree(self):
+        """Test retrieving the nested plant taxonomy"""
+        specie = sample_plantSpecie()
+        genus = specie.genus
+        family = genus.family
+
+        res = self.client.get(TREE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), [{
+            'id': family.id,
+            'name': family.name,
+            'genera': [{
+                'id': genus.id,
+                'name': genus.name,
+                'species': [{'id': specie.id, 'name': specie.name}],
+            }],
+        }])
+
 
 class PrivatePlantApiAsAdminTests(TestCase):
     """Test API as admin"""
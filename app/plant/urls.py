@@ -1,6 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from core.bundle import BUNDLE
+
 from plant import views
 
 
@@ -11,6 +13,12 @@ router.register('family', views.PlantFamiliesViewset)
 router.register('genus', views.PlantGeneraViewset)
 router.register('specie', views.PlantSpeciesViewset)
 
+# Reference tables sent in the bundle
+BUNDLE.register('plant/family', views.PlantFamiliesViewset)
+BUNDLE.register('plant/genus', views.PlantGeneraViewset)
+BUNDLE.register('plant/specie', views.PlantSpeciesViewset)
+
 urlpatterns = [
+    path('tree/', views.PlantTreeView.as_view(), name='tree'),
     path('', include(router.urls)),
 ]
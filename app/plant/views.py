@@ -1,10 +1,18 @@
-from core.views import BasePermissionsViewset
+from core.tree import Level, ModelTree
+from core.views import BasePermissionsViewset, TreeView
 
 from core.models import PlantFamilies, PlantGenera, PlantSpecies
 
 from plant import serializers
 
 
+PLANT_TREE = ModelTree(
+    Level(PlantFamilies, children_key='genera'),
+    Level(PlantGenera, 'family', 'species'),
+    Level(PlantSpecies, 'genus'),
+)
+
+
 class PlantFamiliesViewset(BasePermissionsViewset):
     """Manage plant families as admin"""
     serializer_class = serializers.PlantFamiliesSerializer
@@ -21,3 +29,8 @@ class PlantSpeciesViewset(BasePermissionsViewset):
     """Manage plant species as admin"""
     serializer_class = serializers.PlantSpeciesSerializer
     queryset = PlantSpecies.objects.all()
+
+
+class PlantTreeView(TreeView):
+    """Return the whole plant taxonomy as a nested tree"""
+    tree = PLANT_TREE
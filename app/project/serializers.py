@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
 
 from core.models import (
                     Project,
@@ -78,6 +79,18 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
         required_fields = ('name', 'beginYear', 'projectLeader')
 
+    @staticmethod
+    def prefetch(queryset):
+        """Load the nested leader, members and places of the projects with
+        a constant number of queries"""
+        return queryset.select_related('projectLeader').prefetch_related(
+                'members',
+                Prefetch(
+                    'places',
+                    queryset=Place.objects.select_related('town', 'type')
+                )
+            )
+
     def create(self):
         pass
 
@@ -89,10 +102,10 @@ class ProjectDetailSerializer(serializers.ModelSerializer):
                                 project=project,
                                 is_active=True
                             )
-        return project
+        return self.prefetch(Project.objects).get(id=project_id)
 
     def assign_place(self, project_id, place_id):
         project = Project.objects.get(id=project_id)
         place = Place.objects.get(id=place_id)
         project.places.add(place)
-        return project
+        return self.prefetch(Project.objects).get(id=project_id)
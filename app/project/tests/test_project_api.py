@@ -1,15 +1,18 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
 from core import models
+from core.tests.test_versions import LOCAL_CACHE, run_elsewhere
 from user.tests.test_user_api import create_superuser
 from core.tests.test_models import (
         sample_project,
         sample_user,
-        sample_place
+        sample_place,
+        sample_placeType,
+        sample_town
     )
 
 from project import serializers
@@ -17,6 +20,8 @@ from project import serializers
 
 PROJECT_URL = reverse('project:project-list')
 
+PROJECT_BULK_URL = reverse('project:project-bulk')
+
 
 def detail_project_url(project_id):
     """Return the detail url for a place type"""
@@ -33,6 +38,22 @@ def assign_place_project_url(project_id):
     return reverse('project:project-assign_place', args=[project_id])
 
 
+def populate_project(project, count):
+    """Add count places of distinct towns and types and count active
+    members to a project"""
+    for i in range(count):
+        project.places.add(sample_place(
+                name='place %d' % i,
+                type=sample_placeType(name='type %d' % i),
+                town=sample_town(name='town %d' % i)
+            ))
+        models.ProjectMembership.objects.create(
+                user=sample_user(email='member%d@ulb.ac.be' % i),
+                project=project,
+                is_active=True
+            )
+
+
 class PublicProjectApiTests(TestCase):
 
     def setUp(self):
@@ -98,6 +119,78 @@ class PrivateProjectApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_list_project_fail_inactive_user(self):
+        """Test inactive memberships are not listed"""
+        projectLeader = sample_user(email='techlead@ulb.ac.be')
+        project = sample_project(projectLeader=projectLeader)
+        membership = models.ProjectMembership.objects.create(
+                            user=self.user,
+                            project=project,
+                            is_active=True
+                        )
+        membership.is_active = False
+        membership.save()
+
+        res = self.client.get(PROJECT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+    def test_retrieve_project_access_cached(self):
+        """Test repeated access checks do not query the database"""
+        projectLeader = sample_user(email='techlead@ulb.ac.be')
+        project = sample_project(projectLeader=projectLeader)
+        populate_project(project, 10)
+        models.ProjectMembership.objects.create(
+                            user=self.user,
+                            project=project,
+                            is_active=True
+                        )
+        url = detail_project_url(project.id)
+        self.client.get(url)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_retrieve_project_access_revoked(self):
+        """Test a cached access is forgotten when the membership ends"""
+        projectLeader = sample_user(email='techlead@ulb.ac.be')
+        project = sample_project(projectLeader=projectLeader)
+        membership = models.ProjectMembership.objects.create(
+                            user=self.user,
+                            project=project,
+                            is_active=True
+                        )
+        url = detail_project_url(project.id)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        membership.is_active = False
+        membership.save()
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(CACHES=LOCAL_CACHE)
+    def test_retrieve_project_access_not_cached_locally(self):
+        """Test access checks are not cached in a cache of this process"""
+        project = sample_project(
+                    projectLeader=sample_user(email='techlead@ulb.ac.be')
+                )
+        models.ProjectMembership.objects.create(
+                            user=self.user,
+                            project=project,
+                            is_active=True
+                        )
+        url = detail_project_url(project.id)
+        self.client.get(url)
+
+        with self.assertNumQueries(4):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
     def test_project_admin_required(self):
         """Test admin is required"""
         payload = {'name': 'project test name'}
@@ -121,6 +214,39 @@ class PrivateProjectApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
 
 
+class ProjectAccessRevokedElsewhereTests(TransactionTestCase):
+    """Test the accesses revoked by other processes"""
+
+    def test_access_revoked_elsewhere(self):
+        """Test a cached access is forgotten when another process ends
+        the membership"""
+        user = sample_user()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        project = sample_project(
+                    projectLeader=sample_user(email='techlead@ulb.ac.be')
+                )
+        membership = models.ProjectMembership.objects.create(
+                            user=user,
+                            project=project,
+                            is_active=True
+                        )
+        url = detail_project_url(project.id)
+        self.assertEqual(client.get(url).status_code, status.HTTP_200_OK)
+
+        run_elsewhere(
+            'from core.models import ProjectMembership;'
+            'membership = ProjectMembership.objects.get(pk=%d);'
+            'membership.is_active = False;'
+            'membership.save()' % membership.id
+        )
+
+        self.assertEqual(
+            client.get(url).status_code,
+            status.HTTP_403_FORBIDDEN
+        )
+
+
 class PrivateProjectApiAsAdminTests(TestCase):
     """Test API as admin"""
 
@@ -236,3 +362,76 @@ class PrivateProjectApiAsAdminTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         project.refresh_from_db()
         self.assertIn(place, project.places.all())
+
+    def test_bulk_create_projects(self):
+        """Test creating projects in bulk sets their places and accesses"""
+        leader = sample_user(email='leader@ulb.ac.be')
+        place = sample_place()
+        payload = [
+            {
+                'name': 'project %d' % i,
+                'abreviation': 'p%d' % i,
+                'beginYear': 2010,
+                'projectLeader': leader.id,
+                'places': [place.id, place.id],
+            }
+            for i in range(2)
+        ]
+
+        res = self.client.post(PROJECT_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['places'] for item in res.data],
+                         [[place.id], [place.id]])
+        self.assertEqual(
+            set(models.Project.objects.accessible_by(leader)
+                .values_list('id', flat=True)),
+            {item['id'] for item in res.data}
+        )
+
+
+class ProjectQueryCountTests(TestCase):
+    """Test the project details load in a constant number of queries"""
+
+    def setUp(self):
+        self.user = create_superuser(
+                        email='admin@ulb.ac.be',
+                        password='test123'
+                    )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.project = sample_project(projectLeader=self.user)
+        populate_project(self.project, 10)
+
+    def test_retrieve_queries(self):
+        """Test retrieving a project does not query per place or member"""
+        url = detail_project_url(self.project.id)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['places']), 10)
+        self.assertEqual(len(res.data['members']), 10)
+
+    def test_assign_user_queries(self):
+        """Test assigning a user does not query per place or member"""
+        user = sample_user(email='legolas@ulb.ac.be')
+        url = assign_user_project_url(self.project.id)
+
+        with self.assertNumQueries(8):
+            res = self.client.patch(url, {'user_id': user.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['data']['members']), 11)
+
+    def test_assign_place_queries(self):
+        """Test assigning a place does not query per place or member"""
+        place = sample_place(name='new place')
+        url = assign_place_project_url(self.project.id)
+
+        with self.assertNumQueries(7):
+            res = self.client.patch(url, {'place_id': place.id})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['data']['places']), 11)
@@ -1,7 +1,8 @@
+from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 
 from core.views import BasePermissionsViewset
-from core.models import Project
+from core.models import Project, ProjectAccess
 
 from rest_framework import permissions
 from rest_framework.decorators import action
@@ -15,6 +16,8 @@ class ProjectViewset(BasePermissionsViewset):
     """Manage project as admin"""
     serializer_class = serializers.ProjectSerializer
     queryset = Project.objects.all()
+    # Lists and permissions depend on the accesses and staff status
+    version_models = (ProjectAccess, get_user_model())
 
     # def create(self, request, *args, **kwargs):
     #     print('in viewset create')
@@ -29,7 +32,7 @@ class ProjectViewset(BasePermissionsViewset):
         return obj
 
     def get_permissions(self):
-        if self.action in ['list', 'retrieve', ]:
+        if self.action in ['list', 'retrieve', 'lookup', ]:
             self.permission_classes = [
                         permissions.IsAuthenticated,
                         CanAccessProject,
@@ -41,7 +44,10 @@ class ProjectViewset(BasePermissionsViewset):
             'add_project',
             'remove_project',
             'update_attribute',
-            'assign_place'
+            'assign_place',
+            'bulk_create',
+            'bulk_update',
+            'upsert',
         ]:
             self.permission_classes = [permissions.IsAdminUser, ]
         return [permission() for permission in self.permission_classes]
@@ -59,13 +65,10 @@ class ProjectViewset(BasePermissionsViewset):
     def get_queryset(self):
         queryset = self.queryset
         user = self.request.user
+        if self.action == 'retrieve':
+            queryset = serializers.ProjectDetailSerializer.prefetch(queryset)
         if self.action == 'list':
-            if not self.request.user.is_staff:
-                queryset = (
-                        Project.objects.filter(projectLeader=user)
-                        |
-                        Project.objects.filter(members=user)
-                    )
+            queryset = queryset.accessible_by(user)
         return queryset
 
     @action(
@@ -16,6 +16,7 @@ from core.tests.test_models import (
 
 TOKEN_URL = reverse('user:token')
 ME_URL = reverse('user:me')
+TOKEN_CACHE_URL = reverse('user:token-cache')
 USER_URL = reverse('user:user-list')
 
 
@@ -174,3 +175,11 @@ class PrivateUserAPIAdminTests(TestCase):
         self.assertFalse(user.is_active)
         self.assertTrue(user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_token_cache_stats(self):
+        """Test the hit rate of the token cache is reported"""
+        res = self.client.get(TOKEN_CACHE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('hitRate', res.data)
+        self.assertEqual(res.data['maxSize'], 1024)
@@ -11,6 +11,11 @@ router.register('user', views.UserViewset)
 
 urlpatterns = [
     path('token/', views.CreateTokenView.as_view(), name='token'),
+    path(
+        'token/cache/',
+        views.TokenCacheStatsView.as_view(),
+        name='token-cache'
+    ),
     path('me/', views.RetrieveUserView.as_view(), name='me'),
     path('', include(router.urls)),
 ]
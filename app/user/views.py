@@ -1,19 +1,24 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 from rest_framework import viewsets
 
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 
+from core.authentication import CachedTokenAuthentication, token_cache
+from core.pagination import PaginationModeMixin
+
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
-class UserViewset(viewsets.ModelViewSet):
+class UserViewset(PaginationModeMixin, viewsets.ModelViewSet):
     """Manage user as admin"""
     serializer_class = UserSerializer
     queryset = get_user_model().objects.all()
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (
         permissions.IsAuthenticated,
         permissions.IsAdminUser,
@@ -30,7 +35,7 @@ class RetrieveUserView(generics.RetrieveAPIView):
     """Retrieve user as authenticated user"""
     queryset = get_user_model().objects.all()
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
@@ -38,3 +43,15 @@ class RetrieveUserView(generics.RetrieveAPIView):
         queryset = self.get_queryset()
         obj = get_object_or_404(queryset, email=self.request.user.email)
         return obj
+
+
+class TokenCacheStatsView(APIView):
+    """Return the hit rate of the token cache of the serving process"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (
+        permissions.IsAuthenticated,
+        permissions.IsAdminUser,
+    )
+
+    def get(self, request):
+        return Response(token_cache.stats())